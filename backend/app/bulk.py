@@ -0,0 +1,290 @@
+"""
+Offline bulk SRD scoring.
+
+Runs the services.analyze SRD pipeline over every polygon of a GeoJSON or GeoParquet
+file with a process pool, checkpointing finished features so an interrupted run
+resumes where it stopped, and writes one row per feature to a Parquet or CSV file.
+
+Usage (from ./backend):
+  python -m app.bulk polygons.geojson scores.parquet --year 2023 --workers 4
+  python -m app.bulk polygons.parquet scores.csv --engine mock   # no Earth Engine
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from .services.analyze import run_mock_srd_analysis
+from .services.geometry import InvalidGeometry, canonicalize_geometry
+
+
+Feature = Tuple[Any, Dict[str, Any]]
+
+
+def load_features(path: str, id_field: str = "id") -> List[Feature]:
+    """Read (id, geometry) pairs from a GeoJSON FeatureCollection or a GeoParquet file."""
+    if path.lower().endswith((".parquet", ".geoparquet")):
+        return _load_geoparquet(path, id_field)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("type") == "FeatureCollection":
+        raw = data.get("features") or []
+    elif data.get("type") == "Feature":
+        raw = [data]
+    else:
+        raw = [{"type": "Feature", "geometry": data}]
+    out: List[Feature] = []
+    for i, feat in enumerate(raw):
+        geom = feat.get("geometry") if isinstance(feat, dict) else None
+        if not isinstance(geom, dict):
+            continue
+        props = feat.get("properties") or {}
+        out.append((feat.get("id", props.get(id_field, i)), geom))
+    return _canonical_features(out)
+
+
+def _canonical_features(features: List[Feature]) -> List[Feature]:
+    """Canonicalize every geometry (services.geometry); invalid ones are reported and skipped."""
+    out: List[Feature] = []
+    for fid, geom in features:
+        try:
+            out.append((fid, canonicalize_geometry(geom)))
+        except InvalidGeometry as e:
+            print(f"Skipping feature {fid!r}: {e}", file=sys.stderr)
+    return out
+
+
+def _load_geoparquet(path: str, id_field: str) -> List[Feature]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Reading GeoParquet requires pyarrow (pip install pyarrow).")
+    from shapely import wkb
+    from shapely.geometry import mapping
+
+    table = pq.read_table(path)
+    geo_meta = json.loads((table.schema.metadata or {}).get(b"geo", b"{}") or b"{}")
+    geom_col = geo_meta.get("primary_column", "geometry")
+    if geom_col not in table.column_names:
+        raise SystemExit(f"GeoParquet file has no geometry column {geom_col!r}.")
+    geoms = table.column(geom_col).to_pylist()
+    ids = table.column(id_field).to_pylist() if id_field in table.column_names else list(range(len(geoms)))
+    return _canonical_features([(fid, mapping(wkb.loads(g))) for fid, g in zip(ids, geoms) if g is not None])
+
+
+# --- Engines -----------------------------------------------------------------------------------
+# An engine has the signature of services.analyze.run_real_srd_batch_analysis: it takes a list of
+# (id, geometry) plus keyword options and yields {"bins": [...]} and {"feature": {...}} events.
+
+def _mock_engine(features: Sequence[Feature], year: int, **_: Any) -> Iterator[Dict[str, Any]]:
+    """Deterministic EE-free engine built on the mock SRD generator."""
+    for idx, (fid, geom) in enumerate(features):
+        result = run_mock_srd_analysis(geom)
+        yield {"feature": {"index": idx, "id": fid, "points": result["points"], "impact_score": result["impact_score"], "error": None}}
+
+
+def resolve_engine(name: str) -> Callable[..., Iterator[Dict[str, Any]]]:
+    """'ee' (real Earth Engine), 'mock', or an importable 'package.module:callable'."""
+    if name == "mock":
+        return _mock_engine
+    if name == "ee":
+        from .services.analyze import run_real_srd_batch_analysis
+
+        return run_real_srd_batch_analysis
+    module_name, _, attr = name.partition(":")
+    if not attr:
+        raise SystemExit(f"Unknown engine {name!r}; use 'ee', 'mock' or 'package.module:callable'.")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _run_chunk(engine_name: str, chunk: List[Tuple[int, Feature]], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Worker entry point: score one chunk of features with a single engine call."""
+    engine = resolve_engine(engine_name)
+    feats = [feature for _, feature in chunk]
+    results: Dict[int, Dict[str, Any]] = {}
+    missing_error = "not analysed"
+    try:
+        for item in engine(feats, options["year"], **{k: v for k, v in options.items() if k != "year"}):
+            if "feature" in item:
+                feat = item["feature"]
+                results[int(feat["index"])] = feat
+    except Exception as e:
+        print(f"Chunk starting at feature {chunk[0][0]} failed: {e}", file=sys.stderr)
+        missing_error = f"not analysed: {e}"
+    rows = []
+    for local_idx, (global_idx, (fid, _)) in enumerate(chunk):
+        feat = results.get(local_idx) or {"points": [], "impact_score": None, "error": missing_error}
+        rows.append(_row(global_idx, fid, feat))
+    return rows
+
+
+def _row(index: int, fid: Any, feat: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "id": fid,
+        "impact_score": feat.get("impact_score"),
+        "error": feat.get("error"),
+        "points": feat.get("points") or [],
+    }
+
+
+# --- Checkpointing -----------------------------------------------------------------------------
+
+# Only successfully scored rows are checkpointed. Rows with an error (a failed EE call, a
+# quota error, a crashed worker) are written to the output but re-run on resume.
+
+def read_checkpoint(path: str) -> Dict[int, Dict[str, Any]]:
+    """Successful rows keyed by feature index; tolerates a truncated last line."""
+    done: Dict[int, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except Exception:
+                continue
+            if isinstance(row, dict) and "index" in row and row.get("error") is None:
+                done[int(row["index"])] = row
+    return done
+
+
+def append_checkpoint(path: str, rows: List[Dict[str, Any]]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# --- Output ------------------------------------------------------------------------------------
+
+def write_output(path: str, rows: List[Dict[str, Any]], year: int) -> None:
+    """One row per feature; per-bin profiles go into list columns (JSON-encoded in CSV)."""
+    columns = {
+        "id": [str(r["id"]) for r in rows],
+        "year": [int(year)] * len(rows),
+        "impact_score": [r.get("impact_score") for r in rows],
+        "error": [r.get("error") for r in rows],
+        "distance_km": [[p.get("distance_km") for p in r["points"]] for r in rows],
+        "value": [[p.get("value") for p in r["points"]] for r in rows],
+        "count": [[p.get("count") for p in r["points"]] for r in rows],
+    }
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Writing Parquet requires pyarrow (pip install pyarrow); use a .csv output instead.")
+        pq.write_table(pa.table(columns), path)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(columns))
+        for i in range(len(rows)):
+            writer.writerow([
+                json.dumps(columns[c][i]) if isinstance(columns[c][i], list) else columns[c][i]
+                for c in columns
+            ])
+
+
+def run_bulk(
+    features: List[Feature],
+    output: str,
+    year: int,
+    engine: str = "ee",
+    workers: int = 4,
+    chunk_size: int = 8,
+    checkpoint: str | None = None,
+    options: Dict[str, Any] | None = None,
+) -> List[Dict[str, Any]]:
+    """Score `features`, resuming from `checkpoint`, and write `output`. Returns the rows."""
+    checkpoint = checkpoint or f"{output}.checkpoint.jsonl"
+    # Only trust checkpointed rows whose id still matches the input at that position
+    done = {
+        i: row for i, row in read_checkpoint(checkpoint).items()
+        if i < len(features) and str(row.get("id")) == str(features[i][0])
+    }
+    pending = [(i, f) for i, f in enumerate(features) if i not in done]
+    print(f"{len(features)} features, {len(done)} already checkpointed, {len(pending)} to run")
+
+    opts = {"year": int(year), **(options or {})}
+    chunk_size = max(1, int(chunk_size))
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    failed = 0
+    if chunks:
+        with ProcessPoolExecutor(max_workers=max(1, int(workers))) as pool:
+            futures = {pool.submit(_run_chunk, engine, chunk, opts): chunk for chunk in chunks}
+            for fut in as_completed(futures):
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    # A crashed worker (e.g. BrokenProcessPool) loses its chunk, not the run
+                    chunk = futures[fut]
+                    print(f"Chunk starting at feature {chunk[0][0]} crashed: {e}", file=sys.stderr)
+                    rows = [_row(i, fid, {"error": f"not analysed: {e}"}) for i, (fid, _) in chunk]
+                append_checkpoint(checkpoint, [row for row in rows if row["error"] is None])
+                for row in rows:
+                    done[row["index"]] = row
+                failed += sum(1 for row in rows if row["error"] is not None)
+                print(f"Checkpointed {len(done) - failed}/{len(features)} features ({failed} failed)")
+
+    ordered = [done[i] for i in range(len(features)) if i in done]
+    write_output(output, ordered, year)
+    print(f"Wrote {len(ordered)} rows to {output}")
+    if failed:
+        print(f"{failed} features failed; re-run the same command to retry them", file=sys.stderr)
+    return ordered
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk SRD scoring over a GeoJSON or GeoParquet file.")
+    parser.add_argument("input", help="GeoJSON FeatureCollection or GeoParquet file")
+    parser.add_argument("output", help="Output file (.parquet or .csv)")
+    parser.add_argument("--year", type=int, default=datetime.utcnow().year - 2)
+    parser.add_argument("--id-field", default="id", help="Feature property / column used as the row id")
+    parser.add_argument("--engine", default="ee", help="'ee', 'mock', or 'package.module:callable'")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (concurrent EE calls)")
+    parser.add_argument("--chunk-size", type=int, default=8, help="Features reduced per EE call")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--start-km", type=float, default=-2.0)
+    parser.add_argument("--end-km", type=float, default=2.0)
+    parser.add_argument("--step-km", type=float, default=0.1)
+    parser.add_argument("--bands", default=None, help="Comma-separated bands like A01,A16,A09")
+    args = parser.parse_args(argv)
+
+    features = load_features(args.input, args.id_field)
+    if not features:
+        print(f"No features with a geometry found in {args.input}", file=sys.stderr)
+        return 1
+    options: Dict[str, Any] = {
+        "start_km": args.start_km,
+        "end_km": args.end_km,
+        "step_km": args.step_km,
+        "bands": [b.strip() for b in args.bands.split(",")] if args.bands else None,
+    }
+    if args.engine == "ee":
+        # Each worker process makes one reduceRegions call per chunk
+        options.update({"chunk_size": args.chunk_size, "concurrency": 1})
+    rows = run_bulk(
+        features,
+        args.output,
+        args.year,
+        engine=args.engine,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        checkpoint=args.checkpoint,
+        options=options,
+    )
+    return 1 if any(row["error"] is not None for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
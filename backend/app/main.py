@@ -3,10 +3,12 @@ from __future__ import annotations
 import json
 import os
 import hashlib
-from typing import Any, List, Optional, Set
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Set
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
@@ -14,11 +16,62 @@ import logging
 import anyio
 logger = logging.getLogger("policy_proof.ws")
 
-from .services.analyze import run_real_srd_analysis, run_mock_srd_analysis
+from .services.analyze import (
+    run_real_srd_analysis,
+    run_real_srd_panel_analysis,
+    run_real_srd_batch_analysis,
+    run_mock_srd_analysis,
+    SRD_MODES,
+    PANEL_MODES,
+)
 from .services.llm import stream_text, stream_ollama, stream_sambanova, stream_text_anakin
 from .services.ee_alphaearth import alphaearth_tile_template
 from .services.ee_climate import climate_temperature_tile_template
-from .services.ee_alphaearth_learn import alphaearth_learned_tile_template
+from .services.ee_alphaearth_learn import alphaearth_learned_coefficients, alphaearth_learned_tile_template
+from .services.cache import srd_result_cache, srd_cache_key
+from .services.singleflight import StreamSingleFlight
+from .services.cancel import CancelToken
+from .services.tile_proxy import TileFetchError, tile_etag, tile_proxy, valid_tile
+from .services.tiles import blank_tile_png
+from .services.local_tiles import LocalTileNotFound, local_tile_renderer
+from .services.ee_catalog import CATALOGS, alphaearth_catalog, start_catalog_refresh, stop_catalog_refresh
+from .services.geometry import InvalidGeometry, canonicalize_geometry
+from .services.synthetic import MAX_SYNTHETIC_BINS, NOISE_MODELS
+
+
+MAX_PANEL_YEARS = 12
+MAX_BINS = 1000  # Distance bins per analysis, i.e. ring reductions or reduceRegions features
+MAX_BATCH_FEATURES = 200
+MAX_PLACEBO_SHIFTS = 20
+MAX_PLACEBO_SHIFT_KM = 10.0
+MAX_DEADLINE_S = 3600.0
+MAX_SYNTHETIC_LATENCY_MS = 1000.0  # Per-point synthetic delay (and jitter mean), so load tests cannot pin a worker
+# SRD engine for requests without `mode`. "batched" (one reduceRegions call per analysis)
+# replaced the original one-reduceRegion-per-ring loop as the default; SRD_DEFAULT_MODE=rings
+# restores per-ring sampling.
+DEFAULT_SRD_MODE = os.getenv("SRD_DEFAULT_MODE", "batched")
+if DEFAULT_SRD_MODE not in SRD_MODES:
+    print(f"Ignoring SRD_DEFAULT_MODE={DEFAULT_SRD_MODE!r}; expected one of {list(SRD_MODES)}")
+    DEFAULT_SRD_MODE = "batched"
+# Default analysis deadline in seconds when a request sets none (0 = no deadline). Requests
+# on the default still share identical in-flight computations (see _stream_analysis); the
+# shared computation stops at the default deadline counted from its first subscriber.
+try:
+    DEFAULT_DEADLINE_S = float(os.getenv("SRD_DEADLINE_S", "0"))
+except ValueError:
+    DEFAULT_DEADLINE_S = 0.0
+
+
+class SyntheticOptions(BaseModel):
+    """Synthetic workload knobs for mode "synthetic" (see services.synthetic)."""
+    n_bins: Optional[int] = None  # Overrides step_km
+    noise: str = "gaussian"  # gaussian, heteroscedastic, student_t, ar1 or none
+    noise_sigma: float = 2.0
+    missing_rate: float = 0.0  # Share of bins returned without a value
+    latency_ms: float = Field(default=0.0, ge=0.0, le=MAX_SYNTHETIC_LATENCY_MS)  # Delay before each point
+    latency_jitter_ms: float = Field(default=0.0, ge=0.0, le=MAX_SYNTHETIC_LATENCY_MS)  # Mean of extra exponential delay per point
+    delta: float = 8.0  # Jump at the border
+    seed: Optional[int] = None  # Defaults to a hash of the geometry
 
 
 class AnalyzeRequest(BaseModel):
@@ -28,8 +81,61 @@ class AnalyzeRequest(BaseModel):
     feature_collection: Optional[dict[str, Any]] = Field(default=None, alias="featureCollection")
     policy: Optional[str] = None
     year: Optional[int] = None  # Year for AlphaEarth analysis, defaults to latest available
+    mode: Optional[str] = None  # SRD sampling engine (see services.analyze.SRD_MODES), defaults to SRD_DEFAULT_MODE ("batched")
+    start_km: float = -2.0  # Signed distance bin range (negative = outside the polygon)
+    end_km: float = 2.0
+    step_km: float = 0.1
+    bands: Optional[List[str]] = None  # AlphaEarth bands averaged into the activity metric (default A01,A16,A09)
+    concurrency: Optional[int] = None  # "rings" mode: per-ring EE calls in flight (1 = sequential)
+    ordered: bool = True  # "rings" mode: False streams points as they complete, tagged with bin_index
+    adaptive_threshold: Optional[float] = None  # "adaptive" mode: value jump (0-100 scale) that triggers refinement
+    adaptive_budget: Optional[int] = None  # "adaptive" mode: maximum ring reductions sent to EE
+    placebo_shifts_km: Optional[List[float]] = None  # "placebo" mode: border shifts (positive = inward)
+    synthetic: Optional[SyntheticOptions] = None  # "synthetic" mode workload options
+    stop_tolerance: Optional[float] = None  # Stop once the running impact estimate's 95% CI is narrower than this
+    deadline_s: Optional[float] = None  # Stop sampling after this many seconds and return partial results
+    # Optional inclusive year range for a multi-year panel (replaces `year` when set)
+    year_start: Optional[int] = None
+    year_end: Optional[int] = None
+    # Analyse every feature of `featureCollection` instead of only the first one
+    batch: bool = False
+
+    def panel_years(self) -> Optional[List[int]]:
+        if self.year_start is None and self.year_end is None:
+            return None
+        y1 = self.year_start if self.year_start is not None else self.year_end
+        y2 = self.year_end if self.year_end is not None else self.year_start
+        if y2 < y1:
+            raise ValueError("year_end must be greater than or equal to year_start")
+        if y2 - y1 + 1 > MAX_PANEL_YEARS:
+            raise ValueError(f"Year ranges are limited to {MAX_PANEL_YEARS} years")
+        return list(range(int(y1), int(y2) + 1))
+
+    def geojson_features(self) -> List[tuple[Any, dict[str, Any]]]:
+        """(id, geometry) for every feature in the collection; a single entry otherwise."""
+        if not (self.feature_collection and isinstance(self.feature_collection, dict)):
+            return [(0, self.geojson_geometry())]
+        out: List[tuple[Any, dict[str, Any]]] = []
+        for i, f in enumerate(self.feature_collection.get("features") or []):
+            if not isinstance(f, dict) or not isinstance(f.get("geometry"), dict):
+                continue
+            props = f.get("properties") or {}
+            fid = f.get("id", props.get("id", i) if isinstance(props, dict) else i)
+            try:
+                out.append((fid, canonicalize_geometry(f["geometry"])))
+            except InvalidGeometry as e:
+                raise ValueError(f"Feature {fid!r}: {e}")
+        if not out:
+            raise ValueError("featureCollection has no features with a valid geometry.")
+        if len(out) > MAX_BATCH_FEATURES:
+            raise ValueError(f"Batch analysis is limited to {MAX_BATCH_FEATURES} features per request.")
+        return out
 
     def geojson_geometry(self) -> dict[str, Any]:
+        """The request geometry in canonical form (services.geometry); raises ValueError if unusable."""
+        return canonicalize_geometry(self._raw_geometry())
+
+    def _raw_geometry(self) -> dict[str, Any]:
         g = None
         if self.geometry:
             g = self.geometry
@@ -62,6 +168,7 @@ class AnalysisPoint(BaseModel):
     distance_km: float
     value: Optional[float] = None
     count: Optional[int] = None
+    width_km: Optional[float] = None  # Set for variable-width ("adaptive") bins
 
 
 class AnalyzeResponse(BaseModel):
@@ -73,6 +180,40 @@ class AnalyzeResponse(BaseModel):
     x_label: Optional[str] = None
     y_label: Optional[str] = None
     charts: Optional[List[dict[str, Any]]] = None
+    # Multi-year requests: one {"year", "impact_score", "points"} entry per year
+    panel: Optional[List[dict[str, Any]]] = None
+    # Local-linear RD estimate: estimate, std_error, ci_low/ci_high, bandwidth_km (see services.rd_stats)
+    rd: Optional[dict[str, Any]] = None
+    # "placebo" mode: {"shifts_km", "impacts", "p_value"} for the shifted-border permutation test
+    placebo: Optional[dict[str, Any]] = None
+    # Last running impact estimate; "converged" is true when `stop_tolerance` ended the analysis early
+    impact_estimate: Optional[dict[str, Any]] = None
+    # "bands" mode: 64 x bins matrix of band means, and per-band discontinuities ranked by effect size
+    band_profiles: Optional[dict[str, Any]] = None
+    band_discontinuities: Optional[List[dict[str, Any]]] = None
+    # Simplification applied before EE submission: vertex counts, payload bytes, tolerance_m
+    geometry_stats: Optional[dict[str, Any]] = None
+    # Local rings matched to already analysed rings ("reused") vs sent to EE ("queried")
+    ring_reuse: Optional[dict[str, Any]] = None
+    # Set when `deadline_s` cut sampling short: reason, elapsed_s, bins_done, bins_total
+    partial: Optional[dict[str, Any]] = None
+
+
+class FeatureAnalysis(BaseModel):
+    index: int
+    id: Optional[Any] = None
+    impact_score: Optional[float] = None
+    points: List[AnalysisPoint]
+    error: Optional[str] = None
+
+
+class BatchAnalyzeResponse(BaseModel):
+    policy: Optional[str] = None
+    year: int
+    bins: List[float]
+    features: List[FeatureAnalysis]
+    # Set when `deadline_s` cut the batch short: reason, elapsed_s, features_done, features_total
+    partial: Optional[dict[str, Any]] = None
 
 
 class AlphaEarthTilesResponse(BaseModel):
@@ -81,6 +222,8 @@ class AlphaEarthTilesResponse(BaseModel):
     vmin: float
     vmax: float
     template: str
+    # Same layer through the caching backend tile proxy (relative to the API origin)
+    proxy_template: Optional[str] = None
 
 
 def get_allowed_origins() -> list[str]:
@@ -92,7 +235,15 @@ def get_allowed_origins() -> list[str]:
     return [o.strip() for o in raw.split(",") if o.strip()]
 
 
-app = FastAPI(title="Policy Proof Backend", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load EE collection metadata in the background; requests fall back to EE until it is ready
+    start_catalog_refresh()
+    yield
+    stop_catalog_refresh()
+
+
+app = FastAPI(title="Policy Proof Backend", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -108,52 +259,313 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+def _default_alphaearth_year(years_back: int) -> int:
+    """Latest AlphaEarth year from the catalog, else the current year minus `years_back`."""
+    return alphaearth_catalog.latest_year() or (datetime.utcnow().year - years_back)
+
+
+@app.get("/api/ee/catalog")
+def ee_catalog() -> dict[str, Any]:
+    """Available years per EE collection as currently known to the local catalog (null until loaded)."""
+    return {"collections": [c.summary() for c in CATALOGS]}
+
+
 from fastapi.responses import StreamingResponse
 
+# Identical concurrent analyses share one computation (keyed like the result cache)
+analysis_flights: StreamSingleFlight[str] = StreamSingleFlight()
+
+
+def _broadcast(text: str) -> None:
+    try:
+        anyio.from_thread.run(ws_manager.broadcast_json, {"type": "message", "from": "analysis", "message": text})
+    except Exception:
+        # best-effort
+        pass
+
+
+class CancellableStreamingResponse(StreamingResponse):
+    """
+    NDJSON response over a sync iterator that stops the work behind it when the client
+    disconnects. Items are pulled in a worker thread while the receive channel is watched
+    for `http.disconnect`. On disconnect the pending pull is abandoned, `on_disconnect`
+    runs at once, and the iterator is closed as soon as its current item is done (a
+    generator cannot be closed while another thread is inside it), which ends the
+    analysis generator and drops its queued EE calls.
+    """
+
+    def __init__(self, stream: Iterator[str], on_disconnect: Optional[Callable[[], None]] = None) -> None:
+        self._stream = stream
+        self._on_disconnect = on_disconnect
+        self._lock = threading.Lock()
+        self._finished = False
+        super().__init__(self._body(), media_type="application/x-ndjson")
+
+    def _step(self) -> Optional[str]:
+        with self._lock:
+            return next(self._stream, None)
+
+    def _close(self) -> None:
+        with self._lock:
+            close = getattr(self._stream, "close", None)
+            if close is None:
+                return
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing stream after disconnect: {e}")
+
+    async def _body(self):
+        while True:
+            chunk = await anyio.to_thread.run_sync(self._step, abandon_on_cancel=True)
+            if chunk is None:
+                self._finished = True
+                return
+            yield chunk
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        async with anyio.create_task_group() as tg:
+
+            async def stream() -> None:
+                try:
+                    await self.stream_response(send)
+                except OSError:
+                    pass
+                tg.cancel_scope.cancel()
+
+            async def watch() -> None:
+                while (await receive())["type"] != "http.disconnect":
+                    pass
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(stream)
+            tg.start_soon(watch)
+        if not self._finished:
+            print("Client disconnected; cancelling analysis stream")
+            if self._on_disconnect is not None:
+                self._on_disconnect()
+            threading.Thread(target=self._close, daemon=True).start()
+
+
+def _stream_analysis(
+    cache_key: str,
+    generate: Callable[[], Iterator[str]],
+    state: dict[str, Any],
+    label: str,
+    cancel: Optional[CancelToken] = None,
+    exclusive: bool = False,
+) -> StreamingResponse:
+    """
+    Serve an NDJSON analysis stream: replay it from the result cache, join an identical
+    in-flight computation, or start `generate()`. The recorded stream is cached once
+    `state["complete"]` is set by the generator. `cancel` is cancelled when every
+    subscriber of the computation has disconnected.
+
+    `exclusive` requests (their own deadline, see _own_deadline) are not coalesced: a shared
+    computation runs under its first subscriber's token, so they would inherit its deadline.
+    Everyone else has DEFAULT_DEADLINE_S, so a joiner only finds that clock already running.
+    """
+    cached = srd_result_cache.get(cache_key)
+    if cached is not None:
+        def replay():
+            _broadcast(f"Replaying cached {label} ({len(cached)} events).")
+            for line in cached:
+                if line.startswith(_TILES_EVENT_PREFIX):
+                    line = _fresh_tiles_event(line)
+                    if line is None:
+                        continue
+                yield line
+
+        return CancellableStreamingResponse(replay())
+
+    def record(lines: Iterable[str]):
+        recorded: List[str] = []
+        for line in lines:
+            # The tiles event's map-id URL expires long before cached results do; keep only its layer
+            recorded.append(_strip_tiles_template(line) if line.startswith(_TILES_EVENT_PREFIX) else line)
+            yield line
+        if state["complete"]:
+            srd_result_cache.put(cache_key, recorded)
+
+    if exclusive:
+        return CancellableStreamingResponse(
+            record(generate()), on_disconnect=lambda: cancel.cancel("client disconnected")
+        )
+
+    if analysis_flights.in_flight(cache_key):
+        _broadcast(f"Joining in-flight {label}.")
+    on_abandon = (lambda: cancel.cancel("client disconnected")) if cancel is not None else None
+    stream = analysis_flights.subscribe(cache_key, lambda: record(generate()), on_abandon=on_abandon)
+    # Leaving the flight (closing `stream`) cancels the work only if nobody else is subscribed.
+    # Joiners' own tokens go unused; without a deadline only disconnecting can cancel them.
+    return CancellableStreamingResponse(stream)
+
+
+_TILES_EVENT_PREFIX = '{"tiles": '
+
+
+def _strip_tiles_template(line: str) -> str:
+    event = json.loads(line)
+    event["tiles"].pop("template", None)
+    return json.dumps(event) + "\n"
+
+
+def _fresh_tiles_event(line: str) -> Optional[str]:
+    """A recorded tiles event with a current template (via tile_template_cache); None if EE fails."""
+    tiles = json.loads(line)["tiles"]
+    try:
+        template, used_bands, mn, mx = alphaearth_tile_template(
+            tiles["year"], bands=tiles["bands"], vmin=tiles["vmin"], vmax=tiles["vmax"]
+        )
+    except Exception as e:
+        print(f"Could not refresh AlphaEarth tiles for cached analysis: {e}")
+        return None
+    return json.dumps({"tiles": {"year": int(tiles["year"]), "bands": used_bands, "vmin": float(mn), "vmax": float(mx), "template": template}}) + "\n"
+
+
+def _check_bin_spec(req: AnalyzeRequest) -> None:
+    """400 unless start/end/step describe between 1 and MAX_BINS bins (the count _bin_edges yields)."""
+    if req.step_km <= 0 or req.end_km <= req.start_km:
+        raise HTTPException(status_code=400, detail="Invalid bin spec: require step_km > 0 and end_km > start_km")
+    n_bins = int((req.end_km - req.start_km) / req.step_km) + 1
+    if n_bins > MAX_BINS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bin spec gives {n_bins} bins; at most {MAX_BINS} are allowed (increase step_km or narrow the range)",
+        )
+
+
+def _cancel_token(req: AnalyzeRequest) -> CancelToken:
+    """Cancel token for one analysis request, carrying its (or the default) deadline."""
+    deadline_s = req.deadline_s if req.deadline_s is not None else DEFAULT_DEADLINE_S
+    if deadline_s < 0 or deadline_s > MAX_DEADLINE_S:
+        raise HTTPException(status_code=400, detail=f"deadline_s must be between 0 and {MAX_DEADLINE_S:g} seconds")
+    return CancelToken(deadline_s or None)
+
+
+def _own_deadline(req: AnalyzeRequest) -> bool:
+    """Whether the request set a deadline other than the default (it then runs on its own)."""
+    return req.deadline_s is not None and req.deadline_s != DEFAULT_DEADLINE_S
+
+
 @app.post("/api/analyze")
 def analyze(req: AnalyzeRequest) -> StreamingResponse:
-    geom = req.geojson_geometry()
-    year = req.year if req.year is not None else (datetime.utcnow().year - 2)
+    if req.batch:
+        return analyze_batch(req)
+    try:
+        geom = req.geojson_geometry()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        years = req.panel_years()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    year = years[-1] if years else (req.year if req.year is not None else _default_alphaearth_year(2))
+    # Panels fall back to "batched" when the configured default has no panel variant
+    mode = req.mode or (DEFAULT_SRD_MODE if not years or DEFAULT_SRD_MODE in PANEL_MODES else "batched")
+    if mode not in SRD_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode {mode!r}; expected one of {list(SRD_MODES)}")
+    if years and mode not in PANEL_MODES:
+        raise HTTPException(status_code=400, detail=f"Year ranges require mode in {list(PANEL_MODES)}")
+    _check_bin_spec(req)
+
+    if mode == "synthetic" and req.synthetic is not None:
+        opts = req.synthetic
+        if opts.noise not in NOISE_MODELS:
+            raise HTTPException(status_code=400, detail=f"Unsupported noise model {opts.noise!r}; expected one of {list(NOISE_MODELS)}")
+        if opts.n_bins is not None and not 1 <= opts.n_bins <= MAX_SYNTHETIC_BINS:
+            raise HTTPException(status_code=400, detail=f"n_bins must be between 1 and {MAX_SYNTHETIC_BINS}")
+        if not 0.0 <= opts.missing_rate < 1.0:
+            raise HTTPException(status_code=400, detail="missing_rate must be in [0, 1)")
+    if req.stop_tolerance is not None and req.stop_tolerance <= 0:
+        raise HTTPException(status_code=400, detail="stop_tolerance must be positive")
+    cancel = _cancel_token(req)
+    if req.placebo_shifts_km is not None and (
+        len(req.placebo_shifts_km) > MAX_PLACEBO_SHIFTS or any(abs(s) > MAX_PLACEBO_SHIFT_KM for s in req.placebo_shifts_km)
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"placebo_shifts_km allows up to {MAX_PLACEBO_SHIFTS} shifts of at most {MAX_PLACEBO_SHIFT_KM} km",
+        )
+
+    cache_key = srd_cache_key(
+        geom, year, mode, req.start_km, req.end_km, req.step_km, req.bands, extra={
+            "ordered": req.ordered,
+            "years": years,
+            "adaptive": [req.adaptive_threshold, req.adaptive_budget] if mode == "adaptive" else None,
+            "placebo": req.placebo_shifts_km if mode == "placebo" else None,
+            "stop_tolerance": req.stop_tolerance,
+        },
+    )
+    # Set once the real (non-mock) analysis has emitted its final response
+    state = {"complete": False}
 
     def generate():
-        def _broadcast(text: str) -> None:
-            try:
-                anyio.from_thread.run(ws_manager.broadcast_json, {"type": "message", "from": "analysis", "message": text})
-            except Exception:
-                # best-effort
-                pass
         try:
-            gen = run_real_srd_analysis(geom, year)
-            print(f"Using real AlphaEarth analysis for year {year}")
-            _broadcast(f"Starting SRD analysis for year {year} using real AlphaEarth data.")
-            # Prepare simulation-specific AlphaEarth tiles and emit as an event
-            try:
-                seed_material = json.dumps(geom, sort_keys=True, separators=(",", ":"))
-                h = hashlib.sha1(f"{seed_material}|{year}".encode("utf-8")).hexdigest()
-                hv = int(h[:8], 16)
-                base_bands = ["A01", "A16", "A09"]
-                rot = hv % len(base_bands)
-                used_bands_input = base_bands[rot:] + base_bands[:rot]
-                dv = ((hv % 7) - 3) * 0.01
-                dw = (((hv >> 3) % 5) - 2) * 0.005
-                vmin_in = -0.3 + dv - dw
-                vmax_in = 0.3 + dv + dw
-                template, used_bands, mn, mx = alphaearth_tile_template(
+            if years:
+                gen = run_real_srd_panel_analysis(
+                    geom,
+                    years,
+                    mode=mode,
+                    start_km=req.start_km,
+                    end_km=req.end_km,
+                    step_km=req.step_km,
+                    bands=req.bands,
+                )
+                print(f"Using real AlphaEarth panel analysis for years {years[0]}-{years[-1]}")
+                _broadcast(f"Starting SRD panel analysis for years {years[0]}-{years[-1]} using real AlphaEarth data.")
+            else:
+                gen = run_real_srd_analysis(
+                    geom,
                     year,
-                    bands=used_bands_input,
-                    vmin=vmin_in,
-                    vmax=vmax_in,
+                    mode=mode,
+                    start_km=req.start_km,
+                    end_km=req.end_km,
+                    step_km=req.step_km,
+                    bands=req.bands,
+                    ordered=req.ordered,
+                    concurrency=req.concurrency,
+                    adaptive_threshold=req.adaptive_threshold,
+                    adaptive_budget=req.adaptive_budget,
+                    placebo_shifts_km=req.placebo_shifts_km,
+                    stop_tolerance=req.stop_tolerance,
+                    synthetic=req.synthetic.dict() if req.synthetic else None,
+                    cancel=cancel,
                 )
+                if mode == "synthetic":
+                    _broadcast("Starting synthetic SRD analysis (no Earth Engine).")
+                else:
+                    print(f"Using real AlphaEarth analysis for year {year}")
+                    _broadcast(f"Starting SRD analysis for year {year} using real AlphaEarth data.")
+            # Prepare simulation-specific AlphaEarth tiles and emit as an event (none for synthetic runs)
+            if mode != "synthetic":
                 try:
-                    _broadcast(f"Prepared AlphaEarth tiles for {year} with bands={used_bands} vmin={mn:.3f} vmax={mx:.3f}")
-                except Exception:
-                    pass
-                yield json.dumps({"tiles": {"year": int(year), "bands": used_bands, "vmin": float(mn), "vmax": float(mx), "template": template}}) + "\n"
-            except Exception as e_tiles:
-                try:
-                    _broadcast(f"Failed to prepare AlphaEarth tiles: {e_tiles}")
-                except Exception:
-                    pass
+                    seed_material = json.dumps(geom, sort_keys=True, separators=(",", ":"))
+                    h = hashlib.sha1(f"{seed_material}|{year}".encode("utf-8")).hexdigest()
+                    hv = int(h[:8], 16)
+                    base_bands = ["A01", "A16", "A09"]
+                    rot = hv % len(base_bands)
+                    used_bands_input = base_bands[rot:] + base_bands[:rot]
+                    dv = ((hv % 7) - 3) * 0.01
+                    dw = (((hv >> 3) % 5) - 2) * 0.005
+                    vmin_in = -0.3 + dv - dw
+                    vmax_in = 0.3 + dv + dw
+                    template, used_bands, mn, mx = alphaearth_tile_template(
+                        year,
+                        bands=used_bands_input,
+                        vmin=vmin_in,
+                        vmax=vmax_in,
+                    )
+                    try:
+                        _broadcast(f"Prepared AlphaEarth tiles for {year} with bands={used_bands} vmin={mn:.3f} vmax={mx:.3f}")
+                    except Exception:
+                        pass
+                    yield json.dumps({"tiles": {"year": int(year), "bands": used_bands, "vmin": float(mn), "vmax": float(mx), "template": template}}) + "\n"
+                except Exception as e_tiles:
+                    try:
+                        _broadcast(f"Failed to prepare AlphaEarth tiles: {e_tiles}")
+                    except Exception:
+                        pass
         except Exception as e:
             print(f"Earth Engine analysis failed ({e}), falling back to mock data")
             _broadcast(f"Earth Engine analysis failed ({e}); falling back to mock data.")
@@ -168,6 +580,17 @@ def analyze(req: AnalyzeRequest) -> StreamingResponse:
         points = []
         bins = None
         impact_score = None
+        # Multi-year panels: year-tagged points and per-year scores
+        panel_points: dict[int, list] = {}
+        impact_by_year: Optional[dict[str, Any]] = None
+        rd = None
+        placebo = None
+        impact_estimate = None
+        geometry_stats = None
+        ring_reuse = None
+        partial = None
+        band_profiles = None
+        band_discontinuities = None
 
         for item in gen:
             if "bins" in item:
@@ -180,23 +603,99 @@ def analyze(req: AnalyzeRequest) -> StreamingResponse:
                 except Exception:
                     pass
             elif "point" in item:
-                points.append(item["point"])
+                pt_year = item["point"].get("year")
+                if pt_year is not None:
+                    panel_points.setdefault(int(pt_year), []).append(item["point"])
+                else:
+                    points.append(item["point"])
                 try:
                     pt = item["point"]
                     val = pt.get("value")
                     val_str = "N/A" if val is None else f"{val:.2f}"
-                    _broadcast(f"Year {year} | Dist {pt.get('distance_km', 0):+.2f}km | Value {val_str}")
+                    _broadcast(f"Year {pt_year or year} | Dist {pt.get('distance_km', 0):+.2f}km | Value {val_str}")
+                except Exception:
+                    pass
+                yield json.dumps(item) + "\n"
+            elif "impact_by_year" in item:
+                impact_by_year = item["impact_by_year"]
+                yield json.dumps(item) + "\n"
+            elif "geometry_stats" in item:
+                geometry_stats = item["geometry_stats"]
+                try:
+                    _broadcast(
+                        f"Geometry: {geometry_stats['vertices_before']} -> {geometry_stats['vertices_after']} vertices, "
+                        f"{geometry_stats['bytes_before']} -> {geometry_stats['bytes_after']} bytes"
+                    )
+                except Exception:
+                    pass
+                yield json.dumps(item) + "\n"
+            elif "partial" in item:
+                partial = item["partial"]
+                try:
+                    _broadcast(
+                        f"Deadline reached after {partial['elapsed_s']:.1f}s; "
+                        f"summarising {partial['bins_done']}/{partial['bins_total']} bins."
+                    )
+                except Exception:
+                    pass
+                yield json.dumps(item) + "\n"
+            elif "ring_reuse" in item:
+                ring_reuse = item["ring_reuse"]
+                try:
+                    if ring_reuse["reused"]:
+                        _broadcast(f"Reusing {ring_reuse['reused']} previously analysed rings; querying {ring_reuse['queried']}.")
+                except Exception:
+                    pass
+                yield json.dumps(item) + "\n"
+            elif "impact_estimate" in item:
+                impact_estimate = item["impact_estimate"]
+                yield json.dumps(item) + "\n"
+            elif "band_profiles" in item:
+                band_profiles = item["band_profiles"]
+                yield json.dumps(item) + "\n"
+            elif "band_discontinuities" in item:
+                band_discontinuities = item["band_discontinuities"]
+                try:
+                    top = ", ".join(f"{r['band']} ({r['effect_size']})" for r in band_discontinuities[:3])
+                    _broadcast(f"Largest per-band discontinuities: {top}")
+                except Exception:
+                    pass
+                yield json.dumps(item) + "\n"
+            elif "placebo" in item:
+                placebo = item["placebo"]
+                try:
+                    _broadcast(f"Placebo borders: permutation p-value {placebo.get('p_value')}")
                 except Exception:
                     pass
                 yield json.dumps(item) + "\n"
+            elif "rd" in item:
+                rd = item["rd"]
             elif "impact_score" in item:
                 impact_score = item["impact_score"]
                 try:
                     _broadcast(f"Impact Score: {float(impact_score):.3f}")
                 except Exception:
                     pass
+            elif "error" in item:
+                # The analysis could not be scored (e.g. too few bins with data): no final response
+                try:
+                    _broadcast(f"Analysis failed: {item['error']}")
+                except Exception:
+                    pass
+                yield json.dumps(item) + "\n"
+
+        panel = None
+        if panel_points:
+            panel = [
+                {"year": y, "impact_score": (impact_by_year or {}).get(str(y)), "points": pts}
+                for y, pts in sorted(panel_points.items())
+            ]
+            # The headline profile is the last year of the range
+            points = list(panel_points.get(year, panel[-1]["points"]))
 
         if bins is not None and impact_score is not None:
+            # Out-of-order streams still get a distance-sorted final profile
+            points.sort(key=lambda p: p.get("distance_km", 0))
             # Default chart metadata
             x_label = "Distance from border (km)"
             y_label = "Activity (normalized, 0–100)"
@@ -219,13 +718,31 @@ def analyze(req: AnalyzeRequest) -> StreamingResponse:
             except Exception:
                 count_series = []
 
+            if panel:
+                try:
+                    activity_by_year = [
+                        {
+                            "name": f"Activity mean {entry['year']}",
+                            "points": [
+                                {"x": float(p.get("distance_km")), "y": float(p["value"])}
+                                for p in entry["points"]
+                                if p.get("value") is not None
+                            ],
+                        }
+                        for entry in panel
+                    ]
+                except Exception:
+                    activity_by_year = None
+            else:
+                activity_by_year = None
+
             charts = [
                 {
                     "id": "activity",
                     "title": "Activity vs Distance",
                     "x_label": x_label,
                     "y_label": y_label,
-                    "series": [{"name": "Activity mean", "points": activity_series}],
+                    "series": activity_by_year or [{"name": "Activity mean", "points": activity_series}],
                 },
                 {
                     "id": "count",
@@ -245,14 +762,116 @@ def analyze(req: AnalyzeRequest) -> StreamingResponse:
                 x_label=x_label,
                 y_label=y_label,
                 charts=charts,
+                panel=panel,
+                rd=rd,
+                placebo=placebo,
+                impact_estimate=impact_estimate,
+                band_profiles=band_profiles,
+                band_discontinuities=band_discontinuities,
+                geometry_stats=geometry_stats,
+                ring_reuse=ring_reuse,
+                partial=partial,
             ).dict()
             yield json.dumps(final) + "\n"
+            # Deadline-truncated results are not cached
+            state["complete"] = partial is None
             try:
                 _broadcast("Analysis complete.")
             except Exception:
                 pass
 
-    return StreamingResponse(generate(), media_type="application/x-ndjson")
+    if mode == "synthetic":
+        # Load-test workloads always run the full pipeline: no result cache, no coalescing
+        return CancellableStreamingResponse(generate(), on_disconnect=lambda: cancel.cancel("client disconnected"))
+    return _stream_analysis(cache_key, generate, state, f"SRD analysis for year {year}", cancel, _own_deadline(req))
+
+
+def analyze_batch(req: AnalyzeRequest) -> StreamingResponse:
+    """
+    Batch SRD over every feature of a FeatureCollection. Streams one
+    {"feature": {...}} event per feature as its chunk completes, then a BatchAnalyzeResponse.
+    """
+    try:
+        features = req.geojson_features()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    year = req.year if req.year is not None else _default_alphaearth_year(2)
+    if (req.mode or "batched") != "batched":
+        raise HTTPException(status_code=400, detail='Batch analysis requires mode "batched"')
+    _check_bin_spec(req)
+    cancel = _cancel_token(req)
+
+    cache_key = srd_cache_key(
+        {"features": features}, year, "batch", req.start_km, req.end_km, req.step_km, req.bands
+    )
+    state = {"complete": False}
+
+    def generate():
+        results: List[dict[str, Any]] = []
+        bins: Optional[List[float]] = None
+        real = True
+        _broadcast(f"Starting batch SRD analysis of {len(features)} features for year {year}.")
+        try:
+            for item in run_real_srd_batch_analysis(
+                features,
+                year,
+                start_km=req.start_km,
+                end_km=req.end_km,
+                step_km=req.step_km,
+                bands=req.bands,
+                cancel=cancel,
+            ):
+                if "bins" in item:
+                    bins = item["bins"]
+                elif "feature" in item:
+                    feat = item["feature"]
+                    results.append(feat)
+                    score = feat.get("impact_score")
+                    score_str = "N/A" if score is None else f"{score:.3f}"
+                    _broadcast(f"Feature {feat.get('id')} ({len(results)}/{len(features)}) | Impact Score {score_str}")
+                    yield json.dumps(item) + "\n"
+        except Exception as e:
+            if results:
+                # Keep what already streamed; report the rest as failed
+                print(f"Batch analysis interrupted ({e})")
+                real = False
+            else:
+                print(f"Earth Engine batch analysis failed ({e}), falling back to mock data")
+                _broadcast(f"Earth Engine batch analysis failed ({e}); falling back to mock data.")
+                real = False
+                for idx, (fid, g) in enumerate(features):
+                    mock = run_mock_srd_analysis(g)
+                    bins = bins or mock["bins"]
+                    feat = {"index": idx, "id": fid, "points": mock["points"], "impact_score": mock["impact_score"], "error": None}
+                    results.append(feat)
+                    yield json.dumps({"feature": feat}) + "\n"
+
+        partial = None
+        if cancel.expired and not cancel.cancelled and len(results) < len(features):
+            partial = {
+                "reason": "deadline",
+                "elapsed_s": round(cancel.elapsed(), 3),
+                "features_done": len(results),
+                "features_total": len(features),
+            }
+            _broadcast(f"Deadline reached after {partial['elapsed_s']:.1f}s; {len(results)}/{len(features)} features analysed.")
+        done = {r["index"] for r in results}
+        for idx, (fid, _) in enumerate(features):
+            if idx not in done:
+                error = "deadline exceeded" if partial else "not analysed"
+                results.append({"index": idx, "id": fid, "points": [], "impact_score": None, "error": error})
+        final = BatchAnalyzeResponse(
+            policy=req.policy,
+            year=int(year),
+            bins=bins or [],
+            features=sorted(results, key=lambda r: r["index"]),
+            partial=partial,
+        ).dict()
+        yield json.dumps(final) + "\n"
+        state["complete"] = real and partial is None
+        _broadcast(f"Batch analysis complete ({len(features)} features).")
+
+    return _stream_analysis(cache_key, generate, state, f"batch SRD analysis for year {year}", cancel, _own_deadline(req))
 
 
 @app.get("/api/ee/alphaearth/tiles", response_model=AlphaEarthTilesResponse)
@@ -272,7 +891,7 @@ def ee_alphaearth_tiles(
     - bands: comma-separated bands (default A01,A16,A09)
     - tweak: optional string token to deterministically perturb RGB (used to make per-analysis simulations visually distinct)
     """
-    y = year if year is not None else (datetime.utcnow().year - 1)
+    y = year if year is not None else _default_alphaearth_year(1)
     bands_list = [b.strip() for b in bands.split(",")] if bands else None
     if tweak:
         # Deterministically perturb bands and vmin/vmax from a tweak token (e.g., analysis-specific seed)
@@ -298,8 +917,130 @@ def ee_alphaearth_tiles(
         vmin=vmin_in,
         vmax=vmax_in,
     )
+    proxy_template = (
+        f"/api/tiles/alphaearth/{y}/{{z}}/{{x}}/{{y}}.png?bands={','.join(used_bands)}&vmin={mn:g}&vmax={mx:g}"
+    )
     return AlphaEarthTilesResponse(
-        year=y, bands=used_bands, vmin=mn, vmax=mx, template=template
+        year=y, bands=used_bands, vmin=mn, vmax=mx, template=template, proxy_template=proxy_template
+    )
+
+
+TILE_CACHE_CONTROL = "public, max-age=86400"
+
+
+@app.get("/api/tiles/alphaearth/{year}/{z}/{x}/{y}.png")
+def alphaearth_tile(
+    year: int,
+    z: int,
+    x: int,
+    y: int,
+    bands: Optional[str] = Query(default=None, description="Comma-separated bands like A01,A16,A09"),
+    vmin: float = -0.3,
+    vmax: float = 0.3,
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    """
+    One AlphaEarth XYZ tile through the caching tile proxy (services.tile_proxy). Tiles are
+    keyed by year, bands, vmin/vmax and z/x/y, served from memory or disk when cached and
+    fetched once from the EE template otherwise. Supports If-None-Match / 304.
+    """
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail=f"Invalid tile {z}/{x}/{y}")
+    used_bands = [b.strip() for b in bands.split(",") if b.strip()] if bands else ["A01", "A16", "A09"]
+    layer = {"layer": "alphaearth", "year": int(year), "bands": ",".join(used_bands), "vmin": float(vmin), "vmax": float(vmax)}
+    try:
+        data, content_type, etag = tile_proxy.get(
+            layer, z, x, y, lambda: alphaearth_tile_template(year, bands=used_bands, vmin=vmin, vmax=vmax)[0]
+        )
+    except TileFetchError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _tile_response(data, content_type, etag, if_none_match)
+
+
+def _tile_response(data: bytes, content_type: str, etag: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": TILE_CACHE_CONTROL}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=content_type, headers=headers)
+
+
+def _local_tile(z: int, x: int, y: int, render: Callable[[], Optional[bytes]], if_none_match: Optional[str]) -> Response:
+    """Serve a locally rendered tile; tiles without data are a transparent PNG."""
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail=f"Invalid tile {z}/{x}/{y}")
+    try:
+        data = render() or blank_tile_png()
+    except LocalTileNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _tile_response(data, "image/png", tile_etag(data), if_none_match)
+
+
+@app.get("/api/tiles/local")
+def local_tiles_summary() -> dict:
+    """Local embedding rasters and stored learned models available for NumPy-rendered tiles."""
+    return local_tile_renderer.summary()
+
+
+@app.get("/api/tiles/local/{name}/{z}/{x}/{y}.png")
+def local_rgb_tile(
+    name: str,
+    z: int,
+    x: int,
+    y: int,
+    bands: Optional[str] = Query(default=None, description="Comma-separated bands like A01,A16,A09"),
+    vmin: float = -0.3,
+    vmax: float = 0.3,
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    """
+    AlphaEarth RGB tile rendered locally from the stored embedding raster `name`
+    (services.local_tiles), stretched like /api/tiles/alphaearth. No Earth Engine calls.
+    """
+    used_bands = [b.strip() for b in bands.split(",") if b.strip()] if bands else ["A01", "A16", "A09"]
+    return _local_tile(
+        z, x, y, lambda: local_tile_renderer.render_rgb(name, z, x, y, used_bands, vmin, vmax), if_none_match
+    )
+
+
+@app.get("/api/tiles/local/{name}/band/{band}/{z}/{x}/{y}.png")
+def local_band_tile(
+    name: str,
+    band: str,
+    z: int,
+    x: int,
+    y: int,
+    vmin: float = -30.0,
+    vmax: float = 30.0,
+    palette: str = Query(default="temperature", description="temperature or difference (the EE climate palettes)"),
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    """One band of a local raster (e.g. an exported climate grid) through a climate palette."""
+    return _local_tile(
+        z, x, y, lambda: local_tile_renderer.render_band(name, z, x, y, band, vmin, vmax, palette), if_none_match
+    )
+
+
+@app.get("/api/tiles/local/{name}/learned/{model_id}/{z}/{x}/{y}.png")
+def local_learned_tile(
+    name: str,
+    model_id: str,
+    z: int,
+    x: int,
+    y: int,
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    """
+    Learned embedding -> temperature prediction rendered locally from the stored
+    coefficients `model_id` (see /api/ee/alphaearth/learn/coefficients).
+    """
+    return _local_tile(
+        z, x, y, lambda: local_tile_renderer.render_learned(name, model_id, z, x, y, vmin, vmax), if_none_match
     )
 
 
@@ -400,12 +1141,13 @@ def ee_alphaearth_learn_tiles(
     - vmin/vmax: visualization range (°C)
     - scale: sampling scale for regression fit (meters)
     """
-    y = year if year is not None else (datetime.utcnow().year - 1)
+    y = year if year is not None else _default_alphaearth_year(1)
     bands_list = [b.strip() for b in bands.split(",")] if bands else None
     try:
+        geometry = canonicalize_geometry(req.geometry) if req.geometry else None
         template, used_bands, mn, mx = alphaearth_learned_tile_template(
             year=y,
-            geometry=(req.geometry or None),
+            geometry=geometry,
             target=(target or "t2m"),
             bands=bands_list,
             scale=scale or 1000,
@@ -424,6 +1166,56 @@ def ee_alphaearth_learn_tiles(
         template=template,
     )
 
+
+class AlphaEarthLearnedCoefficientsResponse(BaseModel):
+    model_id: str
+    year: int
+    target: str
+    bands: List[str]
+    coefficients: List[float]
+    vmin: float
+    vmax: float
+    local_template: str
+
+
+@app.post("/api/ee/alphaearth/learn/coefficients", response_model=AlphaEarthLearnedCoefficientsResponse)
+def ee_alphaearth_learn_coefficients(
+    req: AlphaEarthLearnedTilesRequest,
+    raster: Optional[str] = Query(default=None, description="Local raster for local_template (left as {raster} if omitted)"),
+    target: Optional[str] = Query(default="t2m", description="t2m or lst_day"),
+    year: Optional[int] = None,
+    bands: Optional[str] = Query(default=None, description="Comma-separated bands like A01,A16,A09; default is all A00..A63"),
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+    scale: Optional[int] = Query(default=1000, description="Regression sample scale in meters (default 1000)"),
+) -> AlphaEarthLearnedCoefficientsResponse:
+    """
+    Fit the same regression as /api/ee/alphaearth/learn/tiles, store its coefficients and
+    return a template rendering the prediction locally from the embedding raster `raster`
+    (one EE fit, then no EE calls per tile).
+    """
+    y = year if year is not None else _default_alphaearth_year(1)
+    bands_list = [b.strip() for b in bands.split(",")] if bands else None
+    try:
+        geometry = canonicalize_geometry(req.geometry) if req.geometry else None
+        model = alphaearth_learned_coefficients(
+            year=y,
+            geometry=geometry,
+            target=(target or "t2m"),
+            bands=bands_list,
+            scale=scale or 1000,
+            vmin=vmin,
+            vmax=vmax,
+        )
+        model_id = local_tile_renderer.save_model(model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AlphaEarthLearnedCoefficientsResponse(
+        model_id=model_id,
+        local_template=f"/api/tiles/local/{raster or '{raster}'}/learned/{model_id}/{{z}}/{{x}}/{{y}}.png",
+        **model,
+    )
+
 # Request model for LaTeX generation (superset of AnalyzeResponse) and endpoint
 class AnalyzeLatexRequest(BaseModel):
     policy: Optional[str] = None
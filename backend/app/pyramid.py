@@ -0,0 +1,233 @@
+"""
+AlphaEarth tile pyramid pre-generation.
+
+Renders RGB tiles for a year, bounding box and zoom range into the layout the frontend
+serves statically (frontend/app/api/tiles/[year]/[z]/[x]/[y]/route.js):
+  frontend/public/alphaearth/{year}/{z}/{x}/{y}.png
+
+Tiles are rendered across a process pool. Existing tiles are skipped, so an interrupted
+run resumes where it stopped (files are written atomically, so a tile either exists
+complete or not at all). Tiles without data are not written; the frontend shows its
+placeholder for them. Bands and vmin/vmax follow alphaearth_tile_template.
+
+Usage (from ./backend):
+  python -m app.pyramid --year 2023 --bbox=-122.6,37.6,-122.3,37.9 --zooms 8-13
+  python -m app.pyramid --year 2023 --bbox=... --source raster:/data/sf_2023.npy   # no Earth Engine
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import sys
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .services.tiles import (
+    EmbeddingRaster,
+    TILE_SIZE,
+    build_overviews,
+    encode_png,
+    render_rgb_tile,
+    tile_bounds,
+    tiles_for_bbox,
+    write_tile_atomic,
+)
+
+
+Tile = Tuple[int, int, int]
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "public", "alphaearth")
+DEFAULT_BANDS = ["A01", "A16", "A09"]
+MAX_PYRAMID_TILES = 200_000  # Refuse runs larger than this unless --max-tiles is raised
+_THUMB_TIMEOUT_S = 60.0
+
+
+# --- Sources -----------------------------------------------------------------------------------
+# A source is a callable (year, z, x, y, bands, vmin, vmax) -> PNG bytes, or None for a tile
+# without data. Sources are built once per worker process.
+
+def _ee_source() -> Callable[..., Optional[bytes]]:
+    """EE thumbnails of the AlphaEarth image, one getThumbURL per tile in Web Mercator."""
+    import ee
+
+    from .services.ee_alphaearth import _ensure_initialized, alphaearth_image_for_year
+
+    _ensure_initialized()
+    images: Dict[int, Any] = {}
+
+    def render(year: int, z: int, x: int, y: int, bands: List[str], vmin: float, vmax: float) -> Optional[bytes]:
+        if year not in images:
+            images[year] = alphaearth_image_for_year(year)
+        west, south, east, north = tile_bounds(z, x, y)
+        url = images[year].getThumbURL({
+            "bands": bands,
+            "min": vmin,
+            "max": vmax,
+            "region": ee.Geometry.Rectangle([west, south, east, north], None, False),
+            "dimensions": f"{TILE_SIZE}x{TILE_SIZE}",
+            "crs": "EPSG:3857",
+            "format": "png",
+        })
+        with urllib.request.urlopen(url, timeout=_THUMB_TIMEOUT_S) as resp:
+            return resp.read()
+
+    return render
+
+
+def _raster_source(path: str) -> Callable[..., Optional[bytes]]:
+    """A local embedding raster (services.tiles.EmbeddingRaster); the year is not checked."""
+    raster = EmbeddingRaster(path)
+
+    def render(year: int, z: int, x: int, y: int, bands: List[str], vmin: float, vmax: float) -> Optional[bytes]:
+        rgba = render_rgb_tile(raster, z, x, y, bands, vmin, vmax)
+        return encode_png(rgba) if rgba is not None else None
+
+    return render
+
+
+def resolve_source(spec: str) -> Callable[..., Optional[bytes]]:
+    """'ee', 'raster:<path.npy>', or an importable 'package.module:callable' returning a source."""
+    if spec == "ee":
+        return _ee_source()
+    if spec.startswith("raster:"):
+        return _raster_source(spec[len("raster:"):])
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise SystemExit(f"Unknown source {spec!r}; use 'ee', 'raster:<path>' or 'package.module:callable'.")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+_WORKER_SOURCE: Optional[Callable[..., Optional[bytes]]] = None
+
+
+def _init_worker(spec: str) -> None:
+    global _WORKER_SOURCE
+    _WORKER_SOURCE = resolve_source(spec)
+
+
+def tile_path(out_dir: str, year: int, z: int, x: int, y: int) -> str:
+    return os.path.join(out_dir, str(int(year)), str(z), str(x), f"{y}.png")
+
+
+def _render_chunk(tiles: List[Tile], year: int, bands: List[str], vmin: float, vmax: float, out_dir: str) -> Dict[str, int]:
+    """Worker entry point: render and write one chunk of tiles with the process's source."""
+    stats = {"written": 0, "empty": 0, "failed": 0}
+    for z, x, y in tiles:
+        try:
+            data = _WORKER_SOURCE(year, z, x, y, bands, vmin, vmax)
+        except Exception as e:
+            print(f"Tile {z}/{x}/{y} failed: {e}", file=sys.stderr)
+            stats["failed"] += 1
+            continue
+        if not data:
+            stats["empty"] += 1
+            continue
+        write_tile_atomic(tile_path(out_dir, year, z, x, y), data)
+        stats["written"] += 1
+    return stats
+
+
+def plan_tiles(bbox: Sequence[float], zooms: Sequence[int]) -> List[Tile]:
+    return [t for z in zooms for t in tiles_for_bbox(bbox, z)]
+
+
+def run_pyramid(
+    year: int,
+    bbox: Sequence[float],
+    zooms: Sequence[int],
+    source: str = "ee",
+    out_dir: str = DEFAULT_OUT_DIR,
+    bands: Sequence[str] | None = None,
+    vmin: float = -0.3,
+    vmax: float = 0.3,
+    workers: int = 4,
+    chunk_size: int = 64,
+    overwrite: bool = False,
+    max_tiles: int = MAX_PYRAMID_TILES,
+) -> Dict[str, int]:
+    """Render the pyramid, skipping tiles already on disk unless `overwrite`. Returns counts."""
+    bands = list(bands or DEFAULT_BANDS)
+    tiles = plan_tiles(bbox, zooms)
+    if len(tiles) > max_tiles:
+        raise SystemExit(f"{len(tiles)} tiles planned, more than --max-tiles {max_tiles}; narrow the bbox or zooms.")
+    pending = tiles if overwrite else [t for t in tiles if not os.path.exists(tile_path(out_dir, year, *t))]
+    totals = {"planned": len(tiles), "skipped": len(tiles) - len(pending), "written": 0, "empty": 0, "failed": 0}
+    print(f"{len(tiles)} tiles for zooms {list(zooms)}, {totals['skipped']} already rendered, {len(pending)} to render")
+
+    chunk_size = max(1, int(chunk_size))
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=max(1, int(workers)), initializer=_init_worker, initargs=(source,)) as pool:
+            futures = [pool.submit(_render_chunk, chunk, int(year), bands, float(vmin), float(vmax), out_dir) for chunk in chunks]
+            for fut in as_completed(futures):
+                for k, v in fut.result().items():
+                    totals[k] += v
+                done = totals["written"] + totals["empty"] + totals["failed"]
+                print(f"Rendered {done}/{len(pending)} tiles ({totals['written']} written, {totals['empty']} empty, {totals['failed']} failed)")
+    return totals
+
+
+def _parse_zooms(text: str) -> List[int]:
+    """'5', '3-8' or '3,5,7'."""
+    zooms: List[int] = []
+    for part in text.split(","):
+        lo, _, hi = part.strip().partition("-")
+        zooms.extend(range(int(lo), int(hi or lo) + 1))
+    return sorted(set(zooms))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render AlphaEarth RGB tiles into the frontend tile layout.")
+    parser.add_argument("--year", type=int, default=datetime.utcnow().year - 2)
+    parser.add_argument("--bbox", required=True, help="west,south,east,north in degrees (write --bbox=-122.6,... for negative values)")
+    parser.add_argument("--zooms", default="0-10", help="Zoom levels: '8', '6-12' or '6,8,10'")
+    parser.add_argument("--source", default="ee", help="'ee', 'raster:<path.npy>', or 'package.module:callable'")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="Tile root (default: frontend/public/alphaearth)")
+    parser.add_argument("--bands", default=None, help="Comma-separated RGB bands (default A01,A16,A09)")
+    parser.add_argument("--vmin", type=float, default=-0.3)
+    parser.add_argument("--vmax", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Tiles per worker task")
+    parser.add_argument("--overwrite", action="store_true", help="Re-render tiles that already exist")
+    parser.add_argument("--max-tiles", type=int, default=MAX_PYRAMID_TILES)
+    parser.add_argument("--build-overviews", action="store_true", help="Build overviews of a raster: source first (faster low zooms)")
+    args = parser.parse_args(argv)
+
+    try:
+        bbox = [float(v) for v in args.bbox.split(",")]
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        print("--bbox must be west,south,east,north with west < east and south < north", file=sys.stderr)
+        return 1
+    bands = [b.strip() for b in args.bands.split(",")] if args.bands else DEFAULT_BANDS
+    if len(bands) != 3:
+        print("--bands must list exactly three bands (R,G,B)", file=sys.stderr)
+        return 1
+    if args.build_overviews:
+        if not args.source.startswith("raster:"):
+            print("--build-overviews needs a raster:<path> source", file=sys.stderr)
+            return 1
+        print(f"Overviews built: {build_overviews(args.source[len('raster:'):])}")
+    totals = run_pyramid(
+        args.year,
+        bbox,
+        _parse_zooms(args.zooms),
+        source=args.source,
+        out_dir=args.out_dir,
+        bands=bands,
+        vmin=args.vmin,
+        vmax=args.vmax,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        overwrite=args.overwrite,
+        max_tiles=args.max_tiles,
+    )
+    print(f"Done: {totals}")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
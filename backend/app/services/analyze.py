@@ -1,105 +1,78 @@
 from __future__ import annotations
 
-import json
 import math
-import random
-from typing import Any, Dict, List, Generator
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, List, Generator, Sequence, Tuple
 
+import numpy as np
 
-from .ee_alphaearth import alphaearth_image_for_year, _ensure_initialized
+from .ee_alphaearth import alphaearth_image_for_year, _ensure_initialized, _to_bands_list
+from .ee_alphaearth_learn import _all_alphaearth_bands
+from .cancel import CancelToken
+from .geometry import geometry_hash, simplify_for_scale
+from .rd_stats import OnlineImpact, rd_estimate
+from .ring_index import ring_result_index
+from .rings import local_ring_intervals
+from .synthetic import profile_points, seed_for_geometry, synthetic_profile, synthetic_srd_points
 import ee
 
 
-def run_real_srd_analysis(geometry: Dict[str, Any], year: int = 2023) -> Generator[Dict[str, Any], None, None]:
-    """
-    Perform Spatial Regression Discontinuity analysis using real AlphaEarth satellite data.
-    Yields points progressively, then the impact score at the end.
-    """
-    print(f"Starting real SRD analysis for year {year} with geometry: {geometry}")
-    _ensure_initialized()
-
-    # Define analysis parameters
-    start_km, end_km, step_km = -2.0, 2.0, 0.1
-    bin_edges = [round(start_km + i * step_km, 3) for i in range(int((end_km - start_km) / step_km) + 2)]
+def _bin_edges(start_km: float, end_km: float, step_km: float) -> List[float]:
+    return [round(start_km + i * step_km, 3) for i in range(int((end_km - start_km) / step_km) + 2)]
 
-    yield {"bins": bin_edges[:-1]}  # Bin starts
 
-    # Get AlphaEarth image for the year
-    img = alphaearth_image_for_year(year, geometry)
-    print(f"Selected image info: {img.getInfo()}")
+def _ring_geometry(base_geom: ee.Geometry, low: float, high: float) -> ee.Geometry:
+    """
+    Server-side ring between two signed distances (km) from the border.
+    Negative distances lie outside the polygon, positive distances inside.
+    """
+    if high <= 0:  # Outside (negative)
+        inner = base_geom.buffer(abs(high) * 1000, 50)
+        outer = base_geom.buffer(abs(low) * 1000, 50)
+    else:  # Inside (positive)
+        inner = base_geom.buffer(-high * 1000, 50)
+        outer = base_geom.buffer(-low * 1000, 50)
+    return outer.difference(inner)
 
-    # Aggregate bands into activity metric
-    bands = ["A01", "A16", "A09"]
-    print(f"Selecting bands: {bands}")
-    activity_img = img.select(bands).reduce(ee.Reducer.mean())
-    print(f"Activity image info: {activity_img.getInfo()}")
 
-    base_geom = ee.Geometry(geometry)
-    points = []
-    for i in range(len(bin_edges) - 1):
-        low = bin_edges[i]
-        high = bin_edges[i + 1]
-        mid = round((low + high) / 2, 3)
+def _mean_count_reducer() -> ee.Reducer:
+    return ee.Reducer.mean().combine(ee.Reducer.count(), '', True)
 
-        # Compute band geometry
-        if high <= 0:  # Outside (negative)
-            inner_dist = abs(high) * 1000
-            outer_dist = abs(low) * 1000
-            inner = base_geom.buffer(inner_dist, 50)
-            outer = base_geom.buffer(outer_dist, 50)
-            band_geom = outer.difference(inner)
-        else:  # Inside (positive)
-            inner_dist = high * 1000
-            outer_dist = low * 1000
-            inner = base_geom.buffer(-inner_dist, 50)
-            outer = base_geom.buffer(-outer_dist, 50)
-            band_geom = outer.difference(inner)
-
-        print(f"Sampling for dist {mid}km with geometry: {band_geom.getInfo()}")
-
-        # Sample
-        samples = activity_img.reduceRegion(
-            reducer=ee.Reducer.mean().combine(ee.Reducer.count(), '', True),
-            geometry=band_geom,
-            scale=10,
-            maxPixels=1e9,
-            bestEffort=True
-        ).getInfo()
-        print(f"Raw samples: {samples}")
 
-        try:
-            # Handle both possible key layouts from Earth Engine reducers:
-            # - If the image band is named 'mean', a combined reducer yields 'mean_mean' and 'mean_count'
-            # - Otherwise it may yield plain 'mean' and 'count'
-            raw_value = samples.get("mean")
-            count = samples.get("count")
-            if raw_value is None or count is None:
-                raw_value = samples.get("mean_mean")
-                count = samples.get("mean_count")
-            print(f"Raw mean: {raw_value}, Count: {count}")
-            if not count or raw_value is None:
-                value = None
-            else:
-                normalized_value = (float(raw_value) + 0.3) / 0.6
-                value = round(normalized_value * 100, 2)
-        except Exception as e:
-            print(f"Error processing samples: {e}")
+def _point_from_samples(samples: Dict[str, Any] | None, mid: float) -> Dict[str, Any]:
+    """Turn a mean/count reducer output into a normalized `point` dict."""
+    samples = samples or {}
+    try:
+        # Handle both possible key layouts from Earth Engine reducers:
+        # - If the image band is named 'mean', a combined reducer yields 'mean_mean' and 'mean_count'
+        # - Otherwise it may yield plain 'mean' and 'count'
+        raw_value = samples.get("mean")
+        count = samples.get("count")
+        if raw_value is None or count is None:
+            raw_value = samples.get("mean_mean")
+            count = samples.get("mean_count")
+        if not count or raw_value is None:
             value = None
+        else:
+            normalized_value = (float(raw_value) + 0.3) / 0.6
+            value = round(normalized_value * 100, 2)
+    except Exception as e:
+        print(f"Error processing samples: {e}")
+        value = None
 
-        # Normalize count to int
-        try:
-            c_raw = samples.get("count") or samples.get("mean_count")
-            count_int = int(c_raw) if c_raw is not None else 0
-        except Exception:
-            count_int = 0
+    # Normalize count to int
+    try:
+        c_raw = samples.get("count") or samples.get("mean_count")
+        count_int = int(c_raw) if c_raw is not None else 0
+    except Exception:
+        count_int = 0
 
-        print(f"Year {year} | Dist {mid}km | Value {value} | Count {count_int}")
+    return {"distance_km": mid, "value": value, "count": count_int}
 
-        point = {"distance_km": mid, "value": value, "count": count_int}
-        points.append(point)
-        yield {"point": point}
 
-    # Calculate impact_score
+def _impact_score(points: List[Dict[str, Any]]) -> float:
     valid_points = [p for p in points if p["value"] is not None]
     print(f"Number of valid points: {len(valid_points)}")
     if len(valid_points) < 4:
@@ -111,40 +84,1200 @@ def run_real_srd_analysis(geometry: Dict[str, Any], year: int = 2023) -> Generat
     if near_inside and near_outside:
         inside_mean = sum(near_inside) / len(near_inside)
         outside_mean = sum(near_outside) / len(near_outside)
-        impact_est = inside_mean - outside_mean
-    else:
-        impact_est = 0.0
+        return inside_mean - outside_mean
+    return 0.0
 
-    yield {"impact_score": float(round(impact_est, 3))}
 
+def _interval_rings(
+    geometry: Dict[str, Any],
+    intervals: Sequence[Tuple[float, float]],
+    scale: float = 10,
+    local: bool = True,
+) -> List[ee.Geometry | None]:
+    """
+    Ring geometry per (low_km, high_km) interval. With `local=True` the rings are computed
+    and simplified with shapely in a local metric projection (cached per interval), so EE
+    only receives finished polygons; otherwise they are server-side buffer/difference
+    graphs. Empty rings are None.
+    """
+    if local:
+        try:
+            rings = local_ring_intervals(geometry, intervals, tolerance_m=scale / 2)
+            return [ee.Geometry(r) if r is not None else None for r in rings]
+        except Exception as e:
+            print(f"Local ring computation failed ({e}); using server-side rings")
+    base_geom = ee.Geometry(geometry)
+    return [_ring_geometry(base_geom, low, high) for low, high in intervals]
 
-def run_mock_srd_analysis(geometry: Dict[str, Any]) -> Dict[str, Any]:
+
+def _rd_summary(points: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    """Local-linear RD estimate with bootstrap CI (services.rd_stats), or None if it cannot be fitted."""
+    try:
+        return rd_estimate(points)
+    except Exception as e:
+        print(f"RD estimate unavailable: {e}")
+        return None
+
+
+def _ring_geometries(
+    geometry: Dict[str, Any],
+    bin_edges: List[float],
+    scale: float = 10,
+    local: bool = True,
+) -> List[ee.Geometry | None]:
+    """Ring geometry per bin of contiguous `bin_edges` (see _interval_rings)."""
+    intervals = [(bin_edges[i], bin_edges[i + 1]) for i in range(len(bin_edges) - 1)]
+    return _interval_rings(geometry, intervals, scale, local)
+
+
+def _indexed_ring_geometries(
+    geometry: Dict[str, Any],
+    bin_edges: List[float],
+    scale: float,
+    context: Tuple[Any, ...],
+) -> Tuple[List[ee.Geometry | None], Dict[int, Dict[str, Any]], Callable[[int, Dict[str, Any]], None]]:
     """
-    Fallback mock SRD analysis for development/testing.
+    Local rings checked against the shared ring index (services.ring_index): returns the
+    EE rings, the samples of bins whose ring matches an already analysed one in `context`,
+    and a `record(bin, samples)` callback that indexes freshly reduced rings.
+    """
+    intervals = [(bin_edges[i], bin_edges[i + 1]) for i in range(len(bin_edges) - 1)]
+    ring_json = local_ring_intervals(geometry, intervals, tolerance_m=scale / 2)
+    known: Dict[int, Dict[str, Any]] = {}
+    for i, ring in enumerate(ring_json):
+        if ring is None:
+            continue
+        hit = ring_result_index.lookup(ring, context)
+        if hit is not None:
+            known[i] = hit
+
+    def record(i: int, samples: Dict[str, Any]) -> None:
+        # Only rings that produced a value are worth reusing
+        if ring_json[i] is not None and _point_from_samples(samples, 0.0)["value"] is not None:
+            ring_result_index.add(ring_json[i], context, samples)
+
+    rings = [ee.Geometry(r) if r is not None else None for r in ring_json]
+    return rings, known, record
+
+
+def _reduce_ring(activity_img: ee.Image, ring: ee.Geometry | None, scale: float = 10) -> Dict[str, Any]:
+    """One blocking reduceRegion round trip for a single ring."""
+    if ring is None:
+        return {}
+    return activity_img.reduceRegion(
+        reducer=_mean_count_reducer(),
+        geometry=ring,
+        scale=scale,
+        maxPixels=1e9,
+        bestEffort=True
+    ).getInfo()
+
+
+def _tags_bin_index(order: Sequence[int] | None, ordered: bool = True) -> bool:
+    """Whether points can arrive out of distance order and so must carry `bin_index`."""
+    return not ordered or (order is not None and list(order) != sorted(order))
+
+
+def _record_when_done(record: Callable[[int, Dict[str, Any]], None], i: int) -> Callable[[Future], None]:
+    """Done-callback passing a ring's samples to `record`, skipping failed and cancelled calls."""
+    def done(fut: Future) -> None:
+        # Queued calls dropped on cancel end up cancelled; exception() would raise for them
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        record(i, fut.result())
+    return done
+
+
+def _sample_rings_sequential(
+    activity_img: ee.Image,
+    rings: List[ee.Geometry | None],
+    bin_edges: List[float],
+    year: int,
+    scale: float = 10,
+    order: Sequence[int] | None = None,
+    known: Dict[int, Dict[str, Any]] | None = None,
+    record: Callable[[int, Dict[str, Any]], None] | None = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    One blocking reduceRegion round trip per bin (original behaviour), in `order` if given.
+    Bins in `known` reuse those samples; fresh samples are passed to `record`. Points that
+    may arrive out of distance order are tagged with `bin_index`, as in the concurrent path.
     """
-    # Seed for determinism
+    tag = _tags_bin_index(order)
+    for i in (order if order is not None else range(len(bin_edges) - 1)):
+        low = bin_edges[i]
+        high = bin_edges[i + 1]
+        mid = round((low + high) / 2, 3)
+
+        if known and i in known:
+            samples = known[i]
+        else:
+            samples = _reduce_ring(activity_img, rings[i], scale)
+            if record is not None:
+                record(i, samples)
+        print(f"Raw samples: {samples}")
+
+        point = _point_from_samples(samples, mid)
+        print(f"Year {year} | Dist {mid}km | Value {point['value']} | Count {point['count']}")
+        if tag:
+            point["bin_index"] = i
+        yield point
+
+
+_RING_CONCURRENCY = 8  # Default number of per-ring reduceRegion calls in flight
+_CANCEL_POLL_S = 0.25  # How often waits on in-flight EE calls re-check the cancel token
+
+
+def _sample_rings_concurrent(
+    activity_img: ee.Image,
+    rings: List[ee.Geometry | None],
+    bin_edges: List[float],
+    year: int,
+    scale: float = 10,
+    concurrency: int = _RING_CONCURRENCY,
+    ordered: bool = True,
+    order: Sequence[int] | None = None,
+    known: Dict[int, Dict[str, Any]] | None = None,
+    record: Callable[[int, Dict[str, Any]], None] | None = None,
+    cancel: CancelToken | None = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Per-ring reduceRegion calls issued through a bounded thread pool. Bins in `known`
+    reuse those samples without an EE call; fresh samples are passed to `record`.
+    Stops as soon as `cancel` fires, dropping queued calls and not waiting on in-flight ones.
+
+    Bins are submitted in `order` (default: distance order). With `ordered=True` points
+    are yielded in that order as soon as every earlier bin is done. With `ordered=False`
+    they are yielded as they complete. Points that may arrive out of distance order are
+    tagged with `bin_index` so clients can place them.
+    """
+    order = list(order) if order is not None else list(range(len(bin_edges) - 1))
+    tag = _tags_bin_index(order, ordered)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(int(concurrency), len(order))))
     try:
-        seed_material = json.dumps(geometry, sort_keys=True)[:512]
-    except Exception:
-        seed_material = "default"
-    random.seed(seed_material)
+        futures: Dict[Future, int] = {}
+        for i in order:
+            if known and i in known:
+                fut: Future = Future()
+                fut.set_result(known[i])
+            else:
+                fut = executor.submit(_reduce_ring, activity_img, rings[i], scale)
+                if record is not None:
+                    fut.add_done_callback(_record_when_done(record, i))
+            futures[fut] = i
+        for fut in _completed_in_turn(futures, ordered, cancel):
+            i = futures[fut]
+            mid = round((bin_edges[i] + bin_edges[i + 1]) / 2, 3)
+            point = _point_from_samples(fut.result(), mid)
+            print(f"Year {year} | Dist {mid}km | Value {point['value']} | Count {point['count']}")
+            if tag:
+                point["bin_index"] = i
+            yield point
+    finally:
+        # Do not wait on abandoned bins if the consumer stops early
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    delta = 3.0
-    base = 10.0
-    slope = 0.4
-    noise_sigma = 0.5
 
-    start_km, end_km, step = -5.0, 5.0, 0.25
-    distances = [round(start_km + i * step, 3) for i in range(int((end_km - start_km) / step) + 1)]
+def _completed_in_turn(
+    futures: Dict[Future, Any],
+    ordered: bool,
+    cancel: CancelToken | None = None,
+) -> Generator[Future, None, None]:
+    """
+    Done futures in submission order (`ordered`) or completion order. Waits poll `cancel`
+    every _CANCEL_POLL_S and the generator simply ends once it fires.
+    """
+    timeout = _CANCEL_POLL_S if cancel is not None else None
+    if ordered:
+        # dicts keep insertion order, i.e. submission order
+        for fut in futures:
+            while not fut.done():
+                if cancel is not None and cancel.should_stop():
+                    return
+                wait([fut], timeout=timeout)
+            yield fut
+        return
+    if cancel is None:
+        yield from as_completed(futures)
+        return
+    position = {fut: n for n, fut in enumerate(futures)}
+    pending = set(futures)
+    while pending:
+        if cancel.should_stop():
+            return
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        yield from sorted(done, key=position.__getitem__)
+
+
+def _band_stats(props: Dict[str, Any] | None, bands: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Split a mean/count reducer output into per-band {"mean", "count"} dicts. Handles the
+    layouts EE produces: plain 'mean'/'count' (single band), '<band>_mean'/'<band>_count'
+    (multi-band) and list-valued 'mean'/'count' (repeated reducers).
+    """
+    props = props or {}
+    means = props.get("mean")
+    counts = props.get("count")
+    if isinstance(means, list):
+        counts = counts if isinstance(counts, list) else [None] * len(means)
+        return {b: {"mean": m, "count": c} for b, m, c in zip(bands, means, counts)}
+    if len(bands) == 1 and means is not None and counts is not None:
+        return {bands[0]: {"mean": means, "count": counts}}
+    return {b: {"mean": props.get(f"{b}_mean"), "count": props.get(f"{b}_count")} for b in bands}
+
+
+def _ring_features(rings: List[ee.Geometry | None], properties: Dict[str, Any] | None = None) -> List[ee.Feature]:
+    """One ee.Feature per non-empty ring, tagged with its `bin` index plus any extra `properties`."""
+    return [
+        ee.Feature(ring, {**(properties or {}), "bin": i})
+        for i, ring in enumerate(rings)
+        if ring is not None
+    ]
+
+
+def _reduce_ring_features(img: ee.Image, bands: List[str], features: List[ee.Feature], scale: float = 10) -> List[Dict[str, Any]]:
+    """
+    Reduce `features` over `bands` with a single reduceRegions call and return each
+    feature's properties. Geometries are dropped server-side so only the statistics
+    travel back.
+    """
+    if not features:
+        return []
+    reduced = img.select(bands).reduceRegions(
+        collection=ee.FeatureCollection(features),
+        reducer=_mean_count_reducer(),
+        scale=scale,
+    )
+    stats = reduced.map(lambda f: ee.Feature(None, f.toDictionary())).getInfo()
+    return [feat.get("properties") or {} for feat in (stats or {}).get("features", [])]
+
+
+def _reduce_rings_multiband(
+    img: ee.Image,
+    bands: List[str],
+    rings: List[ee.Geometry | None],
+    scale: float = 10,
+) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """
+    All rings as one FeatureCollection, reduced with a single reduceRegions call over
+    every band of `img`. Returns {bin_index: {band: {"mean", "count"}}}.
+    """
+    features = _ring_features(rings)
+    by_bin = {}
+    for props in _reduce_ring_features(img, bands, features, scale):
+        try:
+            by_bin[int(props.get("bin"))] = _band_stats(props, bands)
+        except Exception:
+            continue
+    print(f"Batched reduceRegions returned {len(by_bin)} of {len(rings)} bins")
+    return by_bin
+
+
+def _sample_rings_batched(
+    activity_img: ee.Image,
+    rings: List[ee.Geometry | None],
+    bin_edges: List[float],
+    year: int,
+    scale: float = 10,
+    known: Dict[int, Dict[str, Any]] | None = None,
+    record: Callable[[int, Dict[str, Any]], None] | None = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    All rings reduced with a single reduceRegions call. Bins in `known` are left out of
+    the call and reuse those samples; fresh samples are passed to `record`.
+    """
+    known = known or {}
+    pending = [None if i in known else ring for i, ring in enumerate(rings)]
+    by_bin = _reduce_rings_multiband(activity_img, ["mean"], pending, scale) if any(r is not None for r in pending) else {}
+    for i in range(len(bin_edges) - 1):
+        mid = round((bin_edges[i] + bin_edges[i + 1]) / 2, 3)
+        if i in known:
+            samples = known[i]
+        else:
+            samples = by_bin.get(i, {}).get("mean")
+            if samples and record is not None:
+                record(i, samples)
+        point = _point_from_samples(samples, mid)
+        print(f"Year {year} | Dist {mid}km | Value {point['value']} | Count {point['count']}")
+        yield point
+
+
+def _signed_distance_image(base_geom: ee.Geometry, max_m: float, scale: float = 10) -> ee.Image:
+    """
+    Signed distance to the polygon border in meters: positive inside, negative outside
+    (the sign convention of the rings), masked beyond `max_m` on either side. No per-ring
+    buffer/difference work.
+    """
+    # FeatureCollection.distance measures to the polygon boundary on both sides (it is
+    # not 0 inside), so it is unsigned; the inside mask supplies the sign.
+    dist = ee.FeatureCollection([ee.Feature(base_geom)]).distance(max_m, scale)
+    inside = ee.Image.constant(1).clip(base_geom).mask()
+    return dist.multiply(-1).where(inside, dist).rename(["signed_distance"])
+
+
+def _bin_id_image(signed_distance: ee.Image, start_km: float, step_km: float, n_bins: int) -> ee.Image:
+    """Quantize a signed distance image (meters) into integer bin IDs in [0, n_bins)."""
+    bin_id = (
+        signed_distance.divide(1000)
+        .subtract(start_km)
+        .divide(step_km)
+        .floor()
+        .toInt()
+    )
+    return bin_id.updateMask(bin_id.gte(0).And(bin_id.lt(n_bins))).rename(["bin"])
+
+
+def _reduce_distance_multiband(
+    img: ee.Image,
+    bands: List[str],
+    base_geom: ee.Geometry,
+    bin_edges: List[float],
+    scale: float = 10,
+) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """
+    Signed-distance raster engine: quantize distance into bin IDs and get every bin's
+    mean and count for every band of `img` from one grouped reduceRegion call.
+    Returns {bin_index: {band: {"mean", "count"}}}.
+    """
+    n_bins = len(bin_edges) - 1
+    start_km = bin_edges[0]
+    step_km = bin_edges[1] - bin_edges[0]
+    max_m = max(abs(bin_edges[0]), abs(bin_edges[-1])) * 1000
+
+    n_bands = len(bands)
+    if n_bands == 1:
+        reducer = _mean_count_reducer()
+    else:
+        reducer = ee.Reducer.mean().repeat(n_bands).combine(ee.Reducer.count().repeat(n_bands), '', True)
+
+    signed = _signed_distance_image(base_geom, max_m, scale)
+    bin_id = _bin_id_image(signed, start_km, step_km, n_bins)
+    result = img.select(bands).addBands(bin_id).reduceRegion(
+        reducer=reducer.group(groupField=n_bands, groupName="bin"),
+        geometry=base_geom.buffer(max_m, scale),
+        scale=scale,
+        maxPixels=1e9,
+        bestEffort=True,
+    ).getInfo()
+    by_bin = {}
+    for group in (result or {}).get("groups", []):
+        try:
+            by_bin[int(group.get("bin"))] = _band_stats(group, bands)
+        except Exception:
+            continue
+    print(f"Grouped reduceRegion returned {len(by_bin)} of {n_bins} bins")
+    return by_bin
+
+
+def _sample_distance_grouped(
+    activity_img: ee.Image,
+    base_geom: ee.Geometry,
+    bin_edges: List[float],
+    year: int,
+    scale: float = 10,
+) -> Generator[Dict[str, Any], None, None]:
+    """All distance bins reduced with one grouped reduceRegion call."""
+    by_bin = _reduce_distance_multiband(activity_img, ["mean"], base_geom, bin_edges, scale)
+    for i in range(len(bin_edges) - 1):
+        mid = round((bin_edges[i] + bin_edges[i + 1]) / 2, 3)
+        point = _point_from_samples(by_bin.get(i, {}).get("mean"), mid)
+        print(f"Year {year} | Dist {mid}km | Value {point['value']} | Count {point['count']}")
+        yield point
+
+
+# Placebo borders: level sets of the signed distance, shifted inward (positive) or outward.
+_PLACEBO_SHIFTS_KM = (-4.0, -3.0, -2.0, -1.0, 1.0, 2.0, 3.0, 4.0)
+
+
+def _placebo_test(
+    activity_img: ee.Image,
+    base_geom: ee.Geometry,
+    bin_edges: List[float],
+    step_km: float,
+    shifts_km: Sequence[float] | None = None,
+    scale: float = 10,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Real profile plus K placebo profiles from ONE grouped distance reduction: the bin grid
+    is widened by the largest shift, and each placebo profile is the same grid re-centred
+    on its shifted border. Shifts are snapped to multiples of `step_km` so bins line up.
+    Returns (real points, {"shifts_km", "impacts", "p_value"}) where the p-value is the
+    two-sided permutation rank of |impact| among the real and the valid placebo borders
+    (a placebo without enough data near its border scores None and is left out).
+    """
+    shifts = sorted({round(round(s / step_km) * step_km, 3) for s in (shifts_km or _PLACEBO_SHIFTS_KM)} - {0.0})
+    pad_bins = int(round(max((abs(s) for s in shifts), default=0.0) / step_km))
+    n_bins = len(bin_edges) - 1
+    wide_edges = [round(bin_edges[0] + (i - pad_bins) * step_km, 3) for i in range(n_bins + 2 * pad_bins + 1)]
+    by_bin = _reduce_distance_multiband(activity_img, ["mean"], base_geom, wide_edges, scale)
+
+    def profile(shift: float) -> List[Dict[str, Any]]:
+        offset = pad_bins + int(round(shift / step_km))
+        return [
+            _point_from_samples(
+                by_bin.get(offset + i, {}).get("mean"),
+                round((bin_edges[i] + bin_edges[i + 1]) / 2, 3),
+            )
+            for i in range(n_bins)
+        ]
+
+    points = profile(0.0)
+    actual = _impact_score(points)
+    impacts: List[float | None] = []
+    for shift in shifts:
+        shifted = profile(shift)
+        near = [p["distance_km"] for p in shifted if p["value"] is not None and -0.5 <= p["distance_km"] <= 0.5]
+        if not any(d < 0 for d in near) or not any(d >= 0 for d in near):
+            impacts.append(None)  # Shifted border left the polygon or the sampled range
+            continue
+        try:
+            impacts.append(round(_impact_score(shifted), 3))
+        except ValueError as e:
+            print(f"Placebo shift {shift}km skipped: {e}")
+            impacts.append(None)  # Too few valid bins near the shifted border
+    valid = [abs(v) for v in impacts if v is not None]
+    p_value = (1 + sum(v >= abs(actual) for v in valid)) / (1 + len(valid)) if valid else None
+    print(f"Placebo impacts {dict(zip(shifts, impacts))}, actual {actual:.3f}, p={p_value}")
+    return points, {
+        "shifts_km": shifts,
+        "impacts": impacts,
+        "p_value": round(p_value, 4) if p_value is not None else None,
+    }
+
+
+# Per-band profiles: every AlphaEarth embedding dimension from one grouped reduction.
+EMBEDDING_BANDS = _all_alphaearth_bands()
+
+
+def _nan_mean(values: np.ndarray, axis: int) -> np.ndarray:
+    """np.nanmean without the empty-slice warning (all-NaN slices give NaN)."""
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, total / np.maximum(n, 1), np.nan)
+
+
+def _band_profile_matrix(
+    img: ee.Image,
+    base_geom: ee.Geometry,
+    bin_edges: List[float],
+    scale: float = 10,
+    bands: Sequence[str] = EMBEDDING_BANDS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (means, counts), each shaped (len(bands), n_bins), from a single grouped reduceRegion
+    over the signed-distance bin image with a repeated mean/count reducer. Empty bins are NaN / 0.
+    """
+    bands = list(bands)
+    n_bins = len(bin_edges) - 1
+    by_bin = _reduce_distance_multiband(img, bands, base_geom, bin_edges, scale)
+    means = np.full((len(bands), n_bins), np.nan)
+    counts = np.zeros((len(bands), n_bins), dtype=np.int64)
+    for i, stats in by_bin.items():
+        if not 0 <= i < n_bins:
+            continue
+        for b, band in enumerate(bands):
+            st = stats.get(band) or {}
+            if st.get("mean") is not None and st.get("count"):
+                means[b, i] = float(st["mean"])
+                counts[b, i] = int(st["count"])
+    return means, counts
+
+
+def _band_discontinuities(
+    means: np.ndarray,
+    mids: np.ndarray,
+    bands: Sequence[str],
+    window_km: float = 0.5,
+) -> List[Dict[str, Any]]:
+    """
+    Near-border gap (inside minus outside mean within `window_km`) per band, with an effect
+    size: the gap over the pooled standard deviation of the bin means in the two windows.
+    Sorted by |effect_size|, largest first; bands without data on both sides come last.
+    """
+    inside = (mids >= 0) & (mids <= window_km)
+    outside = (mids < 0) & (mids >= -window_km)
+    in_vals = np.where(inside, means, np.nan)
+    out_vals = np.where(outside, means, np.nan)
+    n_in = np.sum(~np.isnan(in_vals), axis=1)
+    n_out = np.sum(~np.isnan(out_vals), axis=1)
+    m_in = _nan_mean(in_vals, axis=1)
+    m_out = _nan_mean(out_vals, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        v_in = _nan_mean((in_vals - m_in[:, None]) ** 2, axis=1) * n_in / (n_in - 1)
+        v_out = _nan_mean((out_vals - m_out[:, None]) ** 2, axis=1) * n_out / (n_out - 1)
+        pooled = np.sqrt(((n_in - 1) * v_in + (n_out - 1) * v_out) / (n_in + n_out - 2))
+        gap = m_in - m_out
+        effect = gap / pooled
+
+    def _num(v: float, digits: int) -> float | None:
+        return round(float(v), digits) if np.isfinite(v) else None
+
+    rows = [
+        {
+            "band": band,
+            "impact": _num(gap[b], 4),
+            "effect_size": _num(effect[b], 3),
+            "inside_mean": _num(m_in[b], 4),
+            "outside_mean": _num(m_out[b], 4),
+        }
+        for b, band in enumerate(bands)
+    ]
+    rows.sort(key=lambda r: (r["effect_size"] is None, -abs(r["effect_size"] or 0.0)))
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+    return rows
+
+
+# Point-sample engine: one stratified pixel sample per (geometry, year, scale), re-binned locally.
+_SAMPLE_RANGE_KM = 5.0  # Minimum half-width sampled around the border, so range tweaks stay local
+_SAMPLE_STRATUM_KM = 0.1  # Stratum width for stratifiedSample (keeps every distance band populated)
+_SAMPLE_MAX_POINTS = 4500  # Stay below the 5000-element getInfo limit for collections
+_SAMPLE_CACHE_MAX = 32
+_SAMPLE_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_SAMPLE_CACHE_LOCK = threading.Lock()
+
+
+def _sample_cache_key(geometry: Dict[str, Any], year: int, scale: float) -> str:
+    return f"{geometry_hash(geometry)}|{int(year)}|{float(scale)}"
+
+
+def _fetch_pixel_sample(
+    geometry: Dict[str, Any],
+    year: int,
+    bands: List[str],
+    range_km: float,
+    scale: float = 10,
+) -> Dict[str, Any]:
+    """
+    Pull one stratified pixel sample holding the signed distance (km) and the raw values
+    of `bands`, stratified by distance band so near-border strata are never starved.
+    """
+    img = alphaearth_image_for_year(year, geometry)
+    base_geom = ee.Geometry(geometry)
+    range_m = range_km * 1000
+    n_strata = int(math.ceil(2 * range_km / _SAMPLE_STRATUM_KM))
+    per_stratum = max(1, _SAMPLE_MAX_POINTS // n_strata)
+
+    signed = _signed_distance_image(base_geom, range_m, scale)
+    stratum = _bin_id_image(signed, -range_km, _SAMPLE_STRATUM_KM, n_strata).rename(["stratum"])
+    stacked = signed.addBands(img.select(bands)).addBands(stratum)
+    samples = stacked.stratifiedSample(
+        numPoints=per_stratum,
+        classBand="stratum",
+        region=base_geom.buffer(range_m, scale),
+        scale=scale,
+        seed=0,
+        dropNulls=True,
+        geometries=False,
+    ).getInfo()
+
+    rows = [f.get("properties") or {} for f in (samples or {}).get("features", [])]
+    print(f"Stratified sample returned {len(rows)} pixels over +/-{range_km}km")
+    distance_km = np.array([float(r.get("signed_distance", np.nan)) / 1000 for r in rows], dtype=float)
+    values = {
+        b: np.array([np.nan if r.get(b) is None else float(r[b]) for r in rows], dtype=float)
+        for b in bands
+    }
+    return {"range_km": float(range_km), "bands": list(bands), "distance_km": distance_km, "values": values}
+
+
+def _cached_pixel_sample(
+    geometry: Dict[str, Any],
+    year: int,
+    bands: List[str],
+    range_km: float,
+    scale: float = 10,
+) -> Dict[str, Any]:
+    """Return a cached sample covering `bands` and `range_km`, re-sampling only when it does not."""
+    key = _sample_cache_key(geometry, year, scale)
+    with _SAMPLE_CACHE_LOCK:
+        entry = _SAMPLE_CACHE.get(key)
+        if entry is not None:
+            _SAMPLE_CACHE.move_to_end(key)
+    if entry is not None and entry["range_km"] >= range_km and set(bands) <= set(entry["bands"]):
+        print(f"Reusing cached pixel sample {key[:8]} ({len(entry['distance_km'])} pixels)")
+        return entry
+
+    # Widen the cached sample so later tweaks (more bands, wider range) hit the cache too.
+    if entry is not None:
+        range_km = max(range_km, entry["range_km"])
+        bands = list(dict.fromkeys(list(entry["bands"]) + list(bands)))
+    entry = _fetch_pixel_sample(geometry, year, bands, max(range_km, _SAMPLE_RANGE_KM), scale)
+    with _SAMPLE_CACHE_LOCK:
+        _SAMPLE_CACHE[key] = entry
+        _SAMPLE_CACHE.move_to_end(key)
+        while len(_SAMPLE_CACHE) > _SAMPLE_CACHE_MAX:
+            _SAMPLE_CACHE.popitem(last=False)
+    return entry
+
+
+def _bin_pixel_sample(
+    sample: Dict[str, Any],
+    bands: List[str],
+    bin_edges: List[float],
+) -> List[Dict[str, Any]]:
+    """Average the sampled pixels into `bin_edges` with NumPy; counts are sampled pixels per bin."""
+    edges = np.asarray(bin_edges, dtype=float)
+    n_bins = len(edges) - 1
+    distance_km = sample["distance_km"]
+    activity = np.mean(np.vstack([sample["values"][b] for b in bands]), axis=0)
+
+    idx = np.searchsorted(edges, distance_km, side="right") - 1
+    ok = (idx >= 0) & (idx < n_bins) & np.isfinite(activity) & np.isfinite(distance_km)
+    counts = np.bincount(idx[ok], minlength=n_bins)
+    sums = np.bincount(idx[ok], weights=activity[ok], minlength=n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
 
     points = []
-    for dist in distances:
-        mu = base + slope * dist + (delta if dist >= 0 else 0.0)
-        sigma = noise_sigma * (1.0 + 0.05 * abs(dist))
-        val = random.gauss(mu, sigma)
-        # Synthesize plausible sample counts with gentle decay by distance
-        count = max(0, int(500 - 40 * abs(dist) + random.gauss(0, 20)))
-        points.append({"distance_km": dist, "value": val, "count": count})
+    for i in range(n_bins):
+        mid = round((bin_edges[i] + bin_edges[i + 1]) / 2, 3)
+        stats = {"mean": float(means[i]), "count": int(counts[i])} if counts[i] else None
+        points.append(_point_from_samples(stats, mid))
+    return points
+
+
+_ADAPTIVE_COARSE_STEP_KM = 0.5  # Width of the first-pass grid
+_ADAPTIVE_BORDER_KM = 0.5  # Bins within this distance of the border are always refined
+_ADAPTIVE_THRESHOLD = 5.0  # Neighbouring bins differing by more than this (0-100 scale) are refined
+_ADAPTIVE_BUDGET = 12  # Ring reductions per analysis (a fixed 0.1 km grid over ±2 km uses 41)
+_ADAPTIVE_MAX_ROUNDS = 4  # reduceRegions round trips per analysis
+_ADAPTIVE_REFINE_SHARE = 1 / 3  # Share of the budget kept for refinement; the coarse grid gets the rest
+
+
+def _refine_candidates(
+    intervals: List[Tuple[float, float]],
+    points: Dict[Tuple[float, float], Dict[str, Any]],
+    min_width_km: float,
+    threshold: float,
+) -> List[Tuple[float, Tuple[float, float]]]:
+    """
+    Intervals worth splitting, as (priority, interval) sorted best first: bins touching the
+    border band first (narrowest distance first), then bins whose value jumps by more than
+    `threshold` against a neighbour (largest jump first). Bins narrower than
+    2 * `min_width_km` are never split.
+    """
+    scored: Dict[Tuple[float, float], float] = {}
+    for i, (low, high) in enumerate(intervals):
+        if high - low < 2 * min_width_km - 1e-9:
+            continue
+        near = min(abs(low), abs(high)) if low * high > 0 else 0.0
+        if near < _ADAPTIVE_BORDER_KM:
+            scored[(low, high)] = 1000.0 - near
+            continue
+        value = points[(low, high)].get("value")
+        jumps = [
+            abs(value - points[intervals[j]]["value"])
+            for j in (i - 1, i + 1)
+            if value is not None and 0 <= j < len(intervals) and points[intervals[j]].get("value") is not None
+        ]
+        if jumps and max(jumps) > threshold:
+            scored[(low, high)] = max(jumps)
+    return sorted(((p, iv) for iv, p in scored.items()), key=lambda t: (-t[0], t[1]))
+
+
+def _adaptive_coarse_edges(start_km: float, end_km: float, coarse_km: float, max_bins: int) -> List[float]:
+    """
+    First-pass grid edges at `coarse_km`, widened until the grid has at most `max_bins`
+    bins (at least 2). The edges always include the border itself.
+    """
+    border = {0.0} if start_km < 0 < end_km else set()
+    while True:
+        edges = sorted({round(x, 3) for x in np.arange(start_km, end_km + 1e-9, coarse_km).tolist()}
+                       | {round(end_km, 3)} | border)
+        if len(edges) - 1 <= max(2, max_bins):
+            return edges
+        coarse_km = max(coarse_km * (len(edges) - 1) / max(2, max_bins), coarse_km + 0.001)
+
+
+def _sample_rings_adaptive(
+    activity_img: ee.Image,
+    geometry: Dict[str, Any],
+    start_km: float,
+    end_km: float,
+    step_km: float,
+    year: int,
+    scale: float = 10,
+    local: bool = True,
+    threshold: float | None = None,
+    budget: int | None = None,
+    coarse_step_km: float = _ADAPTIVE_COARSE_STEP_KM,
+    cancel: CancelToken | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Variable-width SRD profile. A coarse grid is reduced in one reduceRegions call, then
+    each round halves the bins near the border and the bins whose value jumps against a
+    neighbour, until nothing qualifies, bins reach `step_km`, or the ring `budget` or
+    round limit is spent (or `cancel` fires). Points are returned in distance order with
+    a `width_km`.
+
+    Every round fits the budget: the coarse grid is widened to use at most
+    1 - _ADAPTIVE_REFINE_SHARE of it, and refinement splits stop when the next would
+    exceed it.
+    """
+    threshold = _ADAPTIVE_THRESHOLD if threshold is None else float(threshold)
+    budget = _ADAPTIVE_BUDGET if budget is None else max(2, int(budget))
+    coarse = max(float(coarse_step_km), float(step_km))
+    max_coarse = min(budget, max(2, budget - int(budget * _ADAPTIVE_REFINE_SHARE)))
+    edges = _adaptive_coarse_edges(start_km, end_km, coarse, max_coarse)
+    intervals = [(edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+    points: Dict[Tuple[float, float], Dict[str, Any]] = {}
+    pending = list(intervals)
+    used = 0
+    for round_no in range(_ADAPTIVE_MAX_ROUNDS):
+        if not pending:
+            break
+        rings = _interval_rings(geometry, pending, scale, local)
+        by_bin = _reduce_rings_multiband(activity_img, ["mean"], rings, scale)
+        used += len(pending)
+        for i, (low, high) in enumerate(pending):
+            point = _point_from_samples(by_bin.get(i, {}).get("mean"), round((low + high) / 2, 3))
+            point["width_km"] = round(high - low, 3)
+            points[(low, high)] = point
+        print(f"Adaptive round {round_no + 1}: {len(pending)} rings reduced ({used}/{budget} used), {len(intervals)} bins")
+
+        pending = []
+        if round_no == _ADAPTIVE_MAX_ROUNDS - 1 or (cancel is not None and cancel.should_stop()):
+            break
+        for _, (low, high) in _refine_candidates(intervals, points, step_km, threshold):
+            if used + len(pending) + 2 > budget:
+                break
+            mid = round((low + high) / 2, 3)
+            idx = intervals.index((low, high))
+            intervals[idx:idx + 1] = [(low, mid), (mid, high)]
+            del points[(low, high)]
+            pending.extend([(low, mid), (mid, high)])
+
+    ordered_points = [points[iv] for iv in intervals]
+    for p in ordered_points:
+        print(f"Year {year} | Dist {p['distance_km']}km (±{p['width_km'] / 2}) | Value {p['value']} | Count {p['count']}")
+    return ordered_points
+
+
+_EARLY_STOP_MIN_BINS = 3  # Bins per side before a narrow CI is trusted (two-point variances are noisy)
+
+SRD_MODES = ("batched", "rings", "distance", "sample", "adaptive", "placebo", "bands", "synthetic")
+
+
+def run_real_srd_analysis(
+    geometry: Dict[str, Any],
+    year: int = 2023,
+    mode: str = "batched",
+    start_km: float = -2.0,
+    end_km: float = 2.0,
+    step_km: float = 0.1,
+    scale: float = 10,
+    bands: Sequence[str] | None = None,
+    concurrency: int | None = None,
+    ordered: bool = True,
+    local_rings: bool = True,
+    adaptive_threshold: float | None = None,
+    adaptive_budget: int | None = None,
+    placebo_shifts_km: Sequence[float] | None = None,
+    stop_tolerance: float | None = None,
+    synthetic: Dict[str, Any] | None = None,
+    cancel: CancelToken | None = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Perform Spatial Regression Discontinuity analysis using real AlphaEarth satellite data.
+    Yields points progressively, then the impact score at the end.
+
+    Modes:
+      - "batched": every distance ring reduced in a single reduceRegions round trip
+      - "rings": one reduceRegion round trip per ring, `concurrency` of them in flight at once
+        (1 = sequential legacy path); `ordered=False` streams points as they complete,
+        tagged with `bin_index`
+      - "distance": one signed-distance image quantized into bins and reduced with a
+        single grouped reducer; no per-ring geometry work, so bin width and range are free
+      - "sample": one stratified pixel sample (signed distance + band values) fetched once and
+        cached, then binned locally with NumPy; later changes to bins or bands skip EE entirely
+      - "adaptive": a coarse 0.5 km grid refined near the border and across jumps larger than
+        `adaptive_threshold`, within `adaptive_budget` ring reductions; variable-width bins
+        (points carry `width_km`, `step_km` is the finest width) and `bins` arrive after refinement
+      - "placebo": the "distance" engine over a grid widened by the largest shift, so K
+        placebo borders (`placebo_shifts_km`, positive = inward) cost no extra EE calls;
+        adds a {"placebo": {"shifts_km", "impacts", "p_value"}} event before the impact score
+      - "bands": all 64 embedding bands (A00..A63) per distance bin from one grouped reduction;
+        the activity profile is the mean of `bands` taken from that matrix, and the 64 x bins
+        matrix plus per-band discontinuities ranked by effect size follow as
+        {"band_profiles": ...} and {"band_discontinuities": [...]} events
+      - "synthetic": no Earth Engine; a NumPy-generated profile (services.synthetic) with the
+        `synthetic` options (n_bins, noise, noise_sigma, missing_rate, latency_ms, seed, ...)
+        streamed through the same estimate/RD/impact pipeline, for load testing
+
+    Every point updates a running impact estimate (services.rd_stats.OnlineImpact), streamed
+    as {"impact_estimate": {...}} once both sides of the border have two bins. With
+    `stop_tolerance`, the analysis stops as soon as the estimate's 95% CI is narrower than
+    it; "rings" mode then schedules bins nearest the border first.
+
+    `cancel` (services.cancel.CancelToken) is checked between EE calls. When it is
+    cancelled the generator ends without a summary; when only its deadline has passed,
+    sampling stops, a {"partial": {...}} event is emitted and the summary is computed from
+    the bins collected so far.
+
+    The geometry is first simplified with a tolerance derived from `scale` and `step_km`
+    (services.geometry.simplify_for_scale); the reduction is reported in a leading
+    {"geometry_stats": {...}} event.
+
+    `bands` are averaged into the activity metric (default A01, A16, A09).
+    With `local_rings=True` the ring modes compute rings locally (see services.rings)
+    instead of sending buffer/difference graphs to EE.
+    """
+    if mode not in SRD_MODES:
+        raise ValueError(f"Unsupported SRD mode: {mode!r}. Expected one of {SRD_MODES}.")
+    if step_km <= 0 or end_km <= start_km:
+        raise ValueError("Invalid bin spec: require step_km > 0 and end_km > start_km")
+    print(f"Starting real SRD analysis ({mode}) for year {year} with geometry: {geometry}")
+    if mode != "synthetic":
+        _ensure_initialized()
+        # Everything sent to EE (and every local ring) uses the simplified geometry
+        geometry, geometry_stats = simplify_for_scale(geometry, scale, step_km)
+        yield {"geometry_stats": geometry_stats}
+
+    # Define analysis parameters
+    bin_edges = _bin_edges(start_km, end_km, step_km)
+
+    if mode not in ("adaptive", "synthetic"):
+        yield {"bins": bin_edges[:-1]}  # Bin starts
+
+    # Aggregate bands into activity metric
+    used_bands = _to_bands_list(bands)
+    print(f"Selecting bands: {used_bands}")
+    points = []
+    placebo = None
+    band_report: List[Dict[str, Any]] = []
+
+    n_bins = len(bin_edges) - 1
+    if mode == "synthetic":
+        # Same bins as the Earth Engine modes unless `n_bins` overrides them
+        stream = synthetic_srd_points(geometry, start_km, end_km, step_km, edges=bin_edges, **(synthetic or {}))
+        first = next(stream)  # bins
+        n_bins = len(first["bins"])
+        yield first
+        point_iter = (item["point"] for item in stream)
+    elif mode == "adaptive":
+        img = alphaearth_image_for_year(year, geometry)
+        activity_img = img.select(used_bands).reduce(ee.Reducer.mean())
+        adaptive_points = _sample_rings_adaptive(
+            activity_img, geometry, start_km, end_km, step_km, year,
+            scale=scale, local=local_rings, threshold=adaptive_threshold, budget=adaptive_budget, cancel=cancel,
+        )
+        n_bins = len(adaptive_points)
+        yield {"bins": [round(p["distance_km"] - p["width_km"] / 2, 3) for p in adaptive_points]}
+        point_iter = iter(adaptive_points)
+    elif mode == "bands":
+        img = alphaearth_image_for_year(year, geometry)
+        means, counts = _band_profile_matrix(img, ee.Geometry(geometry), bin_edges, scale)
+        mids = np.round((np.array(bin_edges[:-1]) + np.array(bin_edges[1:])) / 2, 3)
+        # Activity = mean of the selected bands (identical masks, so the mean of band means)
+        sel = [EMBEDDING_BANDS.index(b) for b in used_bands if b in EMBEDDING_BANDS]
+        activity = _nan_mean(means[sel], axis=0) if sel else np.full(len(mids), np.nan)
+        activity_count = counts[sel].min(axis=0) if sel else np.zeros(len(mids), dtype=np.int64)
+        point_iter = iter([
+            _point_from_samples(
+                {"mean": None if np.isnan(v) else float(v), "count": int(c)}, float(mid)
+            )
+            for v, c, mid in zip(activity, activity_count, mids)
+        ])
+        band_report = [
+            {"band_profiles": {
+                "bands": EMBEDDING_BANDS,
+                "distance_km": mids.tolist(),
+                "means": [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in means],
+                "counts": counts.max(axis=0).tolist(),
+            }},
+            {"band_discontinuities": _band_discontinuities(means, mids, EMBEDDING_BANDS)},
+        ]
+    elif mode == "sample":
+        range_km = max(abs(bin_edges[0]), abs(bin_edges[-1]))
+        sample = _cached_pixel_sample(geometry, year, used_bands, range_km, scale)
+        point_iter = iter(_bin_pixel_sample(sample, used_bands, bin_edges))
+    else:
+        # Get AlphaEarth image for the year
+        img = alphaearth_image_for_year(year, geometry)
+        activity_img = img.select(used_bands).reduce(ee.Reducer.mean())
+
+        concurrency = _RING_CONCURRENCY if concurrency is None else int(concurrency)
+        if mode == "distance":
+            point_iter = _sample_distance_grouped(activity_img, ee.Geometry(geometry), bin_edges, year, scale=scale)
+        elif mode == "placebo":
+            placebo_points, placebo = _placebo_test(
+                activity_img, ee.Geometry(geometry), bin_edges, step_km, placebo_shifts_km, scale=scale
+            )
+            point_iter = iter(placebo_points)
+        else:
+            known: Dict[int, Dict[str, Any]] = {}
+            record = None
+            if local_rings:
+                try:
+                    context = (int(year), tuple(used_bands), float(scale))
+                    rings, known, record = _indexed_ring_geometries(geometry, bin_edges, scale, context)
+                    yield {"ring_reuse": {"reused": len(known), "queried": sum(r is not None for r in rings) - len(known)}}
+                except Exception as e:
+                    print(f"Ring index unavailable ({e}); computing rings without reuse")
+                    rings = _ring_geometries(geometry, bin_edges, scale, local=local_rings)
+            else:
+                rings = _ring_geometries(geometry, bin_edges, scale, local=local_rings)
+            order = None
+            if stop_tolerance is not None:
+                # Near-border bins first, alternating sides, so the estimate firms up early
+                order = sorted(range(len(bin_edges) - 1), key=lambda i: abs(bin_edges[i] + bin_edges[i + 1]))
+            if mode == "rings" and concurrency <= 1:
+                print(f"Selected image info: {img.getInfo()}")
+                print(f"Activity image info: {activity_img.getInfo()}")
+                point_iter = _sample_rings_sequential(
+                    activity_img, rings, bin_edges, year, scale=scale, order=order, known=known, record=record
+                )
+            elif mode == "rings":
+                point_iter = _sample_rings_concurrent(
+                    activity_img, rings, bin_edges, year, scale=scale, concurrency=concurrency, ordered=ordered,
+                    order=order, known=known, record=record, cancel=cancel,
+                )
+            else:
+                point_iter = _sample_rings_batched(
+                    activity_img, rings, bin_edges, year, scale=scale, known=known, record=record
+                )
+
+    online = OnlineImpact()
+    for point in point_iter:
+        points.append(point)
+        yield {"point": point}
+        if cancel is not None and cancel.should_stop():
+            close = getattr(point_iter, "close", None)
+            if close is not None:
+                close()
+            break
+        estimate = online.estimate() if online.add(point) else None
+        if estimate is None:
+            continue
+        converged = (
+            stop_tolerance is not None
+            and min(estimate["n_inside"], estimate["n_outside"]) >= _EARLY_STOP_MIN_BINS
+            and estimate["ci_high"] - estimate["ci_low"] <= stop_tolerance
+        )
+        yield {"impact_estimate": {**estimate, "converged": converged}}
+        if converged:
+            print(f"Impact estimate converged after {len(points)} bins; stopping early")
+            close = getattr(point_iter, "close", None)
+            if close is not None:
+                close()
+            break
+
+    if cancel is not None and cancel.should_stop():
+        if cancel.cancelled:
+            print(f"SRD analysis cancelled ({cancel.reason}) after {len(points)} bins")
+            return
+        if len(points) < n_bins:
+            print(f"SRD analysis deadline passed after {cancel.elapsed():.1f}s; {len(points)}/{n_bins} bins")
+            yield {"partial": {
+                "reason": "deadline",
+                "elapsed_s": round(cancel.elapsed(), 3),
+                "bins_done": len(points),
+                "bins_total": n_bins,
+            }}
+
+    try:
+        impact_est = _impact_score(points)
+    except ValueError as e:
+        # Points were already streamed; end with an error event rather than a broken stream
+        print(f"SRD analysis could not be scored: {e}")
+        yield {"error": str(e)}
+        return
+    if placebo is not None:
+        yield {"placebo": placebo}
+    yield from band_report
+    rd = _rd_summary(points)
+    if rd is not None:
+        yield {"rd": rd}
+    yield {"impact_score": float(round(impact_est, 3))}
+
+
+PANEL_MODES = ("batched", "distance")
+
+
+def run_real_srd_panel_analysis(
+    geometry: Dict[str, Any],
+    years: Sequence[int],
+    mode: str = "batched",
+    start_km: float = -2.0,
+    end_km: float = 2.0,
+    step_km: float = 0.1,
+    scale: float = 10,
+    bands: Sequence[str] | None = None,
+    local_rings: bool = True,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Multi-year SRD panel. The per-year activity images are stacked into one band per
+    year (y2019, y2020, ...) and every year is reduced in the same pass over the rings
+    ("batched") or distance bins ("distance").
+
+    Yields bins, then year-tagged points (year-major), then {"impact_by_year": {...}}
+    and finally the impact score of the last year that had enough data.
+    """
+    if mode not in PANEL_MODES:
+        raise ValueError(f"Unsupported SRD panel mode: {mode!r}. Expected one of {PANEL_MODES}.")
+    if step_km <= 0 or end_km <= start_km:
+        raise ValueError("Invalid bin spec: require step_km > 0 and end_km > start_km")
+    years = [int(y) for y in years]
+    if not years:
+        raise ValueError("At least one year is required for a panel analysis")
+    print(f"Starting SRD panel analysis ({mode}) for years {years[0]}..{years[-1]}")
+    _ensure_initialized()
+    geometry, geometry_stats = simplify_for_scale(geometry, scale, step_km)
+    yield {"geometry_stats": geometry_stats}
+
+    bin_edges = _bin_edges(start_km, end_km, step_km)
+    yield {"bins": bin_edges[:-1]}
+
+    used_bands = _to_bands_list(bands)
+    year_bands = [f"y{y}" for y in years]
+    stacked = ee.Image.cat([
+        alphaearth_image_for_year(y, geometry).select(used_bands).reduce(ee.Reducer.mean()).rename([name])
+        for y, name in zip(years, year_bands)
+    ])
+    if mode == "distance":
+        by_bin = _reduce_distance_multiband(stacked, year_bands, ee.Geometry(geometry), bin_edges, scale)
+    else:
+        rings = _ring_geometries(geometry, bin_edges, scale, local=local_rings)
+        by_bin = _reduce_rings_multiband(stacked, year_bands, rings, scale)
+
+    impact_by_year: Dict[str, float | None] = {}
+    for y, name in zip(years, year_bands):
+        points = []
+        for i in range(len(bin_edges) - 1):
+            mid = round((bin_edges[i] + bin_edges[i + 1]) / 2, 3)
+            point = _point_from_samples(by_bin.get(i, {}).get(name), mid)
+            point["year"] = y
+            points.append(point)
+            yield {"point": point}
+        try:
+            impact_by_year[str(y)] = float(round(_impact_score(points), 3))
+        except ValueError as e:
+            print(f"Year {y}: {e}")
+            impact_by_year[str(y)] = None
+
+    yield {"impact_by_year": impact_by_year}
+    scored = [v for v in impact_by_year.values() if v is not None]
+    if not scored:
+        print("SRD panel could not be scored in any year")
+        yield {"error": "Insufficient valid data points for SRD analysis in every year"}
+        return
+    yield {"impact_score": scored[-1]}
+
+
+_BATCH_CHUNK_SIZE = 8  # Features per reduceRegions call in batch mode
+_BATCH_CONCURRENCY = 4  # Chunked reduceRegions calls in flight
+
+
+def run_real_srd_batch_analysis(
+    features: Sequence[Tuple[Any, Dict[str, Any]]],
+    year: int = 2023,
+    start_km: float = -2.0,
+    end_km: float = 2.0,
+    step_km: float = 0.1,
+    scale: float = 10,
+    bands: Sequence[str] | None = None,
+    chunk_size: int = _BATCH_CHUNK_SIZE,
+    concurrency: int = _BATCH_CONCURRENCY,
+    local_rings: bool = True,
+    cancel: CancelToken | None = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    SRD profiles for many geometries at once. `features` is a sequence of (id, geometry).
+
+    The AlphaEarth image and activity band are built once. The rings of `chunk_size`
+    features at a time go into one reduceRegions call, and the chunks run through a
+    bounded thread pool. Each feature's result streams as soon as its chunk completes:
+    {"feature": {"index", "id", "points", "impact_score", "error"}}.
+    Set chunk_size >= len(features) to reduce everything in a single call.
+    Once `cancel` fires (or its deadline passes) no further chunks are awaited.
+    """
+    if step_km <= 0 or end_km <= start_km:
+        raise ValueError("Invalid bin spec: require step_km > 0 and end_km > start_km")
+    if not features:
+        raise ValueError("No features to analyse")
+    print(f"Starting batch SRD analysis of {len(features)} features for year {year}")
+    _ensure_initialized()
+    features = [(fid, simplify_for_scale(geom, scale, step_km)[0]) for fid, geom in features]
+
+    bin_edges = _bin_edges(start_km, end_km, step_km)
+    yield {"bins": bin_edges[:-1]}
+
+    used_bands = _to_bands_list(bands)
+    img = alphaearth_image_for_year(year)
+    activity_img = img.select(used_bands).reduce(ee.Reducer.mean())
+
+    def reduce_chunk(indices: List[int]) -> Dict[int, Dict[int, Dict[str, Any]]]:
+        ring_feats: List[ee.Feature] = []
+        for idx in indices:
+            rings = _ring_geometries(features[idx][1], bin_edges, scale, local=local_rings)
+            ring_feats.extend(_ring_features(rings, {"feature": idx}))
+        by_feature: Dict[int, Dict[int, Dict[str, Any]]] = {idx: {} for idx in indices}
+        for props in _reduce_ring_features(activity_img, ["mean"], ring_feats, scale):
+            try:
+                by_feature[int(props.get("feature"))][int(props.get("bin"))] = _band_stats(props, ["mean"])["mean"]
+            except Exception:
+                continue
+        return by_feature
+
+    chunk_size = max(1, int(chunk_size))
+    chunks = [list(range(i, min(i + chunk_size, len(features)))) for i in range(0, len(features), chunk_size)]
+    executor = ThreadPoolExecutor(max_workers=max(1, min(int(concurrency), len(chunks))))
+    try:
+        futures = {executor.submit(reduce_chunk, chunk): chunk for chunk in chunks}
+        for fut in _completed_in_turn(futures, ordered=False, cancel=cancel):
+            try:
+                by_feature = fut.result()
+                error = None
+            except Exception as e:
+                print(f"Batch chunk {futures[fut][0]}..{futures[fut][-1]} failed: {e}")
+                by_feature, error = {}, str(e)
+            for idx in futures[fut]:
+                by_bin = by_feature.get(idx, {})
+                points = [
+                    _point_from_samples(by_bin.get(i), round((bin_edges[i] + bin_edges[i + 1]) / 2, 3))
+                    for i in range(len(bin_edges) - 1)
+                ]
+                impact = None
+                feature_error = error
+                if feature_error is None:
+                    try:
+                        impact = float(round(_impact_score(points), 3))
+                    except ValueError as e:
+                        feature_error = str(e)
+                yield {
+                    "feature": {
+                        "index": idx,
+                        "id": features[idx][0],
+                        "points": points,
+                        "impact_score": impact,
+                        "error": feature_error,
+                    }
+                }
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_mock_srd_analysis(geometry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fallback mock SRD analysis for development/testing.
+    """
+    delta = 3.0
+    # 41 bins centred on -5.0 .. 5.0 km every 0.25 km
+    profile = synthetic_profile(
+        seed_for_geometry(geometry),
+        start_km=-5.125,
+        end_km=5.125,
+        n_bins=41,
+        base=10.0,
+        slope=0.4,
+        delta=delta,
+        noise="heteroscedastic",
+        noise_sigma=0.5,
+    )
+    points = profile_points(profile)
 
     near_neg = [p["value"] for p in points if -0.5 <= p["distance_km"] < 0]
     near_pos = [p["value"] for p in points if 0 <= p["distance_km"] <= 0.5]
@@ -153,6 +1286,7 @@ def run_mock_srd_analysis(geometry: Dict[str, Any]) -> Dict[str, Any]:
     else:
         impact_est = delta
 
+    start_km, end_km = -5.0, 5.0
     bins = [round(math.floor(start_km) + i, 3) for i in range(int(math.ceil(end_km) - math.floor(start_km)) + 1)]
 
     return {
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from .geometry import geometry_hash
+from .singleflight import SingleFlight
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Thread-safe in-memory LRU bounded by entry count."""
+
+    def __init__(self, max_entries: int = 128) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: K, value: V) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(Generic[V]):
+    """
+    LRU of computed values that expire `ttl_s` seconds after they were computed.
+    `get_or_compute` coalesces concurrent misses into one computation, and a hit within
+    `refresh_ahead_s` of expiry recomputes the value on a background thread while the
+    current one is still served, so hot keys never block on a refresh. Failed
+    computations are not cached.
+    """
+
+    def __init__(self, ttl_s: float, refresh_ahead_s: float = 0.0, max_entries: int = 256) -> None:
+        self.ttl_s = float(ttl_s)
+        self.refresh_ahead_s = min(max(0.0, float(refresh_ahead_s)), self.ttl_s)
+        self._entries: LRUCache[Hashable, Tuple[float, V]] = LRUCache(max_entries)
+        self._flights: SingleFlight[V] = SingleFlight()
+        self._refreshing: Set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl_s > 0:
+            expires_at, value = entry
+            now = time.monotonic()
+            if now < expires_at:
+                if now >= expires_at - self.refresh_ahead_s:
+                    self._refresh_in_background(key, compute)
+                return value
+        return self._flights.do(key, lambda: self._compute(key, compute))
+
+    def _compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        value = compute()
+        self._entries.put(key, (time.monotonic() + self.ttl_s, value))
+        return value
+
+    def _refresh_in_background(self, key: Hashable, compute: Callable[[], V]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run() -> None:
+            try:
+                self._flights.do(key, lambda: self._compute(key, compute))
+            except Exception as e:
+                # The current value stays valid until it expires; the next miss retries
+                print(f"Background refresh failed for {key!r}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Byte blobs stored one file per key under `root`, bounded by total size.
+    Least recently used files (by mtime, refreshed on every hit) are evicted first.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 256 * 1024 * 1024, suffix: str = ".bin") -> None:
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        # Running estimate of the store size; the directory is only rescanned once it passes max_bytes
+        self._approx_bytes: Optional[int] = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Keys are hex digests; guard against path separators anyway.
+        safe = "".join(c for c in str(key) if c.isalnum() or c in "-_")
+        return os.path.join(self.root, f"{safe}{self.suffix}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Disk cache read failed for {path}: {e}")
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if len(data) > self.max_bytes:
+            return
+        # Atomic write so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Disk cache write failed for {path}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += len(data)
+            needs_scan = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if needs_scan:
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+            self._approx_bytes = total
+
+
+class NDJSONResultCache:
+    """
+    Two-tier cache of complete NDJSON event sequences: an in-memory LRU in front of a
+    size-bounded on-disk store. Disk hits are promoted into memory.
+    """
+
+    def __init__(self, memory_entries: int = 128, disk_dir: Optional[str] = None, disk_max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.memory: LRUCache[str, List[str]] = LRUCache(memory_entries)
+        self.disk: Optional[DiskCache] = None
+        if disk_dir:
+            try:
+                self.disk = DiskCache(disk_dir, disk_max_bytes, suffix=".ndjson")
+            except OSError as e:
+                print(f"SRD disk cache disabled ({disk_dir}): {e}")
+
+    def get(self, key: str) -> Optional[List[str]]:
+        lines = self.memory.get(key)
+        if lines is not None:
+            return lines
+        if self.disk is None:
+            return None
+        data = self.disk.get(key)
+        if data is None:
+            return None
+        lines = data.decode("utf-8").splitlines(keepends=True)
+        self.memory.put(key, lines)
+        return lines
+
+    def put(self, key: str, lines: List[str]) -> None:
+        lines = list(lines)
+        self.memory.put(key, lines)
+        if self.disk is not None:
+            self.disk.put(key, "".join(lines).encode("utf-8"))
+
+
+SRD_CACHE_VERSION = 2  # Bump when cached results change meaning (2: signed distance sign fix)
+
+
+def srd_cache_key(
+    geometry: Dict[str, Any],
+    year: int,
+    mode: str,
+    start_km: float,
+    end_km: float,
+    step_km: float,
+    bands: Sequence[str] | None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Stable key for one SRD analysis: geometry content hash (see services.geometry; pass a
+    canonical geometry), year, engine, bin spec and bands, under SRD_CACHE_VERSION.
+    """
+    material = json.dumps(
+        {
+            "version": SRD_CACHE_VERSION,
+            "geometry": geometry_hash(geometry),
+            "year": int(year),
+            "mode": mode,
+            "bins": [round(float(start_km), 6), round(float(end_km), 6), round(float(step_km), 6)],
+            "bands": list(bands) if bands else None,
+            "extra": extra or {},
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# Shared SRD result cache. Set SRD_CACHE_DIR to an empty string to keep it memory-only.
+srd_result_cache = NDJSONResultCache(
+    memory_entries=_env_int("SRD_CACHE_MEMORY_ENTRIES", 128),
+    disk_dir=os.getenv("SRD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "policy-proof", "srd-cache")),
+    disk_max_bytes=_env_int("SRD_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+)
+
+
+# EE map-id tile templates (services.ee_alphaearth, ee_climate, ee_alphaearth_learn). Map ids
+# stop serving tiles some hours after getMapId, so entries expire well before that and are
+# refreshed in the background during the last `EE_TILE_TEMPLATE_REFRESH_AHEAD_S` seconds.
+tile_template_cache: TTLCache[Any] = TTLCache(
+    ttl_s=_env_int("EE_TILE_TEMPLATE_TTL_S", 4 * 3600),
+    refresh_ahead_s=_env_int("EE_TILE_TEMPLATE_REFRESH_AHEAD_S", 15 * 60),
+    max_entries=_env_int("EE_TILE_TEMPLATE_CACHE_ENTRIES", 256),
+)
@@ -0,0 +1,56 @@
+"""
+Cooperative cancellation for long-running analyses.
+
+A `CancelToken` is shared between the request handler and the analysis generators. The
+handler cancels it when the client disconnects (or the last subscriber of a coalesced
+stream leaves), and it can carry a deadline. Earth Engine calls cannot be interrupted
+once sent, so samplers check the token between calls, drop queued work and stop waiting
+on calls still in flight.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+
+class CancelToken:
+    """Thread-safe cancel flag with an optional deadline (seconds from creation)."""
+
+    def __init__(self, deadline_s: float | None = None) -> None:
+        self.started = time.monotonic()
+        self.deadline = self.started + float(deadline_s) if deadline_s else None
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once `cancel()` was called (the deadline alone does not count)."""
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def should_stop(self) -> bool:
+        return self.cancelled or self.expired
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._event.is_set():
+            return self._reason
+        return "deadline" if self.expired else None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float | None:
+        """Seconds until the deadline (never negative), or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import os
 import json
-from typing import List, Sequence, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
 
 import ee
 
+from .cache import tile_template_cache
+from .ee_catalog import ALPHAEARTH_COLLECTION, alphaearth_catalog
 
 _INITIALIZED = False
 
@@ -57,25 +59,28 @@ def _to_bands_list(bands: Sequence[str] | None) -> List[str]:
 
 
 def alphaearth_image_for_year(year: int, geometry: Dict[str, Any] | None = None) -> ee.Image:
-    """Returns the AlphaEarth Satellite Embedding image for the calendar year."""
+    """
+    Returns the AlphaEarth Satellite Embedding image for the calendar year.
+
+    Year and coverage checks are answered by the local catalog (services.ee_catalog)
+    without a round trip; only while it has not loaded yet is the collection size asked
+    from EE.
+    """
     _ensure_initialized()
     start = f"{int(year)}-01-01"
     end = f"{int(year) + 1}-01-01"
     print(f"Fetching image for year {year}, date range: {start} to {end}")
-    col = ee.ImageCollection("GOOGLE/SATELLITE_EMBEDDING/V1/ANNUAL")
-    print(f"Collection size: {col.size().getInfo()}")
-    col = col.filterDate(start, end)
+    if alphaearth_catalog.has_year(year) is False:
+        raise ValueError(f"No AlphaEarth image available for year {year} (available: {alphaearth_catalog.years()})")
+    covered = alphaearth_catalog.covers(year, geometry) if geometry is not None else alphaearth_catalog.has_year(year)
+    if covered is False:
+        raise ValueError(f"No AlphaEarth image available for year {year} covering the geometry")
+    col = ee.ImageCollection(ALPHAEARTH_COLLECTION).filterDate(start, end)
     if geometry is not None:
         col = col.filterBounds(ee.Geometry(geometry))
-    print(f"Collection size: {col.size().getInfo()}")
-    size = col.size().getInfo()
-    if size == 0:
+    if covered is None and col.size().getInfo() == 0:
         raise ValueError(f"No AlphaEarth image available for year {year} covering the geometry")
-    img = col.mosaic()
-    if img is None:
-        raise ValueError(f"No AlphaEarth image available for year {year}")
-    print(f"Fetched image ID: {img.id().getInfo()}")
-    return ee.Image(img)
+    return ee.Image(col.mosaic())
 
 
 def alphaearth_tile_template(
@@ -91,9 +96,25 @@ def alphaearth_tile_template(
 
     The returned template is suitable for Leaflet XYZ tiles, e.g.:
       L.tileLayer(template, { attribution: 'AlphaEarth via GEE' })
+
+    Templates are cached per (year, bands, vmin, vmax) for the map-id lifetime
+    (services.cache.tile_template_cache).
     """
-    _ensure_initialized()
     used_bands = _to_bands_list(bands)
+    key = ("alphaearth", int(year), tuple(used_bands), float(vmin), float(vmax))
+    return tile_template_cache.get_or_compute(
+        key, lambda: _alphaearth_tile_template(int(year), used_bands, float(vmin), float(vmax))
+    )
+
+
+def _alphaearth_tile_template(
+    year: int,
+    used_bands: List[str],
+    vmin: float,
+    vmax: float,
+) -> Tuple[str, List[str], float, float]:
+    """Uncached alphaearth_tile_template: builds the image graph and calls getMapId."""
+    _ensure_initialized()
     img = alphaearth_image_for_year(year)
     vis = {"bands": used_bands, "min": float(vmin), "max": float(vmax)}
 
@@ -5,8 +5,11 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import ee
 
+from .cache import tile_template_cache
 from .ee_alphaearth import _ensure_initialized, alphaearth_image_for_year
 from .ee_climate import _annual_mean_era5_land_temperature, _annual_mean_modis_lst_day_c
+from .geometry import geometry_hash, simplify_for_scale
+from .tiles import TEMPERATURE_PALETTE
 
 
 def _all_alphaearth_bands() -> List[str]:
@@ -84,8 +87,40 @@ def alphaearth_learned_tile_template(
     using multiple linear regression (across pixels in the ROI), then render the predicted
     target as XYZ tiles.
 
-    Returns (template, bands_used, min, max)
+    Returns (template, bands_used, min, max). Results (and so the regression fit) are
+    cached per parameters and geometry for the map-id lifetime
+    (services.cache.tile_template_cache).
     """
+    key = (
+        "alphaearth_learned",
+        int(year),
+        geometry_hash(geometry) if geometry else None,
+        target,
+        tuple(_bands_list(bands)),
+        int(scale),
+        float(max_pixels),
+        bool(best_effort),
+        vmin,
+        vmax,
+    )
+    return tile_template_cache.get_or_compute(
+        key,
+        lambda: _alphaearth_learned_tile_template(
+            year, geometry, target, bands, scale, max_pixels, best_effort, vmin, vmax
+        ),
+    )
+
+
+def _learned_regression(
+    year: int,
+    geometry: Dict[str, Any] | None,
+    target: str,
+    bands: Sequence[str] | None,
+    scale: int,
+    max_pixels: float,
+    best_effort: bool,
+) -> Tuple[ee.Image, ee.List, List[str], bool]:
+    """Fit the embeddings -> target regression. Returns (embedding image, coefficients, bands, is_celsius)."""
     _ensure_initialized()
 
     # Inputs
@@ -98,7 +133,9 @@ def alphaearth_learned_tile_template(
     if invalid:
         raise ValueError(f"Invalid AlphaEarth band(s) requested: {invalid}. Valid bands are A00..A63.")
 
-    # AOI
+    # AOI, simplified to the regression scale so large boundaries stay cheap to serialize
+    if geometry:
+        geometry, _ = simplify_for_scale(geometry, scale)
     geom = ee.Geometry(geometry) if geometry else None
 
     # Fetch inputs
@@ -133,6 +170,34 @@ def alphaearth_learned_tile_template(
 
     # Convert coefficients to 1D array [num_x] for dot product
     coeffs_list = ee.List(coeffs.toList().map(lambda row: ee.List(row).get(0)))
+    return ae_img, coeffs_list, used_bands, is_celsius
+
+
+def _learned_vis_range(is_celsius: bool, vmin: Optional[float], vmax: Optional[float]) -> Tuple[float, float]:
+    # Visualization defaults (Celsius scale if applicable)
+    if vmin is None or vmax is None:
+        if is_celsius:
+            return -30.0, 30.0
+        # Should not occur with current targets; keep a broad Kelvin window if needed
+        return 240.0, 320.0
+    return float(vmin), float(vmax)
+
+
+def _alphaearth_learned_tile_template(
+    year: int,
+    geometry: Dict[str, Any] | None,
+    target: str,
+    bands: Sequence[str] | None,
+    scale: int,
+    max_pixels: float,
+    best_effort: bool,
+    vmin: Optional[float],
+    vmax: Optional[float],
+) -> Tuple[str, List[str], float, float]:
+    """Uncached alphaearth_learned_tile_template: fits the regression and calls getMapId."""
+    ae_img, coeffs_list, used_bands, is_celsius = _learned_regression(
+        year, geometry, target, bands, scale, max_pixels, best_effort
+    )
     coeffs_arr_1d = ee.Array(coeffs_list)
 
     # Predict target from embeddings for all pixels
@@ -140,28 +205,13 @@ def alphaearth_learned_tile_template(
     predictors_arr = ae_img.toArray()
     coeffs_img = ee.Image.constant(coeffs_arr_1d)
     pred = predictors_arr.arrayDotProduct(coeffs_img).rename(["pred"])
-
-    # Visualization defaults (Celsius scale if applicable)
-    if vmin is None or vmax is None:
-        if is_celsius:
-            vmin_used = -30.0
-            vmax_used = 30.0
-        else:
-            # Should not occur with current targets; keep a broad Kelvin window if needed
-            vmin_used = 240.0
-            vmax_used = 320.0
-    else:
-        vmin_used = float(vmin)
-        vmax_used = float(vmax)
+    vmin_used, vmax_used = _learned_vis_range(is_celsius, vmin, vmax)
 
     vis = {
         "bands": ["pred"],
         "min": float(vmin_used),
         "max": float(vmax_used),
-        "palette": [
-            "#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8",
-            "#ffffbf", "#fee090", "#fdae61", "#f46d43", "#d73027", "#a50026"
-        ],
+        "palette": list(TEMPERATURE_PALETTE),
     }
 
     info = pred.getMapId(vis)
@@ -175,3 +225,37 @@ def alphaearth_learned_tile_template(
         template = f"https://earthengine.googleapis.com/map/{mapid}/{{z}}/{{x}}/{{y}}?token={token}"
 
     return template, used_bands, float(vmin_used), float(vmax_used)
+
+
+def alphaearth_learned_coefficients(
+    year: int,
+    geometry: Dict[str, Any] | None,
+    target: str = "t2m",
+    bands: Sequence[str] | None = None,
+    scale: int = 1000,
+    max_pixels: float = 1e9,
+    best_effort: bool = True,
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Fit the same regression as alphaearth_learned_tile_template and fetch its coefficients,
+    so predictions can be rendered locally from stored embeddings
+    (services.local_tiles). Returns {"year", "target", "bands", "coefficients", "vmin", "vmax"}.
+    """
+    _, coeffs_list, used_bands, is_celsius = _learned_regression(
+        year, geometry, target, bands, scale, max_pixels, best_effort
+    )
+    coefficients = [float(c) for c in coeffs_list.getInfo()]
+    if len(coefficients) != len(used_bands):
+        # The regression returned the [[0]] fallback (no valid pixels in the region)
+        raise ValueError("Regression did not converge for this region; try a larger geometry or scale.")
+    vmin_used, vmax_used = _learned_vis_range(is_celsius, vmin, vmax)
+    return {
+        "year": int(year),
+        "target": target,
+        "bands": used_bands,
+        "coefficients": coefficients,
+        "vmin": vmin_used,
+        "vmax": vmax_used,
+    }
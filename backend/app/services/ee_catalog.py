@@ -0,0 +1,171 @@
+"""
+Local catalog of Earth Engine collection metadata.
+
+Building an image used to cost several blocking `size().getInfo()` round trips per
+request just to learn whether a year exists. The catalog records, for each collection
+we read, which calendar years have images (one grouped getInfo per collection). It is
+loaded once at startup in the background and refreshed periodically; until a collection
+has loaded, lookups answer None ("unknown") and callers fall back to asking EE. AlphaEarth
+coverage of a region is asked once per (year, geometry) on first use and remembered, so
+startup never unions the global tile footprint.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import ee
+
+from .cache import LRUCache, _env_int
+from .geometry import geometry_hash
+
+
+ALPHAEARTH_COLLECTION = "GOOGLE/SATELLITE_EMBEDDING/V1/ANNUAL"
+ERA5_LAND_COLLECTION = "ECMWF/ERA5_LAND/MONTHLY"
+MODIS_LST_COLLECTION = "MODIS/061/MOD11A1"
+
+_COVERAGE_ENTRIES = _env_int("EE_CATALOG_COVERAGE_ENTRIES", 4096)  # Remembered (year, geometry) coverage answers
+
+try:
+    CATALOG_REFRESH_S = float(os.getenv("EE_CATALOG_REFRESH_S", str(6 * 3600)))
+except ValueError:
+    CATALOG_REFRESH_S = 6 * 3600.0
+
+
+class CollectionCatalog:
+    """Available years (and optionally per-region coverage) of one EE image collection."""
+
+    def __init__(self, collection_id: str, first_year: int, coverage: bool = False) -> None:
+        self.collection_id = collection_id
+        self.first_year = int(first_year)
+        self.track_coverage = coverage
+        self.image_counts: Optional[Dict[int, int]] = None
+        self.coverage: LRUCache[str, bool] = LRUCache(_COVERAGE_ENTRIES)
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _year_counts(self) -> Dict[int, int]:
+        """Images per calendar year from first_year to the current year, in one round trip."""
+        col = ee.ImageCollection(self.collection_id)
+        years = ee.List.sequence(self.first_year, datetime.utcnow().year)
+        counts = years.map(lambda y: col.filter(ee.Filter.calendarRange(y, y, "year")).size()).getInfo()
+        return {self.first_year + i: int(n) for i, n in enumerate(counts)}
+
+    def _region_has_images(self, year: int, geometry: Dict[str, Any]) -> bool:
+        col = (
+            ee.ImageCollection(self.collection_id)
+            .filterDate(f"{year}-01-01", f"{year + 1}-01-01")
+            .filterBounds(ee.Geometry(geometry))
+        )
+        return col.size().getInfo() > 0
+
+    def refresh(self) -> None:
+        """Reload year counts from EE; keeps the previous state on failure."""
+        counts = self._year_counts()
+        with self._lock:
+            if counts != self.image_counts:
+                # A new or re-processed year can change coverage anywhere
+                self.coverage = LRUCache(_COVERAGE_ENTRIES)
+            self.image_counts = counts
+            self.loaded_at = time.time()
+        print(f"Catalog {self.collection_id}: years {self.years()}")
+
+    def years(self) -> Optional[List[int]]:
+        """Years with at least one image, or None before the first load."""
+        counts = self.image_counts
+        if counts is None:
+            return None
+        return sorted(y for y, n in counts.items() if n)
+
+    def has_year(self, year: int) -> Optional[bool]:
+        counts = self.image_counts
+        if counts is None:
+            return None
+        if int(year) not in counts:
+            # Outside the loaded range (e.g. a year that started after the last refresh)
+            return None
+        return counts[int(year)] > 0
+
+    def covers(self, year: int, geometry: Dict[str, Any]) -> Optional[bool]:
+        """
+        Whether the year's tiles reach `geometry` (GeoJSON), asked of EE with one
+        filterBounds size check the first time and remembered; None when unknown.
+        """
+        available = self.has_year(year)
+        if not available:
+            return available
+        if not self.track_coverage:
+            return None
+        key = f"{int(year)}:{geometry_hash(geometry)}"
+        covered = self.coverage.get(key)
+        if covered is None:
+            try:
+                covered = self._region_has_images(int(year), geometry)
+            except Exception as e:
+                print(f"Coverage check for {self.collection_id} {year} failed: {e}")
+                return None
+            self.coverage.put(key, covered)
+        return covered
+
+    def latest_year(self) -> Optional[int]:
+        years = self.years()
+        return years[-1] if years else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection_id,
+            "years": self.years(),
+            "coverage_entries": len(self.coverage),
+            "loaded_at": self.loaded_at,
+        }
+
+
+# Shared catalogs
+alphaearth_catalog = CollectionCatalog(ALPHAEARTH_COLLECTION, first_year=2017, coverage=True)
+era5_land_catalog = CollectionCatalog(ERA5_LAND_COLLECTION, first_year=1950)
+modis_lst_catalog = CollectionCatalog(MODIS_LST_COLLECTION, first_year=2000)
+CATALOGS = (alphaearth_catalog, era5_land_catalog, modis_lst_catalog)
+
+_refresh_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def refresh_catalogs() -> None:
+    """Refresh every catalog, logging (not raising) per-collection failures."""
+    # Local import: ee_alphaearth imports this module
+    from .ee_alphaearth import _ensure_initialized
+
+    _ensure_initialized()
+    for catalog in CATALOGS:
+        try:
+            catalog.refresh()
+        except Exception as e:
+            print(f"Catalog refresh failed for {catalog.collection_id}: {e}")
+
+
+def start_catalog_refresh(interval_s: float = CATALOG_REFRESH_S) -> threading.Thread:
+    """Load the catalogs on a daemon thread now and every `interval_s` seconds after that."""
+    global _refresh_thread
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return _refresh_thread
+    _stop.clear()
+
+    def run() -> None:
+        while True:
+            try:
+                refresh_catalogs()
+            except Exception as e:
+                print(f"EE catalog refresh failed: {e}")
+            if interval_s <= 0 or _stop.wait(interval_s):
+                return
+
+    _refresh_thread = threading.Thread(target=run, name="ee-catalog-refresh", daemon=True)
+    _refresh_thread.start()
+    return _refresh_thread
+
+
+def stop_catalog_refresh() -> None:
+    _stop.set()
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
 import ee
 
+from .cache import tile_template_cache
 # Reuse EE init from AlphaEarth helper
 from .ee_alphaearth import _ensure_initialized
+from .ee_catalog import ERA5_LAND_COLLECTION, MODIS_LST_COLLECTION, era5_land_catalog, modis_lst_catalog
+from .tiles import DIFFERENCE_PALETTE, TEMPERATURE_PALETTE
+
+
+def _check_year(catalog: Any, year: int, col: ee.ImageCollection, message: str) -> None:
+    """Raise ValueError if `col` has no images for `year`, asking EE only if the catalog cannot tell."""
+    available = catalog.has_year(year)
+    if available is None:
+        available = col.size().getInfo() > 0
+    if not available:
+        raise ValueError(message)
 
 
 def _annual_mean_era5_land_temperature(year: int) -> ee.Image:
@@ -17,13 +29,11 @@ def _annual_mean_era5_land_temperature(year: int) -> ee.Image:
     start = f"{int(year)}-01-01"
     end = f"{int(year) + 1}-01-01"
     col = (
-        ee.ImageCollection("ECMWF/ERA5_LAND/MONTHLY")
+        ee.ImageCollection(ERA5_LAND_COLLECTION)
         .filterDate(start, end)
         .select(["temperature_2m"])
     )
-    size = col.size().getInfo()
-    if size == 0:
-        raise ValueError(f"No ERA5-Land MONTHLY temperature_2m data for year {year}")
+    _check_year(era5_land_catalog, int(year), col, f"No ERA5-Land MONTHLY temperature_2m data for year {year}")
     img = col.mean().rename(["t2m"])  # Kelvin
     return ee.Image(img).set({"year": int(year)})
 
@@ -38,13 +48,11 @@ def _annual_mean_modis_lst_day_c(year: int) -> ee.Image:
     start = f"{int(year)}-01-01"
     end = f"{int(year) + 1}-01-01"
     col = (
-        ee.ImageCollection("MODIS/061/MOD11A1")
+        ee.ImageCollection(MODIS_LST_COLLECTION)
         .filterDate(start, end)
         .select(["LST_Day_1km"])
     )
-    size = col.size().getInfo()
-    if size == 0:
-        raise ValueError(f"No MODIS LST_Day_1km data for year {year}")
+    _check_year(modis_lst_catalog, int(year), col, f"No MODIS LST_Day_1km data for year {year}")
     # Convert each image to Celsius then mean
     def to_celsius(img: ee.Image) -> ee.Image:
         # MODIS scale factor 0.02, units Kelvin; convert to Celsius
@@ -72,11 +80,29 @@ def climate_temperature_tile_template(
       - Difference map (y2 - y1):
           source=era5land|modis, y1=YYYY, y2=YYYY
 
-    Returns (template, vmin_used, vmax_used).
+    Returns (template, vmin_used, vmax_used). Templates are cached per parameters for the
+    map-id lifetime (services.cache.tile_template_cache).
     """
-    _ensure_initialized()
     src = (source or "era5land").strip().lower()
     is_diff = (y1 is not None and y2 is not None)
+    years = (int(y1), int(y2)) if is_diff else (int(year or 2000),)
+    key = ("climate", src, years, vmin, vmax)
+    return tile_template_cache.get_or_compute(
+        key, lambda: _climate_temperature_tile_template(src, year, y1, y2, vmin, vmax)
+    )
+
+
+def _climate_temperature_tile_template(
+    src: str,
+    year: Optional[int],
+    y1: Optional[int],
+    y2: Optional[int],
+    vmin: Optional[float],
+    vmax: Optional[float],
+) -> Tuple[str, float, float]:
+    """Uncached climate_temperature_tile_template for a normalized `src`."""
+    _ensure_initialized()
+    is_diff = (y1 is not None and y2 is not None)
 
     if src == "era5land":
         if is_diff:
@@ -88,7 +114,7 @@ def climate_temperature_tile_template(
                 "bands": ["dT_C"],
                 "min": float(vmin if vmin is not None else -5.0),
                 "max": float(vmax if vmax is not None else 5.0),
-                "palette": ["#2166ac", "#67a9cf", "#f7f7f7", "#f4a582", "#b2182b"],
+                "palette": list(DIFFERENCE_PALETTE),
             }
             info = diff.getMapId(vis)
             template = info["tile_fetcher"].url_format
@@ -101,10 +127,7 @@ def climate_temperature_tile_template(
                 "bands": ["T2M_C"],
                 "min": float(vmin if vmin is not None else -30.0),
                 "max": float(vmax if vmax is not None else 30.0),
-                "palette": [
-                    "#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8",
-                    "#ffffbf", "#fee090", "#fdae61", "#f46d43", "#d73027", "#a50026"
-                ],
+                "palette": list(TEMPERATURE_PALETTE),
             }
             info = temp_c.getMapId(vis)
             template = info["tile_fetcher"].url_format
@@ -119,7 +142,7 @@ def climate_temperature_tile_template(
                 "bands": ["dLST_C"],
                 "min": float(vmin if vmin is not None else -5.0),
                 "max": float(vmax if vmax is not None else 5.0),
-                "palette": ["#2166ac", "#67a9cf", "#f7f7f7", "#f4a582", "#b2182b"],
+                "palette": list(DIFFERENCE_PALETTE),
             }
             info = diff.getMapId(vis)
             template = info["tile_fetcher"].url_format
@@ -130,14 +153,11 @@ def climate_temperature_tile_template(
                 "bands": ["LST_Day_C"],
                 "min": float(vmin if vmin is not None else -30.0),
                 "max": float(vmax if vmax is not None else 45.0),
-                "palette": [
-                    "#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8",
-                    "#ffffbf", "#fee090", "#fdae61", "#f46d43", "#d73027", "#a50026"
-                ],
+                "palette": list(TEMPERATURE_PALETTE),
             }
             info = img.getMapId(vis)
             template = info["tile_fetcher"].url_format
             return template, float(vis["min"]), float(vis["max"])
 
     else:
-        raise ValueError(f"Unsupported climate source: {source!r}")
+        raise ValueError(f"Unsupported climate source: {src!r}")
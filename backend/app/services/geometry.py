@@ -0,0 +1,232 @@
+"""
+Canonical GeoJSON geometries.
+
+Clients send the same polygon with float noise, either ring orientation, duplicate or
+rotated vertices and in any part order. `canonicalize_geometry` maps all of those to one
+representation (validated, RFC 7946 orientation, quantized, deduplicated, rings starting
+at their smallest vertex, parts sorted), so `geometry_hash` is a stable content key for
+every cache and dedup layer.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+from pyproj import CRS, Transformer
+from shapely.geometry import MultiPolygon, mapping, shape
+from shapely.geometry.base import BaseGeometry
+from shapely.geometry.polygon import orient
+from shapely.ops import transform
+from shapely.validation import make_valid
+
+
+# Decimal places kept for lon/lat: 6 is ~0.1 m, far below the 10 m analysis scale
+try:
+    GEOMETRY_PRECISION = int(os.getenv("SRD_GEOMETRY_PRECISION", "6"))
+except ValueError:
+    GEOMETRY_PRECISION = 6
+
+_SUPPORTED_TYPES = ("Point", "MultiPoint", "LineString", "MultiLineString", "Polygon", "MultiPolygon")
+
+
+class InvalidGeometry(ValueError):
+    """The geometry cannot be analysed (malformed, out of range or empty after repair)."""
+
+
+def _quantize(coord: Sequence[Any], precision: int) -> List[float]:
+    if not isinstance(coord, (list, tuple)) or len(coord) < 2:
+        raise InvalidGeometry(f"Invalid coordinate {coord!r}")
+    try:
+        lon, lat = float(coord[0]), float(coord[1])
+    except (TypeError, ValueError):
+        raise InvalidGeometry(f"Invalid coordinate {coord!r}")
+    if not (math.isfinite(lon) and math.isfinite(lat)) or not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        raise InvalidGeometry(f"Coordinate out of range: {coord!r}")
+    # + 0.0 turns -0.0 into 0.0 so both hash the same
+    return [round(lon, precision) + 0.0, round(lat, precision) + 0.0]
+
+
+def _dedupe(coords: List[List[float]]) -> List[List[float]]:
+    """Drop consecutive duplicate vertices."""
+    out: List[List[float]] = []
+    for c in coords:
+        if not out or c != out[-1]:
+            out.append(c)
+    return out
+
+
+def _canonical_ring(ring: Sequence[Any], precision: int) -> List[List[float]] | None:
+    """Quantized, deduplicated, closed ring starting at its smallest vertex; None if degenerate."""
+    coords = _dedupe([_quantize(c, precision) for c in ring])
+    if len(coords) > 1 and coords[0] == coords[-1]:
+        coords = coords[:-1]
+    if len(coords) < 3:
+        return None
+    start = min(range(len(coords)), key=lambda i: coords[i])
+    coords = coords[start:] + coords[:start]
+    return coords + [coords[0]]
+
+
+def _canonical_polygons(geom: Dict[str, Any], precision: int) -> List[List[List[List[float]]]]:
+    """Polygon parts (lists of rings) after quantization and vertex cleanup."""
+    parts = [geom["coordinates"]] if geom["type"] == "Polygon" else list(geom["coordinates"])
+    polygons = []
+    for part in parts:
+        if not isinstance(part, (list, tuple)) or not part:
+            continue
+        shell = _canonical_ring(part[0], precision)
+        if shell is None:
+            continue
+        holes = sorted(h for h in (_canonical_ring(r, precision) for r in part[1:]) if h is not None)
+        polygons.append([shell, *holes])
+    return polygons
+
+
+def _oriented(geom: Any) -> Dict[str, Any]:
+    """Repair with make_valid, keep the areal parts and orient them per RFC 7946 (CCW shells)."""
+    if not geom.is_valid:
+        geom = make_valid(geom)
+    if geom.geom_type == "GeometryCollection":
+        parts = [g for g in geom.geoms if g.geom_type in ("Polygon", "MultiPolygon")]
+        polys = []
+        for g in parts:
+            polys.extend(g.geoms if g.geom_type == "MultiPolygon" else [g])
+        geom = MultiPolygon(polys) if len(polys) != 1 else polys[0]
+    if geom.is_empty or geom.area <= 0:
+        raise InvalidGeometry("Polygon has no area after repair")
+    if geom.geom_type == "Polygon":
+        return mapping(orient(geom, 1.0))
+    return mapping(type(geom)([orient(p, 1.0) for p in geom.geoms]))
+
+
+def canonicalize_geometry(geometry: Dict[str, Any], precision: int | None = None) -> Dict[str, Any]:
+    """
+    Canonical form of a GeoJSON geometry. Polygons are validated (and repaired where
+    possible), oriented CCW/CW for shells/holes, quantized to `precision` decimals with
+    duplicate vertices removed, each ring rotated to start at its smallest vertex, and
+    MultiPolygon parts sorted; a single-part MultiPolygon becomes a Polygon.
+    Raises InvalidGeometry for anything that cannot be analysed.
+    """
+    precision = GEOMETRY_PRECISION if precision is None else int(precision)
+    if not isinstance(geometry, dict) or geometry.get("type") not in _SUPPORTED_TYPES:
+        kind = geometry.get("type") if isinstance(geometry, dict) else type(geometry).__name__
+        raise InvalidGeometry(f"Unsupported geometry type {kind!r}; expected one of {list(_SUPPORTED_TYPES)}")
+    gtype = geometry["type"]
+    coords = geometry.get("coordinates")
+    if not isinstance(coords, (list, tuple)) or not coords:
+        raise InvalidGeometry(f"{gtype} has no coordinates")
+
+    if gtype == "Point":
+        return {"type": "Point", "coordinates": _quantize(coords, precision)}
+    if gtype == "MultiPoint":
+        pts = sorted({tuple(_quantize(c, precision)) for c in coords})
+        return {"type": "MultiPoint", "coordinates": [list(p) for p in pts]}
+    if gtype in ("LineString", "MultiLineString"):
+        lines = [coords] if gtype == "LineString" else list(coords)
+        lines = [_dedupe([_quantize(c, precision) for c in line]) for line in lines]
+        lines = [line for line in lines if len(line) >= 2]
+        if not lines:
+            raise InvalidGeometry(f"{gtype} has fewer than two distinct vertices")
+        if gtype == "LineString":
+            return {"type": "LineString", "coordinates": lines[0]}
+        return {"type": "MultiLineString", "coordinates": sorted(lines)}
+
+    polygons = _canonical_polygons(geometry, precision)
+    if not polygons:
+        raise InvalidGeometry(f"{gtype} has no ring with three distinct vertices")
+    try:
+        geom = shape({"type": "MultiPolygon", "coordinates": polygons})
+        fixed = _oriented(geom)
+    except InvalidGeometry:
+        raise
+    except Exception as e:
+        raise InvalidGeometry(f"Invalid {gtype}: {e}")
+    # Repair and orientation may move vertices; quantize and clean once more
+    polygons = sorted(_canonical_polygons(fixed, precision))
+    if not polygons:
+        raise InvalidGeometry(f"{gtype} is empty after repair")
+    if len(polygons) == 1:
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def geometry_hash(geometry: Any) -> str:
+    """Stable content hash of an (already canonical) geometry or any JSON-able structure of them."""
+    material = json.dumps(geometry, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+# Simplification before EE submission
+_SIMPLIFY_MIN_VERTICES = 64  # Smaller geometries are sent as-is
+_SIMPLIFY_BIN_FRACTION = 0.05  # Tolerance is at most this share of the bin width
+
+
+def local_metric_crs(geom: BaseGeometry) -> CRS:
+    """Azimuthal equidistant projection centred on the geometry: distances in meters, low distortion."""
+    c = geom.centroid
+    return CRS.from_proj4(f"+proj=aeqd +lat_0={c.y} +lon_0={c.x} +datum=WGS84 +units=m +no_defs")
+
+
+def vertex_count(geometry: Dict[str, Any]) -> int:
+    def count(coords: Any) -> int:
+        if coords and isinstance(coords[0], (int, float)):
+            return 1
+        return sum(count(c) for c in coords)
+
+    return count(geometry.get("coordinates") or [])
+
+
+def simplify_tolerance_m(scale: float, bin_width_km: float | None = None) -> float:
+    """
+    Simplification tolerance (meters): half a pixel at the analysis `scale`, and never more
+    than a small fraction of the distance-bin width, so ring areas barely move.
+    """
+    tol = float(scale) / 2
+    if bin_width_km:
+        tol = min(tol, _SIMPLIFY_BIN_FRACTION * float(bin_width_km) * 1000)
+    return max(tol, 0.0)
+
+
+def simplify_for_scale(
+    geometry: Dict[str, Any],
+    scale: float,
+    bin_width_km: float | None = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Topology-preserving simplification (in a local metric projection) of a canonical
+    geometry before it is serialized to EE. Returns (geometry, stats) where stats reports
+    vertex counts, GeoJSON payload bytes before/after and the tolerance used. Points and
+    geometries with few vertices are returned unchanged.
+    """
+    tol = simplify_tolerance_m(scale, bin_width_km)
+    before_vertices = vertex_count(geometry)
+    before_bytes = len(json.dumps(geometry, separators=(",", ":")))
+    out = geometry
+    if tol > 0 and before_vertices > _SIMPLIFY_MIN_VERTICES and "Point" not in geometry.get("type", ""):
+        try:
+            geom = shape(geometry)
+            crs = local_metric_crs(geom)
+            to_metric = Transformer.from_crs("EPSG:4326", crs, always_xy=True).transform
+            to_wgs84 = Transformer.from_crs(crs, "EPSG:4326", always_xy=True).transform
+            simplified = transform(to_metric, geom).simplify(tol, preserve_topology=True)
+            if not simplified.is_empty:
+                out = canonicalize_geometry(mapping(transform(to_wgs84, simplified)))
+        except Exception as e:
+            print(f"Geometry simplification skipped: {e}")
+            out = geometry
+    stats = {
+        "vertices_before": before_vertices,
+        "vertices_after": vertex_count(out),
+        "bytes_before": before_bytes,
+        "bytes_after": len(json.dumps(out, separators=(",", ":"))),
+        "tolerance_m": round(tol, 3),
+    }
+    if out is not geometry:
+        print(
+            f"Simplified geometry at {tol:.1f} m: {stats['vertices_before']} -> {stats['vertices_after']} vertices, "
+            f"{stats['bytes_before']} -> {stats['bytes_after']} bytes"
+        )
+    return out, stats
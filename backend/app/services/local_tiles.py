@@ -0,0 +1,186 @@
+"""
+Local tile rendering from stored embedding rasters, without Earth Engine.
+
+Regions we monitor continuously can be exported once as embedding rasters (see
+services.tiles.EmbeddingRaster) into `LOCAL_RASTER_DIR`; their tiles are then rendered
+with NumPy on request: RGB composites of three bands, single bands through the EE
+climate palettes, and learned-regression predictions from stored coefficients
+(ee_alphaearth_learn.alphaearth_learned_coefficients, saved under `<dir>/models/`).
+Rendered PNGs are kept in a memory LRU.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from .cache import LRUCache, _env_int
+from .geometry import geometry_hash
+from .tiles import (
+    PALETTES,
+    EmbeddingRaster,
+    TEMPERATURE_PALETTE,
+    encode_png,
+    render_linear_tile,
+    render_palette_tile,
+    render_rgb_tile,
+)
+
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+_OVERVIEW_RE = re.compile(r"\.ov\d+$")  # <name>.ov2.npy etc. belong to <name>
+
+
+class LocalTileNotFound(LookupError):
+    """No raster or stored model with the requested name."""
+
+
+def _check_name(name: str) -> str:
+    # Names become file names; refuse anything that could leave the directory
+    if not _NAME_RE.match(name or "") or name.startswith("."):
+        raise LocalTileNotFound(f"Invalid name {name!r}")
+    return name
+
+
+class LocalTileRenderer:
+    """Renders PNG tiles from the embedding rasters and learned models in `raster_dir`."""
+
+    def __init__(self, raster_dir: str, memory_entries: int = 1024) -> None:
+        self.raster_dir = raster_dir
+        self.model_dir = os.path.join(raster_dir, "models")
+        self.memory_entries = memory_entries
+        self.tiles: LRUCache[str, bytes] = LRUCache(memory_entries)
+        self._rasters: Dict[str, EmbeddingRaster] = {}
+        self._lock = threading.Lock()
+
+    def raster(self, name: str) -> EmbeddingRaster:
+        _check_name(name)
+        with self._lock:
+            raster = self._rasters.get(name)
+            if raster is None:
+                path = os.path.join(self.raster_dir, f"{name}.npy")
+                if not os.path.exists(path):
+                    raise LocalTileNotFound(f"No local raster {name!r}")
+                raster = EmbeddingRaster(path)
+                self._rasters[name] = raster
+            return raster
+
+    def reload(self) -> None:
+        """Forget opened rasters and rendered tiles (after rasters were replaced on disk)."""
+        with self._lock:
+            self._rasters.clear()
+            self.tiles = LRUCache(self.memory_entries)
+
+    def raster_names(self) -> List[str]:
+        try:
+            files = os.listdir(self.raster_dir)
+        except OSError:
+            return []
+        names = [f[:-4] for f in files if f.endswith(".npy") and not _OVERVIEW_RE.search(f[:-4])]
+        return sorted(n for n in names if os.path.exists(os.path.join(self.raster_dir, f"{n}.json")))
+
+    # --- Learned models ------------------------------------------------------------------------
+
+    def save_model(self, model: Dict[str, Any]) -> str:
+        """Store a learned model ({"bands", "coefficients", "vmin", "vmax", ...}); returns its id."""
+        if len(model["bands"]) != len(model["coefficients"]):
+            raise ValueError("A model needs one coefficient per band")
+        model_id = geometry_hash(model)[:16]
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = os.path.join(self.model_dir, f"{model_id}.json")
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(model, f)
+        os.replace(tmp, path)
+        return model_id
+
+    def model(self, model_id: str) -> Dict[str, Any]:
+        path = os.path.join(self.model_dir, f"{_check_name(model_id)}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise LocalTileNotFound(f"No stored model {model_id!r}")
+
+    def model_ids(self) -> List[str]:
+        try:
+            return sorted(f[:-5] for f in os.listdir(self.model_dir) if f.endswith(".json"))
+        except OSError:
+            return []
+
+    # --- Rendering -----------------------------------------------------------------------------
+
+    def _cached(self, key_parts: List[Any], render) -> Optional[bytes]:
+        key = geometry_hash(key_parts)
+        data = self.tiles.get(key)
+        if data is None:
+            rgba = render()
+            data = encode_png(rgba) if rgba is not None else b""
+            self.tiles.put(key, data)
+        return data or None
+
+    def render_rgb(self, name: str, z: int, x: int, y: int, bands: Sequence[str], vmin: float, vmax: float) -> Optional[bytes]:
+        """PNG of an RGB band composite, or None when the tile has no data."""
+        raster = self.raster(name)
+        raster.band_indices(bands)
+        return self._cached(
+            ["rgb", name, list(bands), float(vmin), float(vmax), z, x, y],
+            lambda: render_rgb_tile(raster, z, x, y, bands, vmin, vmax),
+        )
+
+    def render_band(
+        self, name: str, z: int, x: int, y: int, band: str, vmin: float, vmax: float, palette: str = "temperature"
+    ) -> Optional[bytes]:
+        """PNG of one band through a named palette (services.tiles.PALETTES)."""
+        if palette not in PALETTES:
+            raise ValueError(f"Unknown palette {palette!r}; use one of {sorted(PALETTES)}")
+        raster = self.raster(name)
+        raster.band_indices([band])
+        return self._cached(
+            ["band", name, band, float(vmin), float(vmax), palette, z, x, y],
+            lambda: render_palette_tile(raster, z, x, y, band, vmin, vmax, PALETTES[palette]),
+        )
+
+    def render_learned(
+        self, name: str, model_id: str, z: int, x: int, y: int, vmin: Optional[float] = None, vmax: Optional[float] = None
+    ) -> Optional[bytes]:
+        """PNG of a stored learned model's prediction, in the palette of the EE learned tiles."""
+        raster = self.raster(name)
+        model = self.model(model_id)
+        raster.band_indices(model["bands"])
+        lo = float(vmin if vmin is not None else model.get("vmin", -30.0))
+        hi = float(vmax if vmax is not None else model.get("vmax", 30.0))
+        return self._cached(
+            ["learned", name, model_id, lo, hi, z, x, y],
+            lambda: render_linear_tile(
+                raster, z, x, y, model["bands"], model["coefficients"], lo, hi, TEMPERATURE_PALETTE,
+                intercept=float(model.get("intercept", 0.0)),
+            ),
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        rasters = []
+        for name in self.raster_names():
+            try:
+                r = self.raster(name)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Local raster {name} unreadable: {e}")
+                continue
+            rasters.append({
+                "name": name,
+                "bounds": list(r.bounds),
+                "bands": r.bands,
+                "shape": list(r.data.shape),
+                "overviews": [f for f, _ in r.levels[1:]],
+            })
+        return {"rasters": rasters, "models": self.model_ids()}
+
+
+# Shared local renderer
+local_tile_renderer = LocalTileRenderer(
+    raster_dir=os.getenv("LOCAL_RASTER_DIR", os.path.join(tempfile.gettempdir(), "policy-proof", "rasters")),
+    memory_entries=_env_int("LOCAL_TILE_MEMORY_ENTRIES", 1024),
+)
@@ -0,0 +1,89 @@
+"""
+Spatial index of analysed distance rings and their per-bin results.
+
+When a user nudges a border and re-runs an analysis, most rings are unchanged or almost
+so. `RingResultIndex` keeps recently reduced rings in a shapely STRtree keyed by their
+analysis context (year, bands, scale); a new ring whose symmetric difference with an
+indexed ring is within a small fraction of their union reuses that ring's result, and
+only the rings that really moved go back to Earth Engine.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+from shapely.strtree import STRtree
+
+from .geometry import geometry_hash
+
+
+_RING_INDEX_MAX = 4096  # Rings kept across all analyses (oldest evicted first)
+_RING_REUSE_TOLERANCE = 0.01  # Max symmetric-difference / union area ratio for reuse
+
+
+class RingResultIndex:
+    """Thread-safe, bounded STRtree of (ring polygon, context, result) entries."""
+
+    def __init__(self, max_entries: int = _RING_INDEX_MAX, tolerance: float = _RING_REUSE_TOLERANCE) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.tolerance = float(tolerance)
+        # key -> (polygon, context, result); insertion order doubles as age
+        self._entries: "OrderedDict[str, Tuple[BaseGeometry, Hashable, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tree: Optional[STRtree] = None
+        self._tree_keys: List[str] = []
+
+    def _rebuild(self) -> None:
+        # STRtree is immutable; rebuild lazily after inserts/evictions
+        self._tree_keys = list(self._entries)
+        geoms = [self._entries[k][0] for k in self._tree_keys]
+        self._tree = STRtree(geoms) if geoms else None
+
+    def lookup(self, ring: Dict[str, Any], context: Hashable) -> Optional[Dict[str, Any]]:
+        """Result of an indexed ring in `context` that matches `ring` within tolerance, else None."""
+        key = geometry_hash([ring, context])
+        with self._lock:
+            exact = self._entries.get(key)
+            if exact is not None:
+                self._entries.move_to_end(key)
+                return exact[2]
+            if self._tree is None:
+                self._rebuild()
+            if self._tree is None:
+                return None
+            poly = shape(ring)
+            best: Tuple[float, Optional[str]] = (self.tolerance, None)
+            for idx in self._tree.query(poly):
+                cand_key = self._tree_keys[int(idx)]
+                entry = self._entries.get(cand_key)
+                if entry is None or entry[1] != context:
+                    continue
+                union_area = entry[0].union(poly).area
+                if union_area <= 0:
+                    continue
+                ratio = entry[0].symmetric_difference(poly).area / union_area
+                if ratio <= best[0]:
+                    best = (ratio, cand_key)
+            if best[1] is None:
+                return None
+            self._entries.move_to_end(best[1])
+            return self._entries[best[1]][2]
+
+    def add(self, ring: Dict[str, Any], context: Hashable, result: Dict[str, Any]) -> None:
+        key = geometry_hash([ring, context])
+        with self._lock:
+            self._entries[key] = (shape(ring), context, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._tree = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared across requests
+ring_result_index = RingResultIndex()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pyproj import Transformer
+from shapely.geometry import mapping, shape
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import transform, unary_union
+
+from .cache import LRUCache
+from .geometry import geometry_hash, local_metric_crs
+
+
+# Projected geometries keyed by geometry hash, and rings keyed by geometry hash, interval and tolerance
+_METRIC_CACHE: LRUCache[str, Tuple[BaseGeometry, Callable[..., Any]]] = LRUCache(64)
+_RING_CACHE: LRUCache[Tuple[str, float, float, float], Optional[Dict[str, Any]]] = LRUCache(4096)
+_BUFFER_QUAD_SEGS = 16
+
+
+def _ring(metric: BaseGeometry, low_km: float, high_km: float) -> BaseGeometry:
+    """
+    Ring between two signed distances (km) from the border; negative is outside.
+    Mirrors services.analyze._ring_geometry, computed locally.
+    """
+    if high_km <= 0:  # Outside (negative)
+        inner = metric.buffer(abs(high_km) * 1000, quad_segs=_BUFFER_QUAD_SEGS)
+        outer = metric.buffer(abs(low_km) * 1000, quad_segs=_BUFFER_QUAD_SEGS)
+    else:  # Inside (positive)
+        inner = metric.buffer(-high_km * 1000, quad_segs=_BUFFER_QUAD_SEGS)
+        outer = metric.buffer(-low_km * 1000, quad_segs=_BUFFER_QUAD_SEGS)
+    return outer.difference(inner)
+
+
+def _metric_geometry(geometry: Dict[str, Any], key: str) -> Tuple[BaseGeometry, Callable[..., Any]]:
+    """The geometry in its local metric projection, plus the inverse transform to EPSG:4326."""
+    cached = _METRIC_CACHE.get(key)
+    if cached is not None:
+        return cached
+    geom = shape(geometry)
+    if not geom.is_valid:
+        geom = geom.buffer(0)
+    crs = local_metric_crs(geom)
+    to_metric = Transformer.from_crs("EPSG:4326", crs, always_xy=True).transform
+    to_wgs84 = Transformer.from_crs(crs, "EPSG:4326", always_xy=True).transform
+    entry = (transform(to_metric, geom), to_wgs84)
+    _METRIC_CACHE.put(key, entry)
+    return entry
+
+
+def local_ring_intervals(
+    geometry: Dict[str, Any],
+    intervals: Sequence[Tuple[float, float]],
+    tolerance_m: float = 5.0,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    GeoJSON (EPSG:4326) ring polygons for arbitrary (low_km, high_km) intervals, computed
+    with shapely in a local metric projection and simplified to `tolerance_m`. Empty rings
+    (e.g. deeper inside than the polygon is wide) are None. Each ring is cached by geometry
+    hash, interval and tolerance, so rings are shared across bin specs, years and bands.
+    """
+    key = geometry_hash(geometry)
+    rings: List[Optional[Dict[str, Any]]] = []
+    metric = to_wgs84 = None
+    for low, high in intervals:
+        ring_key = (key, round(float(low), 6), round(float(high), 6), round(float(tolerance_m), 3))
+        ring_geojson = _RING_CACHE.get(ring_key)
+        if ring_geojson is None and ring_key not in _RING_CACHE:
+            if metric is None:
+                metric, to_wgs84 = _metric_geometry(geometry, key)
+            ring = _ring(metric, low, high)
+            if tolerance_m > 0:
+                ring = ring.simplify(tolerance_m, preserve_topology=True)
+            if ring.geom_type == "GeometryCollection":
+                ring = unary_union([g for g in ring.geoms if g.geom_type in ("Polygon", "MultiPolygon")])
+            ring_geojson = None if ring.is_empty or ring.area <= 0 else mapping(transform(to_wgs84, ring))
+            _RING_CACHE.put(ring_key, ring_geojson)
+        rings.append(ring_geojson)
+    return rings
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces identical concurrent calls: the first caller for a key runs `fn`, and
+    callers that arrive while it runs wait for and share its result (or exception).
+    Nothing is remembered once the call finishes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _StreamFlight(Generic[T]):
+    def __init__(self, source: Iterator[T], on_abandon: Optional[Callable[[], None]] = None) -> None:
+        self.source = source
+        self.on_abandon = on_abandon
+        self.items: List[T] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        # Held by whichever subscriber is currently advancing `source`
+        self.pump = threading.Lock()
+        self.cond = threading.Condition()
+
+
+class StreamSingleFlight(Generic[T]):
+    """
+    Coalesces identical in-flight streams: one source iterator runs per key and every
+    concurrent subscriber receives the full item sequence, including items emitted
+    before it joined.
+
+    There is no background thread. Whichever subscriber needs the next item advances
+    the shared source, so work runs in the request threads and stops cleanly when the
+    last subscriber goes away.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _StreamFlight[T]] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def subscribe(
+        self,
+        key: str,
+        factory: Callable[[], Iterable[T]],
+        on_abandon: Optional[Callable[[], None]] = None,
+    ) -> Iterator[T]:
+        """
+        Join the flight for `key`, starting it with `factory()` if none is running.
+        `on_abandon` (kept only from the subscriber that starts the flight) is called when
+        the last subscriber leaves before the source is exhausted, e.g. to cancel its work.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _StreamFlight(iter(factory()), on_abandon)
+                self._flights[key] = flight
+            else:
+                print(f"Joining in-flight stream {key[:8]} ({len(flight.items)} items already emitted)")
+            flight.subscribers += 1
+        return self._follow(key, flight)
+
+    def _finish(self, key: str, flight: _StreamFlight[T], error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            flight.error = error
+            flight.done = True
+            flight.cond.notify_all()
+
+    def _advance(self, key: str, flight: _StreamFlight[T], seen: int) -> None:
+        """Pull one item from the shared source if nobody else is doing so."""
+        if not flight.pump.acquire(blocking=False):
+            with flight.cond:
+                if len(flight.items) <= seen and not flight.done:
+                    flight.cond.wait(timeout=0.5)
+            return
+        try:
+            if len(flight.items) > seen or flight.done:
+                return
+            try:
+                item = next(flight.source)
+            except StopIteration:
+                self._finish(key, flight)
+                return
+            except Exception as e:
+                self._finish(key, flight, e)
+                return
+            with flight.cond:
+                flight.items.append(item)
+                flight.cond.notify_all()
+        finally:
+            flight.pump.release()
+
+    def _follow(self, key: str, flight: _StreamFlight[T]) -> Iterator[T]:
+        seen = 0
+        try:
+            while True:
+                if seen < len(flight.items):
+                    item = flight.items[seen]
+                    seen += 1
+                    yield item
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                self._advance(key, flight, seen)
+        finally:
+            self._leave(key, flight)
+
+    def _leave(self, key: str, flight: _StreamFlight[T]) -> None:
+        with self._lock:
+            flight.subscribers -= 1
+            abandoned = flight.subscribers == 0 and not flight.done
+            if abandoned and self._flights.get(key) is flight:
+                del self._flights[key]
+        if abandoned:
+            if flight.on_abandon is not None:
+                try:
+                    flight.on_abandon()
+                except Exception as e:
+                    print(f"Error cancelling abandoned stream {key[:8]}: {e}")
+            # Nobody is left to advance the source; close it so it can release its resources.
+            try:
+                with flight.pump:
+                    close = getattr(flight.source, "close", None)
+                    if close is not None:
+                        close()
+            except Exception as e:
+                print(f"Error closing abandoned stream {key[:8]}: {e}")
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
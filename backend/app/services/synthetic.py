@@ -0,0 +1,134 @@
+"""
+Synthetic SRD workloads (no Earth Engine).
+
+Profiles are generated with NumPy in one vectorized pass: a linear trend with a jump of
+`delta` at the border, one of several noise models, randomly missing bins and plausible
+sample counts. `synthetic_srd_points` streams them with optional per-point latency, so
+the full /api/analyze path can be load-tested with realistic payload sizes and timings.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, Generator, List, Optional, Sequence
+
+import numpy as np
+
+
+NOISE_MODELS = ("gaussian", "heteroscedastic", "student_t", "ar1", "none")
+MAX_SYNTHETIC_BINS = 100_000
+
+
+def seed_for_geometry(geometry: Dict[str, Any] | None) -> int:
+    """Deterministic 32-bit seed from a geometry, so the same polygon gives the same profile."""
+    try:
+        material = json.dumps(geometry, sort_keys=True)[:512]
+    except Exception:
+        material = "default"
+    return int(hashlib.sha1(material.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _noise(rng: np.random.Generator, model: str, sigma: float, distances: np.ndarray, ar_rho: float) -> np.ndarray:
+    n = len(distances)
+    if model == "none":
+        return np.zeros(n)
+    if model == "gaussian":
+        return rng.normal(0.0, sigma, n)
+    if model == "heteroscedastic":
+        # Noise grows slowly with distance from the border
+        return rng.normal(0.0, 1.0, n) * sigma * (1.0 + 0.05 * np.abs(distances))
+    if model == "student_t":
+        return sigma * rng.standard_t(3, n)
+    if model == "ar1":
+        # Stationary AR(1) along distance: filter white noise with a truncated rho**k kernel
+        k = max(1, min(n, int(np.ceil(np.log(1e-6) / np.log(max(min(ar_rho, 0.999), 1e-6))))))
+        kernel = ar_rho ** np.arange(k)
+        white = rng.normal(0.0, sigma * np.sqrt(1.0 - ar_rho ** 2), n + k - 1)
+        return np.convolve(white, kernel, mode="valid")[:n]
+    raise ValueError(f"Unsupported noise model {model!r}; expected one of {NOISE_MODELS}")
+
+
+def synthetic_profile(
+    seed: int,
+    start_km: float = -2.0,
+    end_km: float = 2.0,
+    step_km: float = 0.1,
+    n_bins: int | None = None,
+    base: float = 50.0,
+    slope: float = 2.0,
+    delta: float = 8.0,
+    noise: str = "gaussian",
+    noise_sigma: float = 2.0,
+    ar_rho: float = 0.6,
+    missing_rate: float = 0.0,
+    count_base: float = 500.0,
+    edges: Sequence[float] | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Arrays for one synthetic profile: bin starts, mids, values (NaN where missing) and
+    counts (0 where missing). `n_bins` overrides `step_km`; without either, `edges` (the
+    real engines' grid, see analyze._bin_edges) sets the bins.
+    """
+    if end_km <= start_km:
+        raise ValueError("Invalid bin spec: require end_km > start_km")
+    if n_bins is not None:
+        edges = None
+    elif edges is not None:
+        n_bins = len(edges) - 1
+    else:
+        if step_km <= 0:
+            raise ValueError("Invalid bin spec: require step_km > 0")
+        n_bins = int(round((end_km - start_km) / step_km))
+    n_bins = int(n_bins)
+    if not 1 <= n_bins <= MAX_SYNTHETIC_BINS:
+        raise ValueError(f"Synthetic profiles support 1 to {MAX_SYNTHETIC_BINS} bins")
+    rng = np.random.default_rng(seed)
+    edges = np.asarray(edges, dtype=float) if edges is not None else np.linspace(start_km, end_km, n_bins + 1)
+    mids = (edges[:-1] + edges[1:]) / 2
+    values = base + slope * mids + np.where(mids >= 0, delta, 0.0) + _noise(rng, noise, noise_sigma, mids, ar_rho)
+    counts = np.maximum(0, (count_base - 0.08 * count_base * np.abs(mids) + rng.normal(0, 20, n_bins)).astype(np.int64))
+    if missing_rate > 0:
+        missing = rng.random(n_bins) < missing_rate
+        values[missing] = np.nan
+        counts[missing] = 0
+    return {"bins": edges[:-1], "mids": mids, "values": values, "counts": counts}
+
+
+def profile_points(profile: Dict[str, np.ndarray], digits: int = 3) -> List[Dict[str, Any]]:
+    """Profile arrays as SRD `point` dicts (missing values are None)."""
+    mids = np.round(profile["mids"], 3).tolist()
+    values = np.round(profile["values"], digits).tolist()
+    counts = profile["counts"].tolist()
+    return [
+        {"distance_km": d, "value": None if v != v else v, "count": c}  # v != v is NaN
+        for d, v, c in zip(mids, values, counts)
+    ]
+
+
+def synthetic_srd_points(
+    geometry: Dict[str, Any] | None,
+    start_km: float = -2.0,
+    end_km: float = 2.0,
+    step_km: float = 0.1,
+    seed: Optional[int] = None,
+    latency_ms: float = 0.0,
+    latency_jitter_ms: float = 0.0,
+    **profile_options: Any,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Stream a synthetic profile like the real engines: {"bins": [...]} then one
+    {"point": ...} per bin, sleeping `latency_ms` (+ exponential jitter with mean
+    `latency_jitter_ms`) before each point to mimic EE round trips.
+    """
+    seed = seed_for_geometry(geometry) if seed is None else int(seed)
+    profile = synthetic_profile(seed, start_km, end_km, step_km, **profile_options)
+    yield {"bins": np.round(profile["bins"], 3).tolist()}
+    points = profile_points(profile)
+    delays = np.full(len(points), max(0.0, float(latency_ms)) / 1000.0)
+    if latency_jitter_ms > 0:
+        delays += np.random.default_rng(seed + 1).exponential(latency_jitter_ms / 1000.0, len(points))
+    for point, delay in zip(points, delays.tolist()):
+        if delay > 0:
+            time.sleep(delay)
+        yield {"point": point}
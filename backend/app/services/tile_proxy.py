@@ -0,0 +1,135 @@
+"""
+Caching XYZ tile proxy.
+
+Tiles are fetched from an upstream template (normally an EE map-id template from
+services.ee_alphaearth) and kept in an in-memory LRU in front of a size-bounded disk
+store. Keys are built from the layer parameters and z/x/y rather than the template URL,
+whose map id changes on every refresh, so cached tiles survive template rotation.
+Concurrent requests for the same tile share one upstream fetch. Set
+`TILE_PROXY_UPSTREAM` to point the proxy at another tile server (e.g. a local stand-in
+in tests); it is formatted with {z}, {x}, {y} and the layer parameters.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import DiskCache, LRUCache, _env_int
+from .geometry import geometry_hash
+from .singleflight import SingleFlight
+
+
+MAX_TILE_ZOOM = 24
+_UPSTREAM_TIMEOUT_S = 20.0
+
+
+class TileFetchError(RuntimeError):
+    """The upstream tile server failed or returned something that is not a tile."""
+
+
+def _sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def tile_etag(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest() + '"'
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+class TileProxy:
+    """Memory LRU + disk cache of upstream XYZ tiles with single-flight fetches."""
+
+    def __init__(
+        self,
+        memory_entries: int = 2048,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        upstream: Optional[str] = None,
+    ) -> None:
+        # key -> (tile bytes, etag)
+        self.memory: LRUCache[str, Tuple[bytes, str]] = LRUCache(memory_entries)
+        self.disk: Optional[DiskCache] = None
+        if disk_dir:
+            try:
+                self.disk = DiskCache(disk_dir, disk_max_bytes, suffix=".tile")
+            except OSError as e:
+                print(f"Tile disk cache disabled ({disk_dir}): {e}")
+        self.upstream = upstream or None
+        self._flights: SingleFlight[Tuple[bytes, str]] = SingleFlight()
+
+    @staticmethod
+    def key(layer: Dict[str, Any], z: int, x: int, y: int) -> str:
+        return geometry_hash([layer, int(z), int(x), int(y)])
+
+    def _fetch(self, url: str) -> bytes:
+        try:
+            with urllib.request.urlopen(url, timeout=_UPSTREAM_TIMEOUT_S) as resp:
+                data = resp.read()
+        except urllib.error.HTTPError as e:
+            raise TileFetchError(f"Upstream tile request failed with HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            raise TileFetchError(f"Upstream tile request failed: {e}")
+        if not data:
+            raise TileFetchError("Upstream returned an empty tile")
+        return data
+
+    def _load(self, key: str, url: Callable[[], str]) -> Tuple[bytes, str]:
+        if self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                entry = (data, tile_etag(data))
+                self.memory.put(key, entry)
+                return entry
+        data = self._fetch(url())
+        entry = (data, tile_etag(data))
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, data)
+        return entry
+
+    def get(
+        self,
+        layer: Dict[str, Any],
+        z: int,
+        x: int,
+        y: int,
+        template: Callable[[], str],
+    ) -> Tuple[bytes, str, str]:
+        """
+        (tile bytes, content type, etag) for `layer` at z/x/y. `template` returns the
+        upstream XYZ template and is only called on a cache miss (and ignored when
+        TILE_PROXY_UPSTREAM is set). Raises TileFetchError if the upstream fails.
+        """
+        key = self.key(layer, z, x, y)
+        entry = self.memory.get(key)
+        if entry is None:
+
+            def url() -> str:
+                tpl = self.upstream or template()
+                return tpl.format(z=z, x=x, y=y, **{k: v for k, v in layer.items() if k not in ("z", "x", "y")})
+
+            entry = self._flights.do(key, lambda: self._load(key, url))
+        data, etag = entry
+        return data, _sniff_content_type(data), etag
+
+
+# Shared tile proxy. Set TILE_CACHE_DIR to an empty string to keep it memory-only.
+tile_proxy = TileProxy(
+    memory_entries=_env_int("TILE_CACHE_MEMORY_ENTRIES", 2048),
+    disk_dir=os.getenv("TILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "policy-proof", "tile-cache")),
+    disk_max_bytes=_env_int("TILE_CACHE_MAX_BYTES", 1024 * 1024 * 1024),
+    upstream=os.getenv("TILE_PROXY_UPSTREAM"),
+)
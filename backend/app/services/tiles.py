@@ -0,0 +1,346 @@
+"""
+XYZ tile helpers shared by the tile pyramid job and local rendering.
+
+Web Mercator tile math, a minimal NumPy/zlib PNG encoder (no imaging dependency), and
+`EmbeddingRaster`: a locally stored AlphaEarth embedding array (bands x rows x cols,
+memory-mapped .npy on a regular lon/lat grid) that tiles are sampled from without
+reading the whole file.
+
+Raster layout: `<name>.npy` plus a `<name>.json` sidecar with
+  {"bounds": [west, south, east, north], "bands": ["A00", ...], "overviews": [2, 4, ...]}
+NaN pixels are no-data and render transparent. Overviews (`<name>.ov2.npy`, ...; see
+`build_overviews`) are 2x block means used for low zooms, so a zoomed-out tile reads a
+small array instead of striding across the full-resolution file.
+
+The palettes here are the ones the EE visualizations use (ee_climate,
+ee_alphaearth_learn), so locally rendered tiles match EE-rendered ones.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+
+TILE_SIZE = 256
+MAX_MERCATOR_LAT = 85.0511287798066
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}  # channels -> grey, grey+alpha, RGB, RGBA
+
+# EE visualization palettes (low -> high)
+TEMPERATURE_PALETTE = (
+    "#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8",
+    "#ffffbf", "#fee090", "#fdae61", "#f46d43", "#d73027", "#a50026",
+)
+DIFFERENCE_PALETTE = ("#2166ac", "#67a9cf", "#f7f7f7", "#f4a582", "#b2182b")
+PALETTES = {"temperature": TEMPERATURE_PALETTE, "difference": DIFFERENCE_PALETTE}
+
+
+# --- Tile math ---------------------------------------------------------------------------------
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a tile in degrees."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tiles_for_bbox(bbox: Sequence[float], z: int) -> Iterator[Tuple[int, int, int]]:
+    """(z, x, y) of every tile intersecting bbox = (west, south, east, north)."""
+    west, south, east, north = bbox
+    x0, y0 = lonlat_to_tile(west, north, z)
+    x1, y1 = lonlat_to_tile(east, south, z)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield z, x, y
+
+
+def tile_pixel_lonlat(z: int, x: int, y: int, size: int = TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Longitudes (size,) of the pixel-centre columns and latitudes (size,) of the pixel-centre
+    rows of a tile. Web Mercator is separable, so the full grid is their outer product.
+    """
+    n = 2 ** z
+    offsets = (np.arange(size) + 0.5) / size
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    return lons, lats
+
+
+# --- PNG ---------------------------------------------------------------------------------------
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_png(pixels: np.ndarray, level: int = 6) -> bytes:
+    """
+    PNG bytes for an (H, W) or (H, W, C) uint8 array, C in 1-4. Every row uses the "Up"
+    filter (computed for the whole image at once), which compresses smooth imagery well.
+    """
+    arr = np.asarray(pixels, dtype=np.uint8)
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    h, w, c = arr.shape
+    if c not in _PNG_COLOR_TYPES:
+        raise ValueError(f"PNG encoding supports 1 to 4 channels, got {c}")
+    rows = arr.reshape(h, w * c)
+    up = rows.copy()
+    up[1:] -= rows[:-1]  # uint8 arithmetic wraps modulo 256, as the filter requires
+    raw = np.hstack([np.full((h, 1), 2, dtype=np.uint8), up]).tobytes()
+    header = struct.pack(">IIBBBBB", w, h, 8, _PNG_COLOR_TYPES[c], 0, 0, 0)
+    return _PNG_SIGNATURE + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(raw, level)) + _png_chunk(b"IEND", b"")
+
+
+@lru_cache(maxsize=1)
+def blank_tile_png() -> bytes:
+    """Fully transparent 256x256 PNG, served for tiles without data."""
+    return encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+# --- Local embedding rasters -------------------------------------------------------------------
+
+def _overview_path(base: str, factor: int) -> str:
+    return f"{base}.ov{factor}.npy"
+
+
+class EmbeddingRaster:
+    """Memory-mapped (bands, rows, cols) embedding array on a regular lon/lat grid."""
+
+    def __init__(self, path: str) -> None:
+        base = path[:-4] if path.endswith(".npy") else path
+        with open(f"{base}.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.path = f"{base}.npy"
+        self.data = np.load(self.path, mmap_mode="r")
+        if self.data.ndim != 3:
+            raise ValueError(f"{self.path}: expected a (bands, rows, cols) array, got shape {self.data.shape}")
+        self.west, self.south, self.east, self.north = (float(v) for v in meta["bounds"])
+        self.bands: List[str] = list(meta.get("bands") or [f"A{i:02d}" for i in range(self.data.shape[0])])
+        self._band_index: Dict[str, int] = {b: i for i, b in enumerate(self.bands)}
+        # (factor, array) from finest to coarsest; overviews missing on disk are ignored
+        self.levels: List[Tuple[int, np.ndarray]] = [(1, self.data)]
+        for factor in sorted(int(f) for f in meta.get("overviews") or []):
+            if os.path.exists(_overview_path(base, factor)):
+                self.levels.append((factor, np.load(_overview_path(base, factor), mmap_mode="r")))
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return self.west, self.south, self.east, self.north
+
+    @property
+    def pixel_size(self) -> Tuple[float, float]:
+        """(degrees per column, degrees per row) at full resolution."""
+        _, rows_n, cols_n = self.data.shape
+        return (self.east - self.west) / cols_n, (self.north - self.south) / rows_n
+
+    def band_indices(self, bands: Sequence[str]) -> List[int]:
+        missing = [b for b in bands if b not in self._band_index]
+        if missing:
+            raise ValueError(f"Bands {missing} are not in {os.path.basename(self.path)}")
+        return [self._band_index[b] for b in bands]
+
+    def intersects_tile(self, z: int, x: int, y: int) -> bool:
+        west, south, east, north = tile_bounds(z, x, y)
+        return west < self.east and east > self.west and south < self.north and north > self.south
+
+    def level_for_zoom(self, z: int, size: int = TILE_SIZE) -> Tuple[int, np.ndarray]:
+        """Coarsest level whose pixels are still no larger than the tile's pixels."""
+        tile_px = 360.0 / (2 ** z * size)
+        px = self.pixel_size[0]
+        chosen = self.levels[0]
+        for factor, arr in self.levels[1:]:
+            if factor * px <= tile_px:
+                chosen = (factor, arr)
+        return chosen
+
+    def sample_tile(self, bands: Sequence[str], z: int, x: int, y: int, size: int = TILE_SIZE) -> np.ndarray:
+        """
+        (len(bands), size, size) float32 nearest-neighbour sample of a tile; NaN outside
+        the raster. Only the raster rows and columns the tile touches are read, from the
+        overview level matching the zoom.
+        """
+        lons, lats = tile_pixel_lonlat(z, x, y, size)
+        factor, arr = self.level_for_zoom(z, size)
+        px, py = self.pixel_size
+        _, rows_n, cols_n = arr.shape
+        cols = np.floor((lons - self.west) / (px * factor)).astype(np.int64)
+        rows = np.floor((self.north - lats) / (py * factor)).astype(np.int64)
+        col_ok = (cols >= 0) & (cols < cols_n)
+        row_ok = (rows >= 0) & (rows < rows_n)
+        out = np.full((len(bands), size, size), np.nan, dtype=np.float32)
+        if not col_ok.any() or not row_ok.any():
+            return out
+        idx = self.band_indices(bands)
+        window = arr[np.ix_(idx, rows[row_ok], cols[col_ok])]
+        out[np.ix_(range(len(idx)), np.flatnonzero(row_ok), np.flatnonzero(col_ok))] = window
+        return out
+
+
+def _downsample2(band: np.ndarray) -> np.ndarray:
+    """2x2 block mean of one band ignoring NaN (NaN where a block has no data)."""
+    rows, cols = band.shape
+    padded = np.full((rows + rows % 2, cols + cols % 2), np.nan, dtype=np.float32)
+    padded[:rows, :cols] = band
+    blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+    valid = ~np.isnan(blocks)
+    counts = valid.sum(axis=(1, 3))
+    sums = np.where(valid, blocks, 0.0).sum(axis=(1, 3))
+    out = np.full(counts.shape, np.nan, dtype=np.float32)
+    np.divide(sums, counts, out=out, where=counts > 0)
+    return out
+
+
+def build_overviews(path: str, min_size: int = TILE_SIZE) -> List[int]:
+    """
+    Write 2x, 4x, ... overviews of a raster until the coarsest is under `min_size` pixels
+    on its longer side, record them in the sidecar and return the factors. Each level is
+    built from the previous one, a band at a time, so memory stays at one band.
+    """
+    base = path[:-4] if path.endswith(".npy") else path
+    src = np.load(f"{base}.npy", mmap_mode="r")
+    factors: List[int] = []
+    factor = 1
+    while max(src.shape[1:]) > min_size:
+        factor *= 2
+        n_bands, rows, cols = src.shape
+        tmp = f"{_overview_path(base, factor)}.tmp{os.getpid()}.npy"
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n_bands, (rows + 1) // 2, (cols + 1) // 2))
+        for b in range(n_bands):
+            out[b] = _downsample2(np.asarray(src[b], dtype=np.float32))
+        out.flush()
+        del out
+        os.replace(tmp, _overview_path(base, factor))
+        factors.append(factor)
+        src = np.load(_overview_path(base, factor), mmap_mode="r")
+    with open(f"{base}.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["overviews"] = factors
+    write_tile_atomic(f"{base}.json", json.dumps(meta).encode("utf-8"))
+    return factors
+
+
+def stretch_to_uint8(values: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+    """Linear vmin..vmax -> 0..255 stretch (clipped); NaN maps to 0."""
+    scaled = (np.nan_to_num(values, nan=vmin) - vmin) * (255.0 / max(vmax - vmin, 1e-12))
+    return np.clip(scaled + 0.5, 0, 255).astype(np.uint8)
+
+
+def render_rgb_tile(
+    raster: EmbeddingRaster,
+    z: int,
+    x: int,
+    y: int,
+    bands: Sequence[str],
+    vmin: float,
+    vmax: float,
+) -> np.ndarray | None:
+    """
+    (256, 256, 4) RGBA tile of three embedding bands stretched like the EE visualization
+    (alphaearth_tile_template); None when the tile has no data.
+    """
+    if len(bands) != 3:
+        raise ValueError("RGB tiles need exactly three bands")
+    if not raster.intersects_tile(z, x, y):
+        return None
+    sample = raster.sample_tile(bands, z, x, y)
+    valid = ~np.isnan(sample).any(axis=0)
+    if not valid.any():
+        return None
+    rgba = np.empty((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    rgba[:, :, :3] = np.moveaxis(stretch_to_uint8(sample, vmin, vmax), 0, -1)
+    rgba[:, :, 3] = np.where(valid, 255, 0)
+    return rgba
+
+
+@lru_cache(maxsize=32)
+def palette_lut(palette: Tuple[str, ...]) -> np.ndarray:
+    """(256, 3) uint8 lookup table interpolating a hex palette linearly, like EE's palette."""
+    stops = np.array([[int(c.lstrip("#")[i:i + 2], 16) for i in (0, 2, 4)] for c in palette], dtype=np.float64)
+    if len(stops) == 1:
+        return np.repeat(stops.astype(np.uint8), 256, axis=0)
+    pos = np.linspace(0, len(stops) - 1, 256)
+    lo = np.minimum(pos.astype(np.int64), len(stops) - 2)
+    frac = (pos - lo)[:, None]
+    return np.rint(stops[lo] * (1 - frac) + stops[lo + 1] * frac).astype(np.uint8)
+
+
+def apply_palette(values: np.ndarray, vmin: float, vmax: float, palette: Sequence[str]) -> np.ndarray:
+    """(H, W, 4) RGBA of a (H, W) array through a palette; NaN is transparent."""
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = palette_lut(tuple(palette))[stretch_to_uint8(values, vmin, vmax)]
+    rgba[..., 3] = np.where(np.isnan(values), 0, 255)
+    return rgba
+
+
+def render_palette_tile(
+    raster: EmbeddingRaster,
+    z: int,
+    x: int,
+    y: int,
+    band: str,
+    vmin: float,
+    vmax: float,
+    palette: Sequence[str] = TEMPERATURE_PALETTE,
+) -> np.ndarray | None:
+    """(256, 256, 4) RGBA tile of one band through a palette; None when the tile has no data."""
+    if not raster.intersects_tile(z, x, y):
+        return None
+    values = raster.sample_tile([band], z, x, y)[0]
+    if np.isnan(values).all():
+        return None
+    return apply_palette(values, vmin, vmax, palette)
+
+
+def render_linear_tile(
+    raster: EmbeddingRaster,
+    z: int,
+    x: int,
+    y: int,
+    bands: Sequence[str],
+    coefficients: Sequence[float],
+    vmin: float,
+    vmax: float,
+    palette: Sequence[str] = TEMPERATURE_PALETTE,
+    intercept: float = 0.0,
+) -> np.ndarray | None:
+    """
+    (256, 256, 4) RGBA tile of a linear model of the bands (intercept + bands . coefficients),
+    e.g. the learned embedding -> temperature regression of ee_alphaearth_learn, through a
+    palette; None when the tile has no data.
+    """
+    if len(bands) != len(coefficients):
+        raise ValueError(f"{len(coefficients)} coefficients for {len(bands)} bands")
+    if not raster.intersects_tile(z, x, y):
+        return None
+    sample = raster.sample_tile(bands, z, x, y)
+    pred = np.tensordot(np.asarray(coefficients, dtype=np.float32), sample, axes=1) + np.float32(intercept)
+    if np.isnan(pred).all():
+        return None
+    return apply_palette(pred, vmin, vmax, palette)
+
+
+def write_tile_atomic(path: str, data: bytes) -> None:
+    """Write a tile file so readers never see a partial PNG (temp file + rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
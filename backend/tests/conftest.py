@@ -0,0 +1,55 @@
+import json
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+
+RASTER_BOUNDS = [-122.6, 37.6, -122.3, 37.9]
+RASTER_BANDS = ["A00", "A01", "A02", "A03"]
+
+
+@pytest.fixture
+def embedding_raster(tmp_path):
+    """
+    A small memmappable embedding raster (services.tiles.EmbeddingRaster layout): 4 bands of
+    600 x 520 float32 gradients in -0.3..0.3 with a NaN hole; returns the .npy path.
+    """
+    rows, cols = 600, 520
+    yy, xx = np.mgrid[0:rows, 0:cols].astype(np.float32)
+    data = np.stack([
+        -0.3 + 0.6 * xx / (cols - 1),
+        -0.3 + 0.6 * yy / (rows - 1),
+        0.3 - 0.6 * xx / (cols - 1),
+        np.full((rows, cols), 0.1, dtype=np.float32),
+    ]).astype(np.float32)
+    data[:, :10, :10] = np.nan
+    path = tmp_path / "sf_2023.npy"
+    np.save(path, data)
+    (tmp_path / "sf_2023.json").write_text(json.dumps({"bounds": RASTER_BOUNDS, "bands": RASTER_BANDS}))
+    return str(path)
+
+
+def decode_png(data):
+    """(H, W, C) uint8 pixels of an 8-bit PNG written by encode_png (checks CRCs, undoes filters)."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, idat, header = 8, b"", None
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos:pos + 4])
+        tag, body = data[pos + 4:pos + 8], data[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(tag + body)
+        if tag == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif tag == b"IDAT":
+            idat += body
+        pos += 12 + length
+    w, h, depth, color_type = header[:4]
+    channels = {0: 1, 4: 2, 2: 3, 6: 4}[color_type]
+    raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(h, 1 + w * channels)
+    assert depth == 8 and set(raw[:, 0].tolist()) <= {0, 2}  # None or Up
+    rows = raw[:, 1:].copy()
+    for r in range(1, h):
+        if raw[r, 0] == 2:
+            rows[r] += rows[r - 1]
+    return rows.reshape(h, w, channels)
@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.services import analyze
+
+
+def test_band_gap_is_inside_minus_outside(monkeypatch):
+    edges = [-0.2, -0.1, 0.0, 0.1, 0.2]
+    # Bin ids count up from the outermost outside bin (see _bin_id_image); A00 is higher inside
+    by_bin = {
+        i: {"A00": {"mean": 0.1 if i >= 2 else -0.1 + 0.01 * i, "count": 4}, "A01": {"mean": 0.0, "count": 4}}
+        for i in range(4)
+    }
+    monkeypatch.setattr(analyze, "_reduce_distance_multiband", lambda *args, **kwargs: by_bin)
+
+    means, counts = analyze._band_profile_matrix(None, None, edges, bands=["A00", "A01"])
+    mids = np.round((np.array(edges[:-1]) + np.array(edges[1:])) / 2, 3)
+    rows = {r["band"]: r for r in analyze._band_discontinuities(means, mids, ["A00", "A01"])}
+
+    assert counts.tolist() == [[4] * 4, [4] * 4]
+    assert rows["A00"]["impact"] == 0.195
+    assert rows["A00"]["inside_mean"] == 0.1 and rows["A00"]["outside_mean"] == -0.095
+    assert rows["A01"]["impact"] == 0.0
@@ -0,0 +1,101 @@
+import csv
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from app.bulk import read_checkpoint, run_bulk
+from app.services import analyze
+
+
+SQUARE = {
+    "type": "Polygon",
+    "coordinates": [[[-122.5, 37.7], [-122.4, 37.7], [-122.4, 37.8], [-122.5, 37.8], [-122.5, 37.7]]],
+}
+FEATURES = [(f"f{i}", SQUARE) for i in range(3)]
+
+
+class _FakeImage:
+    def select(self, *args):
+        return self
+
+    def reduce(self, *args):
+        return self
+
+
+def _reduce_ring_features(img, bands, features, scale=10):
+    """The reduceRegions + getInfo round trip: activity is higher inside the border (bins 20+)."""
+    return [
+        {**f["properties"], "mean": 0.1 if f["properties"]["bin"] >= 20 else -0.1, "count": 50}
+        for f in features
+    ]
+
+
+def _stub_ee(reduce):
+    """Patch the Earth Engine layer of services.analyze; rings, binning and scoring stay real."""
+    fake_ee = SimpleNamespace(
+        Geometry=lambda geometry: geometry,
+        Feature=lambda geometry, properties: {"geometry": geometry, "properties": properties},
+        Reducer=SimpleNamespace(mean=lambda: None),
+    )
+    return mock.patch.multiple(
+        analyze,
+        ee=fake_ee,
+        _ensure_initialized=lambda: None,
+        alphaearth_image_for_year=lambda year: _FakeImage(),
+        _reduce_ring_features=reduce,
+    )
+
+
+def _first_call(marker, fail):
+    """Runs `fail` on the first reduction across processes (via a marker file), then reduces normally."""
+    def reduce(*args, **kwargs):
+        if not os.path.exists(marker):
+            open(marker, "w").close()
+            fail()
+        return _reduce_ring_features(*args, **kwargs)
+    return reduce
+
+
+def flaky_engine(features, year, marker, **options):
+    """The real batch engine on a stubbed EE whose first reduceRegions call fails."""
+    def quota_exceeded():
+        raise RuntimeError("quota exceeded")
+
+    with _stub_ee(_first_call(marker, quota_exceeded)):
+        yield from analyze.run_real_srd_batch_analysis(features, year, **options)
+
+
+def crashing_engine(features, year, marker, **options):
+    """The real batch engine on a stubbed EE whose first reduceRegions call kills the worker."""
+    with _stub_ee(_first_call(marker, lambda: os._exit(1))):
+        yield from analyze.run_real_srd_batch_analysis(features, year, **options)
+
+
+def _run(tmp_path, engine):
+    output = str(tmp_path / "scores.csv")
+    options = {"marker": str(tmp_path / "marker")}
+    return output, run_bulk(
+        FEATURES, output, 2023, engine=f"{__name__}:{engine}", workers=1, chunk_size=8, options=options
+    )
+
+
+def test_failed_chunk_is_retried_on_resume(tmp_path):
+    output, rows = _run(tmp_path, "flaky_engine")
+    assert [r["error"] for r in rows] == ["quota exceeded"] * 3
+    assert read_checkpoint(f"{output}.checkpoint.jsonl") == {}
+
+    output, rows = _run(tmp_path, "flaky_engine")
+    assert [r["id"] for r in rows] == ["f0", "f1", "f2"]
+    assert all(r["error"] is None and r["impact_score"] == 33.34 for r in rows)
+    assert sorted(read_checkpoint(f"{output}.checkpoint.jsonl")) == [0, 1, 2]
+    with open(output, newline="", encoding="utf-8") as f:
+        assert [row["error"] for row in csv.DictReader(f)] == ["", "", ""]
+
+
+def test_crashed_worker_does_not_stop_the_run(tmp_path):
+    output, rows = _run(tmp_path, "crashing_engine")
+    assert len(rows) == 3 and all(r["error"].startswith("not analysed") for r in rows)
+    assert os.path.exists(output)
+
+    _, rows = _run(tmp_path, "crashing_engine")
+    assert all(r["error"] is None for r in rows)
@@ -0,0 +1,27 @@
+import logging
+import time
+
+from app.services import analyze
+from app.services.cancel import CancelToken
+
+
+def test_cancelled_rings_are_not_recorded(monkeypatch, caplog):
+    def slow_reduce(img, ring, scale):
+        time.sleep(0.05)
+        return {"mean": 0.0, "count": 1}
+
+    monkeypatch.setattr(analyze, "_reduce_ring", slow_reduce)
+    recorded = []
+    cancel = CancelToken()
+    edges = [round(-0.5 + 0.1 * i, 3) for i in range(11)]
+    sampler = analyze._sample_rings_concurrent(
+        None, [object()] * 10, edges, 2023, concurrency=1, record=lambda i, s: recorded.append(i), cancel=cancel
+    )
+    with caplog.at_level(logging.ERROR, logger="concurrent.futures"):
+        assert next(sampler)["distance_km"] == -0.45
+        cancel.cancel()
+        assert list(sampler) == []
+        time.sleep(0.2)  # Let the in-flight call finish
+
+    assert recorded and len(recorded) < 10
+    assert not [r for r in caplog.records if r.name == "concurrent.futures"]
@@ -0,0 +1,29 @@
+from app.services.ee_catalog import CollectionCatalog
+
+
+POINT = {"type": "Point", "coordinates": [-122.45, 37.75]}
+
+
+def test_coverage_is_asked_once_per_region_and_year(monkeypatch):
+    catalog = CollectionCatalog("TEST/COLLECTION", first_year=2017, coverage=True)
+    catalog.image_counts = {2022: 0, 2023: 5}
+    asked = []
+    monkeypatch.setattr(catalog, "_region_has_images", lambda year, geometry: asked.append(year) or True)
+
+    assert catalog.covers(2023, POINT) is True
+    assert catalog.covers(2023, POINT) is True
+    assert catalog.covers(2022, POINT) is False  # No images that year; EE is not asked
+    assert catalog.covers(2030, POINT) is None  # Outside the loaded range
+    assert asked == [2023]
+
+
+def test_failed_coverage_check_is_unknown_and_not_remembered(monkeypatch):
+    catalog = CollectionCatalog("TEST/COLLECTION", first_year=2017, coverage=True)
+    catalog.image_counts = {2023: 5}
+
+    def unavailable(year, geometry):
+        raise RuntimeError("EE unavailable")
+
+    monkeypatch.setattr(catalog, "_region_has_images", unavailable)
+    assert catalog.covers(2023, POINT) is None
+    assert catalog.summary()["coverage_entries"] == 0
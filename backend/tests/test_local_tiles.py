@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services import ee_alphaearth_learn
+from app.services.local_tiles import LocalTileNotFound, LocalTileRenderer
+from app.services.tiles import TEMPERATURE_PALETTE, EmbeddingRaster, apply_palette, build_overviews
+
+from conftest import RASTER_BANDS, decode_png
+
+
+TILE = (11, 327, 791)  # Inside the fixture raster
+OUTSIDE = (11, 0, 0)
+
+
+@pytest.fixture
+def renderer(embedding_raster):
+    return LocalTileRenderer(os.path.dirname(embedding_raster), memory_entries=16)
+
+
+def test_rasters_are_listed_without_their_overviews(renderer, embedding_raster):
+    build_overviews(embedding_raster, min_size=128)
+    renderer.reload()
+
+    assert renderer.raster_names() == ["sf_2023"]
+    (summary,) = renderer.summary()["rasters"]
+    assert summary["bands"] == RASTER_BANDS
+    assert summary["shape"] == [4, 600, 520]
+    assert summary["overviews"] == [2, 4, 8]
+
+
+def test_rgb_and_band_tiles(renderer):
+    rgb = renderer.render_rgb("sf_2023", *TILE, ["A00", "A01", "A02"], -0.3, 0.3)
+    pixels = decode_png(rgb)
+    assert pixels.shape == (256, 256, 4) and (pixels[:, :, 3] == 255).all()
+    assert renderer.render_rgb("sf_2023", *TILE, ["A00", "A01", "A02"], -0.3, 0.3) is rgb  # Memory hit
+
+    band = decode_png(renderer.render_band("sf_2023", *TILE, "A03", -0.3, 0.3, palette="temperature"))
+    expected = apply_palette(np.full((1, 1), 0.1), -0.3, 0.3, TEMPERATURE_PALETTE)[0, 0]
+    assert (band.reshape(-1, 4) == expected).all()
+
+    assert renderer.render_rgb("sf_2023", *OUTSIDE, ["A00", "A01", "A02"], -0.3, 0.3) is None
+
+
+def test_bad_names_bands_and_palettes_are_rejected(renderer):
+    with pytest.raises(LocalTileNotFound):
+        renderer.render_band("missing", *TILE, "A00", -0.3, 0.3)
+    with pytest.raises(LocalTileNotFound):
+        renderer.raster("../sf_2023")
+    with pytest.raises(LocalTileNotFound):
+        renderer.model("nope")
+    with pytest.raises(ValueError, match="not in"):
+        renderer.render_band("sf_2023", *TILE, "A63", -0.3, 0.3)
+    with pytest.raises(ValueError, match="Unknown palette"):
+        renderer.render_band("sf_2023", *TILE, "A00", -0.3, 0.3, palette="rainbow")
+    with pytest.raises(ValueError, match="one coefficient per band"):
+        renderer.save_model({"bands": ["A00", "A01"], "coefficients": [1.0]})
+
+
+class _EEList:
+    """Stands in for the ee.List of coefficients returned by _learned_regression."""
+
+    def __init__(self, values):
+        self.values = [float(v) for v in values]
+
+    def getInfo(self):
+        return self.values
+
+
+def test_coefficients_fitted_on_embeddings_render_locally(renderer, embedding_raster, monkeypatch):
+    # Synthetic target: a linear function of two embedding bands plus noise, fitted by least squares
+    # (the EE linearRegression reducer, without an intercept) on the raster's own embeddings
+    data = np.load(embedding_raster)
+    x = data[:2].reshape(2, -1).T
+    x = x[~np.isnan(x).any(axis=1)]
+    y = x @ np.array([20.0, -10.0]) + np.random.default_rng(0).normal(0.0, 0.05, len(x))
+    fitted = np.linalg.lstsq(x, y, rcond=None)[0]
+    monkeypatch.setattr(
+        ee_alphaearth_learn, "_learned_regression", lambda *args: (None, _EEList(fitted), ["A00", "A01"], True)
+    )
+
+    model = ee_alphaearth_learn.alphaearth_learned_coefficients(2023, None)
+    assert model["coefficients"] == pytest.approx([20.0, -10.0], abs=0.05)
+    assert (model["vmin"], model["vmax"]) == (-30.0, 30.0)
+
+    model_id = renderer.save_model(model)
+    assert renderer.model_ids() == [model_id]
+    tile = decode_png(renderer.render_learned("sf_2023", model_id, *TILE, vmin=-6.0, vmax=6.0))
+    sample = EmbeddingRaster(embedding_raster).sample_tile(["A00", "A01"], *TILE)
+    c0, c1 = model["coefficients"]
+    expected = apply_palette(c0 * sample[0] + c1 * sample[1], -6.0, 6.0, TEMPERATURE_PALETTE)
+    assert np.abs(tile.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_unconverged_regression_is_an_error(monkeypatch):
+    monkeypatch.setattr(ee_alphaearth_learn, "_learned_regression", lambda *args: (None, _EEList([0]), ["A00", "A01"], True))
+    with pytest.raises(ValueError, match="did not converge"):
+        ee_alphaearth_learn.alphaearth_learned_coefficients(2023, None)
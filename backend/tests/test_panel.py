@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from app.services import analyze
+
+
+class _FakeImage:
+    """Stands in for the chained ee.Image calls the panel makes before reducing."""
+
+    def select(self, *args):
+        return self
+
+    def reduce(self, *args):
+        return self
+
+    def rename(self, *args):
+        return self
+
+
+def test_panel_distance_mode_scores_each_year_inside_minus_outside(monkeypatch):
+    fake_ee = SimpleNamespace(
+        Geometry=lambda g: g,
+        Image=SimpleNamespace(cat=lambda images: _FakeImage()),
+        Reducer=SimpleNamespace(mean=lambda: None),
+    )
+    # Bins -0.4..0.4 km; 2023 is higher inside the border, 2022 is flat
+    by_bin = {
+        i: {"y2022": {"mean": 0.0, "count": 3}, "y2023": {"mean": 0.3 if i >= 4 else -0.3, "count": 3}}
+        for i in range(8)
+    }
+    monkeypatch.setattr(analyze, "ee", fake_ee)
+    monkeypatch.setattr(analyze, "_ensure_initialized", lambda: None)
+    monkeypatch.setattr(analyze, "simplify_for_scale", lambda g, *args: (g, {}))
+    monkeypatch.setattr(analyze, "alphaearth_image_for_year", lambda *args: _FakeImage())
+    monkeypatch.setattr(analyze, "_reduce_distance_multiband", lambda *args, **kwargs: by_bin)
+
+    square = {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}
+    events = list(analyze.run_real_srd_panel_analysis(square, [2022, 2023], mode="distance", start_km=-0.4, end_km=0.4))
+
+    n_bins = len(next(e["bins"] for e in events if "bins" in e))
+    points = [e["point"] for e in events if "point" in e]
+    assert [p["year"] for p in points] == [2022] * n_bins + [2023] * n_bins
+    assert [p["value"] for p in points if p["year"] == 2023][:8] == [0.0] * 4 + [100.0] * 4
+    assert events[-2] == {"impact_by_year": {"2022": 0.0, "2023": 100.0}}
+    assert events[-1] == {"impact_score": 100.0}
@@ -0,0 +1,17 @@
+import numpy as np
+
+from app.services.analyze import _bin_pixel_sample
+
+
+def _sample(distance_km, values):
+    return {"range_km": 1.0, "bands": ["A01"], "distance_km": np.array(distance_km), "values": {"A01": np.array(values)}}
+
+
+def test_signed_sample_lands_in_bins_on_its_side_of_the_border():
+    # Negative distances are outside the polygon, positive inside (see _signed_distance_image)
+    sample = _sample([-0.15, -0.05, 0.05, 0.07, 0.15, 0.5, np.nan], [-0.3, -0.3, 0.3, 0.3, 0.0, 0.0, 0.0])
+    points = _bin_pixel_sample(sample, ["A01"], [-0.2, -0.1, 0.0, 0.1, 0.2])
+
+    assert [p["count"] for p in points] == [1, 1, 2, 1]
+    assert [p["value"] for p in points] == [0.0, 0.0, 100.0, 50.0]
+
@@ -0,0 +1,16 @@
+from app.services import analyze
+
+
+def test_placebo_without_enough_data_is_left_out(monkeypatch):
+    edges = [round(-1 + 0.1 * i, 3) for i in range(21)]
+    # Wide grid is padded by one bin; data only in real bins 0, 9, 10 and 11
+    by_bin = {w: {"mean": {"mean": 0.3 if w >= 11 else -0.3, "count": 5}} for w in (1, 10, 11, 12)}
+    monkeypatch.setattr(analyze, "_reduce_distance_multiband", lambda *args, **kwargs: by_bin)
+
+    points, placebo = analyze._placebo_test(None, None, edges, 0.1, shifts_km=[0.1, -0.1])
+
+    assert sum(p["value"] is not None for p in points) == 4
+    # +0.1 straddles the border with 3 valid bins (too few to score); -0.1 has no outside bins
+    assert placebo["shifts_km"] == [-0.1, 0.1]
+    assert placebo["impacts"] == [None, None]
+    assert placebo["p_value"] is None
@@ -0,0 +1,34 @@
+import pytest
+
+from app.services.ee_alphaearth import _ensure_initialized
+
+
+@pytest.fixture(scope="module")
+def ee():
+    try:
+        _ensure_initialized()
+    except Exception as e:  # No credentials in this environment
+        pytest.skip(f"Earth Engine unavailable: {e}")
+    import ee
+
+    return ee
+
+
+def test_signed_distance_is_positive_inside_and_negative_outside(ee):
+    from app.services.analyze import _signed_distance_image
+
+    # ~1.1 km square; points 200 m inside and 200 m outside its western edge
+    square = ee.Geometry.Rectangle([-122.41, 37.70, -122.40, 37.71], None, False)
+    image = _signed_distance_image(square, 1000, scale=10)
+    dx = 200 / 88_000  # degrees of longitude per 200 m at 37.7N
+    points = ee.FeatureCollection([
+        ee.Feature(ee.Geometry.Point([-122.41 + dx, 37.705]), {"where": "inside"}),
+        ee.Feature(ee.Geometry.Point([-122.41 - dx, 37.705]), {"where": "outside"}),
+        ee.Feature(ee.Geometry.Point([-122.41 - 0.03, 37.705]), {"where": "beyond"}),
+    ])
+    sampled = image.reduceRegions(points, ee.Reducer.first(), 10).getInfo()["features"]
+    values = {f["properties"]["where"]: f["properties"].get("first") for f in sampled}
+
+    assert values["inside"] == pytest.approx(200, abs=20)
+    assert values["outside"] == pytest.approx(-200, abs=20)
+    assert values["beyond"] is None  # Masked past max_m
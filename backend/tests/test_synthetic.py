@@ -0,0 +1,20 @@
+from app.services.analyze import _bin_edges, run_real_srd_analysis
+
+
+SQUARE = {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}
+
+
+def test_synthetic_bins_match_the_earth_engine_grid():
+    events = list(run_real_srd_analysis(SQUARE, 2023, mode="synthetic", synthetic={"seed": 1}))
+    bins = next(e["bins"] for e in events if "bins" in e)
+
+    assert bins == _bin_edges(-2.0, 2.0, 0.1)[:-1]
+    assert sum("point" in e for e in events) == len(bins)
+    assert "impact_score" in events[-1]
+
+
+def test_unscorable_synthetic_run_ends_with_an_error_event():
+    events = list(run_real_srd_analysis(SQUARE, 2023, mode="synthetic", synthetic={"seed": 1, "missing_rate": 0.99}))
+
+    assert events[-1] == {"error": "Insufficient valid data points for SRD analysis"}
+    assert not any("impact_score" in e for e in events)
@@ -0,0 +1,114 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.tile_proxy import TileFetchError, TileProxy, tile_etag
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"tile"
+LAYER = {"layer": "alphaearth", "year": 2023, "bands": "A01,A16,A09", "vmin": -0.3, "vmax": 0.3}
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    """Stub tile server: counts requests, serves PNG bytes per path, 404s under /missing/."""
+
+    requests = []
+    delay_s = 0.0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.requests.append(self.path)
+        time.sleep(self.delay_s)
+        if self.path.startswith("/missing/"):
+            self.send_error(404)
+            return
+        body = PNG + self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    _Upstream.requests = []
+    _Upstream.delay_s = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/{{year}}/{{z}}/{{x}}/{{y}}.png"
+    server.shutdown()
+    server.server_close()
+
+
+def _no_template():
+    raise AssertionError("TILE_PROXY_UPSTREAM replaces the EE template")
+
+
+def test_memory_hit_skips_upstream(upstream):
+    proxy = TileProxy(upstream=upstream)
+    first = proxy.get(LAYER, 3, 1, 2, _no_template)
+    second = proxy.get(LAYER, 3, 1, 2, _no_template)
+
+    assert first == second
+    assert first[0] == PNG + b"/2023/3/1/2.png"
+    assert first[1:] == ("image/png", tile_etag(first[0]))
+    assert _Upstream.requests == ["/2023/3/1/2.png"]
+
+
+def test_disk_hit_survives_a_new_proxy(upstream, tmp_path):
+    data, _, etag = TileProxy(disk_dir=str(tmp_path), upstream=upstream).get(LAYER, 3, 1, 2, _no_template)
+    again = TileProxy(disk_dir=str(tmp_path), upstream=upstream).get(LAYER, 3, 1, 2, _no_template)
+
+    assert again == (data, "image/png", etag)
+    assert len(_Upstream.requests) == 1
+
+
+def test_concurrent_misses_share_one_fetch(upstream):
+    _Upstream.delay_s = 0.2
+    proxy = TileProxy(upstream=upstream)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(proxy.get(LAYER, 5, 3, 4, _no_template))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 8 and len(set(results)) == 1
+    assert _Upstream.requests == ["/2023/5/3/4.png"]
+
+
+def test_upstream_errors_are_not_cached(upstream):
+    proxy = TileProxy(upstream=upstream.replace("/{year}/", "/missing/"))
+    for _ in range(2):
+        with pytest.raises(TileFetchError, match="HTTP 404"):
+            proxy.get(LAYER, 3, 1, 2, _no_template)
+    assert len(_Upstream.requests) == 2
+
+
+def test_tile_endpoint_answers_304_for_a_matching_etag(upstream, monkeypatch):
+    pytest.importorskip("aiohttp")  # app.main pulls in the LLM clients
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    monkeypatch.setattr(main, "tile_proxy", TileProxy(upstream=upstream))
+    client = TestClient(main.app)
+    url = "/api/tiles/alphaearth/2023/3/1/2.png"
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.content == PNG + b"/2023/3/1/2.png"
+    etag = first.headers["ETag"]
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert len(_Upstream.requests) == 1
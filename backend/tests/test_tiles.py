@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+
+from app.pyramid import run_pyramid, tile_path
+from app.services.tiles import EmbeddingRaster, _downsample2, build_overviews, encode_png
+
+from conftest import RASTER_BOUNDS, decode_png
+
+
+def test_png_round_trip():
+    rng = np.random.default_rng(0)
+    for shape in [(256, 256, 4), (7, 5, 3), (9, 11)]:
+        pixels = rng.integers(0, 256, shape, dtype=np.uint8)
+        decoded = decode_png(encode_png(pixels))
+        assert np.array_equal(decoded.reshape(pixels.shape), pixels)
+
+
+def test_overviews_halve_until_small(embedding_raster):
+    assert build_overviews(embedding_raster, min_size=128) == [2, 4, 8]
+
+    raster = EmbeddingRaster(embedding_raster)
+    assert [(f, a.shape) for f, a in raster.levels] == [
+        (1, (4, 600, 520)), (2, (4, 300, 260)), (4, (4, 150, 130)), (8, (4, 75, 65)),
+    ]
+    full, ov2 = raster.levels[0][1], raster.levels[1][1]
+    assert np.allclose(ov2[1, 10:20, 10:20], _downsample2(np.asarray(full[1]))[10:20, 10:20])
+    assert np.isclose(ov2[0, 100, 100], full[0, 200:202, 200:202].mean())
+    assert np.isnan(ov2[0, 2, 2])  # Block entirely inside the NaN hole
+    # Low zooms read the coarsest overview; high zooms the full resolution
+    assert raster.level_for_zoom(8)[0] == 8
+    assert raster.level_for_zoom(14)[0] == 1
+
+
+def test_pyramid_resumes_by_skipping_existing_tiles(embedding_raster, tmp_path):
+    out_dir = str(tmp_path / "tiles")
+    options = dict(source=f"raster:{embedding_raster}", out_dir=out_dir, bands=["A00", "A01", "A02"], workers=1)
+
+    first = run_pyramid(2023, RASTER_BOUNDS, [10, 11], **options)
+    assert first["written"] == first["planned"] > 0 and first["skipped"] == 0
+
+    z, x, y = 11, 327, 791
+    path = tile_path(out_dir, 2023, z, x, y)
+    pixels = decode_png(open(path, "rb").read())
+    assert pixels.shape == (256, 256, 4) and pixels[:, :, 3].any()
+
+    second = run_pyramid(2023, RASTER_BOUNDS, [10, 11], **options)
+    assert second["skipped"] == first["planned"] and second["written"] == 0
+
+    os.remove(path)
+    third = run_pyramid(2023, RASTER_BOUNDS, [10, 11], **options)
+    assert third["skipped"] == first["planned"] - 1 and third["written"] == 1
+    assert os.path.exists(path)